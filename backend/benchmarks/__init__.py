@@ -0,0 +1 @@
+# backend/benchmarks - run from backend/: python -m benchmarks.<name>
@@ -0,0 +1,37 @@
+# backend/benchmarks/common.py
+import statistics
+import time
+from psycopg2.extras import RealDictCursor
+
+class CountingCursor(RealDictCursor):
+    """RealDictCursor that counts statements on its connection"""
+
+    def execute(self, query, vars=None):
+        self.connection.query_count = getattr(self.connection, "query_count", 0) + 1
+        return super().execute(query, vars)
+
+def counting_cursor(conn):
+    conn.query_count = 0
+    return conn.cursor(cursor_factory=CountingCursor)
+
+def measure(fn, repeat: int = 20) -> dict:
+    """Run fn() `repeat` times, return latency percentiles in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min": samples[0],
+    }
+
+def print_table(headers: list, rows: list):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    line = "  ".join(str(h).rjust(w) for h, w in zip(headers, widths))
+    print(line)
+    print("-" * len(line))
+    for row in rows:
+        print("  ".join(str(v).rjust(w) for v, w in zip(row, widths)))
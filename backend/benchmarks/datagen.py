@@ -0,0 +1,232 @@
+# backend/benchmarks/datagen.py
+"""
+Synthetic restaurant history for benchmarks: tables, menu, orders, items, payments
+
+    cd backend && python -m benchmarks.datagen [--orders 1000000] [--days 365] [--open-orders 150]
+
+Rows are streamed with COPY in chunks, so a million orders (plus ~3M order
+lines and ~950k payments) load in minutes. Columns follow what the routes
+query (order_items.unit_price/subtotal, payments.amount_paid/cashier_id/status),
+on top of the tables from schema.sql and migrations/.
+
+Everything is appended after the existing rows; use a throwaway database.
+The dashboard rollups are rebuilt and the tables ANALYZEd at the end.
+"""
+import argparse
+import io
+import random
+import time
+from datetime import datetime, timedelta
+import psycopg2
+from config.database import DATABASE_CONFIG
+from utils.sales_rollups import rebuild
+
+COPY_CHUNK_ROWS = 50_000
+
+# Share of orders created in each hour of the day: lunch and dinner rush
+HOUR_WEIGHTS = {
+    7: 2, 8: 3, 9: 2, 10: 3, 11: 10, 12: 14, 13: 8, 14: 3,
+    15: 2, 16: 2, 17: 5, 18: 12, 19: 14, 20: 9, 21: 4, 22: 2,
+}
+PAYMENT_METHODS = (("cash", 55), ("bank_transfer", 20), ("qr_code", 15), ("card", 10))
+CANCELLED_SHARE = 0.05
+
+# Open orders spread over the states the kitchen / cashier screens poll
+OPEN_STATES = (
+    ("PENDING", "WAITING"),
+    ("CONFIRMED", "PREPARING"),
+    ("READY", "READY"),
+    ("DELIVERED", "SERVED"),
+)
+
+class CopyBuffer:
+    """Collects CSV rows for one COPY into `table`"""
+
+    def __init__(self, cursor, table: str, columns: tuple):
+        self.cursor = cursor
+        self.sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')"
+        self.buffer = io.StringIO()
+        self.pending = 0
+        self.total = 0
+
+    def add(self, *values):
+        self.buffer.write(",".join("" if v is None else str(v) for v in values))
+        self.buffer.write("\n")
+        self.pending += 1
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.buffer.seek(0)
+        self.cursor.copy_expert(self.sql, self.buffer)
+        self.total += self.pending
+        self.buffer = io.StringIO()
+        self.pending = 0
+
+def next_id(cursor, table: str, column: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+def sync_sequence(cursor, table: str, column: str):
+    """Explicit ids were COPYed; move the SERIAL sequence past them"""
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+        f"(SELECT COALESCE(MAX({column}), 1) FROM {table}))"
+    )
+
+def ensure_tables(cursor, count: int) -> list:
+    cursor.execute("SELECT COALESCE(MAX(table_number), 0) FROM tables")
+    start = cursor.fetchone()[0] + 1
+    cursor.execute("SELECT COUNT(*) FROM tables")
+    missing = count - cursor.fetchone()[0]
+    if missing > 0:
+        cursor.execute("""
+            INSERT INTO tables (table_number, capacity, status)
+            SELECT n, (ARRAY[2, 4, 4, 6, 8])[1 + n %% 5], 'AVAILABLE'
+            FROM generate_series(%s, %s) n
+        """, (start, start + missing - 1))
+    cursor.execute("SELECT table_id FROM tables ORDER BY table_id")
+    return [r[0] for r in cursor.fetchall()]
+
+def ensure_menu(cursor, count: int, rng: random.Random) -> list:
+    cursor.execute("SELECT COUNT(*) FROM menu_items")
+    missing = count - cursor.fetchone()[0]
+    if missing > 0:
+        cursor.execute("""
+            INSERT INTO categories (category_name, description)
+            SELECT 'Bench category ' || n, 'benchmarks.datagen'
+            FROM generate_series(1, 12) n
+            ON CONFLICT (category_name) DO NOTHING
+        """)
+        cursor.execute("SELECT category_id FROM categories ORDER BY category_id")
+        categories = [r[0] for r in cursor.fetchall()]
+        cursor.executemany(
+            "INSERT INTO menu_items (category_id, item_name, description, price, status) "
+            "VALUES (%s, %s, %s, %s, 'AVAILABLE')",
+            [(rng.choice(categories), f"Món thử nghiệm {i}", "benchmarks.datagen",
+              rng.randrange(15, 200) * 1000) for i in range(missing)]
+        )
+    cursor.execute("SELECT item_id, price FROM menu_items WHERE UPPER(status) = 'AVAILABLE' ORDER BY item_id")
+    return [(r[0], int(r[1])) for r in cursor.fetchall()]
+
+def order_times(rng: random.Random, count: int, days: int, now: datetime):
+    """`count` timestamps over the last `days` days, following HOUR_WEIGHTS, oldest first"""
+    hours = list(HOUR_WEIGHTS)
+    weights = list(HOUR_WEIGHTS.values())
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    stamps = []
+    for _ in range(count):
+        day = today - timedelta(days=rng.randrange(1, days + 1))
+        stamps.append(day + timedelta(hours=rng.choices(hours, weights)[0],
+                                      seconds=rng.randrange(3600)))
+    stamps.sort()
+    return stamps
+
+def generate(conn, args):
+    rng = random.Random(args.seed)
+    cursor = conn.cursor()
+    now = datetime.now()
+
+    table_ids = ensure_tables(cursor, args.tables)
+    menu = ensure_menu(cursor, args.menu_items, rng)
+    cursor.execute("SELECT employee_id FROM employees ORDER BY employee_id")
+    employees = [r[0] for r in cursor.fetchall()] or [None]
+    conn.commit()
+
+    order_id = next_id(cursor, "orders", "order_id")
+    first_order_id = order_id
+    orders = CopyBuffer(cursor, "orders", ("order_id", "table_id", "employee_id", "customer_name",
+                                           "status", "total_amount", "created_at", "updated_at"))
+    items = CopyBuffer(cursor, "order_items", ("order_id", "item_id", "quantity", "unit_price",
+                                               "subtotal", "created_at"))
+    payments = CopyBuffer(cursor, "payments", ("order_id", "payment_method", "amount_paid",
+                                               "change_given", "cashier_id", "status", "created_at"))
+    tickets = CopyBuffer(cursor, "kitchen_orders", ("order_id", "status", "created_at", "updated_at"))
+    methods = [m for m, _ in PAYMENT_METHODS]
+    method_weights = [w for _, w in PAYMENT_METHODS]
+
+    def add_order(created_at, status, ticket_status):
+        nonlocal order_id
+        total = 0
+        for _ in range(rng.choices((1, 2, 3, 4, 5, 6), (15, 25, 25, 18, 10, 7))[0]):
+            item_id, price = rng.choice(menu)
+            quantity = rng.choices((1, 2, 3), (75, 20, 5))[0]
+            total += price * quantity
+            items.add(order_id, item_id, quantity, price, price * quantity, created_at)
+        closed_at = created_at + timedelta(minutes=rng.randrange(25, 120))
+        orders.add(order_id, rng.choice(table_ids), rng.choice(employees), f"Khách {order_id}",
+                   status, total, created_at, closed_at if status in ("PAID", "CANCELLED") else created_at)
+        if status == "PAID":
+            method = rng.choices(methods, method_weights)[0]
+            payments.add(order_id, method, total, 0, rng.choice(employees), "PAID", closed_at)
+        if ticket_status:
+            tickets.add(order_id, ticket_status, created_at, created_at)
+        order_id += 1
+        # Parents before children, for the foreign keys
+        if items.pending >= COPY_CHUNK_ROWS:
+            flush_all()
+
+    def flush_all():
+        for buffer in (orders, items, payments, tickets):
+            buffer.flush()
+
+    started = time.perf_counter()
+    history = args.orders - args.open_orders
+    for i, created_at in enumerate(order_times(rng, history, args.days, now)):
+        add_order(created_at, "CANCELLED" if rng.random() < CANCELLED_SHARE else "PAID", None)
+        if i and i % 100_000 == 0:
+            print(f"   {i:,} orders ({time.perf_counter() - started:.0f}s)")
+
+    # Today's open orders: what the kitchen board and the cashier queue show
+    for i in range(args.open_orders):
+        status, ticket_status = OPEN_STATES[i % len(OPEN_STATES)]
+        add_order(now - timedelta(minutes=rng.randrange(1, 90)), status, ticket_status)
+
+    flush_all()
+    for table, column in (("orders", "order_id"), ("order_items", "order_item_id"),
+                          ("payments", "payment_id"), ("kitchen_orders", "kitchen_order_id")):
+        sync_sequence(cursor, table, column)
+    cursor.execute("""
+        UPDATE tables SET status = 'OCCUPIED'
+        WHERE table_id IN (SELECT table_id FROM orders WHERE order_id >= %s
+                           AND status NOT IN ('PAID', 'CANCELLED'))
+    """, (first_order_id,))
+    conn.commit()
+    print(f"   COPY: {orders.total:,} orders, {items.total:,} items, {payments.total:,} payments, "
+          f"{tickets.total:,} kitchen tickets in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    rebuild(cursor)
+    conn.commit()
+    print(f"   Rollups rebuilt in {time.perf_counter() - started:.1f}s")
+
+    conn.autocommit = True
+    for table in ("tables", "menu_items", "orders", "order_items", "payments", "kitchen_orders"):
+        cursor.execute(f"ANALYZE {table}")
+    cursor.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365, help="history spread over this many days")
+    parser.add_argument("--open-orders", type=int, default=150, help="unpaid orders created today")
+    parser.add_argument("--tables", type=int, default=60)
+    parser.add_argument("--menu-items", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.open_orders > args.orders:
+        parser.error("--open-orders cannot exceed --orders")
+
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        print(f" Generating {args.orders:,} orders over {args.days} days...")
+        generate(conn, args)
+        print("✅ Done")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# backend/benchmarks/kitchen_board.py
+"""
+Kitchen board: legacy N+1 build vs the single-query build in routes/kitchen.py
+
+    cd backend && python -m benchmarks.kitchen_board [--tickets 10 40 100] [--items 3]
+
+Tickets are inserted inside a transaction that is rolled back at the end,
+so the benchmark can run against a development database.
+"""
+import argparse
+from config.database import get_db_connection
+from routes.kitchen import fetch_kitchen_board
+from utils.schema_registry import schema
+from benchmarks.common import counting_cursor, measure, print_table
+
+def legacy_kitchen_board(cursor) -> list:
+    """The pre-aggregation implementation: 1 + 2N queries"""
+    cursor.execute(f"""
+        SELECT ko.*, o.order_id, o.total_amount, o.created_at as order_time,
+               t.table_number
+        FROM kitchen_orders ko
+        JOIN orders o ON ko.order_id = o.order_id
+        JOIN {schema.tables} t ON o.table_id = t.table_id
+        WHERE 1=1 AND ko.status != 'COMPLETED'
+        ORDER BY ko.updated_at ASC, o.created_at ASC
+    """)
+    orders = cursor.fetchall()
+    for order in orders:
+        cursor.execute("""
+            SELECT oi.*, m.item_name, m.description
+            FROM order_items oi
+            JOIN menu_items m ON oi.item_id = m.item_id
+            WHERE oi.order_id = %s
+        """, (order['order_id'],))
+        order['items'] = cursor.fetchall()
+        cursor.execute("""
+            SELECT EXTRACT(EPOCH FROM (NOW() - o.created_at))/60 as elapsed_minutes
+            FROM orders o
+            WHERE o.order_id = %s
+        """, (order['order_id'],))
+        time_result = cursor.fetchone()
+        order['elapsed_minutes'] = int(time_result['elapsed_minutes']) if time_result else 0
+    return orders
+
+def seed_tickets(cursor, count: int, items_per_ticket: int):
+    """Insert `count` open kitchen tickets with `items_per_ticket` lines each"""
+    cursor.execute(f"SELECT table_id FROM {schema.tables} ORDER BY table_id LIMIT 1")
+    table_id = cursor.fetchone()['table_id']
+    cursor.execute("SELECT item_id, price FROM menu_items ORDER BY item_id LIMIT %s", (items_per_ticket,))
+    menu = cursor.fetchall()
+    if not menu:
+        raise SystemExit("menu_items is empty - seed the database first")
+
+    cursor.execute("""
+        WITH new_orders AS (
+            INSERT INTO orders (table_id, total_amount, status, created_at)
+            SELECT %s, 0, 'PENDING', NOW() - (g || ' minutes')::interval
+            FROM generate_series(1, %s) g
+            RETURNING order_id
+        ),
+        new_items AS (
+            INSERT INTO order_items (order_id, item_id, quantity, unit_price, subtotal)
+            SELECT n.order_id, m.item_id, 1, m.price, m.price
+            FROM new_orders n
+            CROSS JOIN (SELECT unnest(%s::int[]) as item_id, unnest(%s::numeric[]) as price) m
+        )
+        INSERT INTO kitchen_orders (order_id, status)
+        SELECT order_id, 'WAITING' FROM new_orders
+    """, (table_id, count, [m['item_id'] for m in menu], [m['price'] for m in menu]))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickets", type=int, nargs="+", default=[1, 10, 40, 100])
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    rows = []
+    try:
+        cursor = counting_cursor(conn)
+        # Same dining-tables relation as the router (utils/startup.py resolves it for the app)
+        schema.resolve(cursor)
+        seeded = 0
+        for target in sorted(args.tickets):
+            seed_tickets(cursor, target - seeded, args.items)
+            seeded = target
+
+            for name, build in (("legacy", legacy_kitchen_board), ("single-query", fetch_kitchen_board)):
+                conn.query_count = 0
+                board = build(cursor)
+                queries = conn.query_count
+                timing = measure(lambda: build(cursor), args.repeat)
+                rows.append((target, name, len(board), queries,
+                             f"{timing['p50']:.2f}", f"{timing['p95']:.2f}"))
+    finally:
+        conn.rollback()
+        conn.close()
+
+    print_table(["seeded", "build", "tickets", "queries", "p50 ms", "p95 ms"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# backend/benchmarks/loadtest.py
+"""
+Lunch-rush load test against a running API, with a stored baseline to compare runs
+
+    cd backend && python -m benchmarks.loadtest --base-url http://localhost:8000 --duration 120
+    cd backend && python -m benchmarks.loadtest --save benchmarks/results/before.json
+    cd backend && python -m benchmarks.loadtest --compare benchmarks/results/before.json
+
+Traffic model (all rates adjustable):
+  - QR customers arrive at --orders-per-minute (Poisson, open loop: a slow
+    server does not slow down arrivals). Each one loads /api/menu/public,
+    then posts /api/orders/public with an Idempotency-Key.
+  - --kitchen-screens poll /api/kitchen every --kitchen-interval seconds
+  - --cashiers poll /api/cashier/pending every --cashier-interval seconds
+  - --managers reload /api/dashboard/stats every --manager-interval seconds
+
+Reports p50/p95/p99 latency, throughput and errors per endpoint. With
+--compare, a p95 more than --tolerance above the baseline (or a higher error
+rate) is flagged and the exit code is 1, so it can gate a CI job.
+Seed a throwaway database with benchmarks.datagen first: orders are created.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+import httpx
+from benchmarks.common import print_table
+
+class Recorder:
+    """Latency samples (ms) and error counts per endpoint label"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.samples.setdefault(label, []).append((time.perf_counter() - start) * 1000)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return response if ok else None
+
+    def summary(self, elapsed: float) -> dict:
+        result = {}
+        for label, samples in sorted(self.samples.items()):
+            samples.sort()
+            pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))]
+            result[label] = {
+                "requests": len(samples),
+                "errors": self.errors.get(label, 0),
+                "rps": round(len(samples) / elapsed, 2),
+                "p50": round(pick(0.50), 2),
+                "p95": round(pick(0.95), 2),
+                "p99": round(pick(0.99), 2),
+                "max": round(samples[-1], 2),
+            }
+        return result
+
+# ==================== ACTORS ====================
+
+async def poller(client, recorder, label, url, interval, headers, deadline):
+    # Spread the screens so they do not all fire on the same tick
+    await asyncio.sleep(min(random.uniform(0, interval), deadline - time.monotonic()))
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        await recorder.call(client, label, "GET", url, headers=headers)
+        next_poll = started + interval
+        await asyncio.sleep(max(0.0, min(next_poll, deadline) - time.monotonic()))
+
+async def customer(client, recorder, table_numbers):
+    response = await recorder.call(client, "GET /api/menu/public", "GET", "/api/menu/public")
+    if response is None:
+        return
+    menu = response.json().get("data") or []
+    if not menu:
+        return
+    items = [
+        {"item_id": m["item_id"], "quantity": random.choice((1, 1, 1, 2)), "price": float(m["price"])}
+        for m in random.sample(menu, k=min(len(menu), random.randint(1, 5)))
+    ]
+    await recorder.call(
+        client, "POST /api/orders/public", "POST", "/api/orders/public",
+        headers={"Idempotency-Key": str(uuid.uuid4())},
+        json={
+            "table_number": random.choice(table_numbers),
+            "customer_name": "Khách load test",
+            "items": items,
+            "total_amount": sum(i["price"] * i["quantity"] for i in items),
+        },
+    )
+
+async def customer_arrivals(client, recorder, per_minute, table_numbers, deadline):
+    tasks = set()
+    rate = per_minute / 60
+    while rate > 0:
+        gap = random.expovariate(rate)
+        if time.monotonic() + gap >= deadline:
+            break
+        await asyncio.sleep(gap)
+        task = asyncio.create_task(customer(client, recorder, table_numbers))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    response = await client.post("/api/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        headers = await login(client, args.username, args.password)
+        tables = (await client.get("/api/tables", headers=headers)).json().get("data") or []
+        table_numbers = [t.get("table_number", t.get("number")) for t in tables] or [1]
+
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+        actors = [customer_arrivals(client, recorder, args.orders_per_minute, table_numbers, deadline)]
+        actors += [poller(client, recorder, "GET /api/kitchen", "/api/kitchen",
+                          args.kitchen_interval, headers, deadline) for _ in range(args.kitchen_screens)]
+        actors += [poller(client, recorder, "GET /api/cashier/pending", "/api/cashier/pending",
+                          args.cashier_interval, headers, deadline) for _ in range(args.cashiers)]
+        actors += [poller(client, recorder, "GET /api/dashboard/stats", "/api/dashboard/stats",
+                          args.manager_interval, headers, deadline) for _ in range(args.managers)]
+
+        started = time.monotonic()
+        await asyncio.gather(*actors)
+        elapsed = time.monotonic() - started
+
+    return {
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "base_url": args.base_url,
+        "duration_s": round(elapsed, 1),
+        "scenario": {k: getattr(args, k) for k in (
+            "orders_per_minute", "kitchen_screens", "kitchen_interval", "cashiers",
+            "cashier_interval", "managers", "manager_interval")},
+        "endpoints": recorder.summary(elapsed),
+    }
+
+# ==================== REPORT ====================
+
+def pct_change(new: float, old: float) -> str:
+    return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Rows for the comparison table; the last column says whether it regressed"""
+    rows = []
+    for label, new in result["endpoints"].items():
+        old = baseline["endpoints"].get(label)
+        if old is None:
+            rows.append([label, "-", new["p95"], "new", "-", new["rps"], ""])
+            continue
+        new_error_rate = new["errors"] / new["requests"]
+        old_error_rate = old["errors"] / old["requests"] if old["requests"] else 0
+        regressed = new["p95"] > old["p95"] * (1 + tolerance) or new_error_rate > old_error_rate
+        rows.append([label, old["p95"], new["p95"], pct_change(new["p95"], old["p95"]),
+                     old["rps"], new["rps"], "REGRESSED" if regressed else "ok"])
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--orders-per-minute", type=float, default=60)
+    parser.add_argument("--kitchen-screens", type=int, default=4)
+    parser.add_argument("--kitchen-interval", type=float, default=3)
+    parser.add_argument("--cashiers", type=int, default=3)
+    parser.add_argument("--cashier-interval", type=float, default=5)
+    parser.add_argument("--managers", type=int, default=1)
+    parser.add_argument("--manager-interval", type=float, default=15)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--save", type=Path, help="write the results (JSON) to this file")
+    parser.add_argument("--compare", type=Path, help="baseline JSON from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95 increase (0.15 = 15%%)")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    result = asyncio.run(run(args))
+
+    print(f"{result['duration_s']}s against {result['base_url']}")
+    print_table(
+        ["endpoint", "requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms"],
+        [[label, e["requests"], e["errors"], e["rps"], e["p50"], e["p95"], e["p99"], e["max"]]
+         for label, e in result["endpoints"].items()]
+    )
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(result, indent=2))
+        print(f"\nSaved to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        rows = compare(result, baseline, args.tolerance)
+        print(f"\nBaseline {args.compare} ({baseline['run_at']}), tolerance {args.tolerance:.0%}")
+        print_table(["endpoint", "p95 before", "p95 now", "change", "req/s before", "req/s now", ""], rows)
+        if any(row[-1] == "REGRESSED" for row in rows):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
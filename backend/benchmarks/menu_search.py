@@ -0,0 +1,74 @@
+# backend/benchmarks/menu_search.py
+"""
+Menu search: ILIKE '%x%' vs utils/menu_search.py as the catalog grows
+
+    cd backend && python -m benchmarks.menu_search [--sizes 100 1000 5000]
+
+Synthetic items are inserted in one transaction that is rolled back at the
+end. Reports which search path is active (PostgreSQL or in-memory fallback).
+"""
+import argparse
+from config.database import get_db_connection
+from utils.menu_search import MenuSearch
+from benchmarks.common import measure, print_table
+
+WORDS = ["Phở", "Bún", "Cơm", "Bánh", "Gỏi", "Chả", "Cá", "Gà", "Bò", "Heo", "Tôm", "Mực",
+         "Đậu", "Rau", "Nướng", "Chiên", "Xào", "Hấp", "Kho", "Sốt", "Cay", "Giòn", "Trứng", "Sữa"]
+QUERIES = ["pho", "banh", "ga nuong", "dau", "tom chien gion"]
+
+def seed_items(cursor, count: int):
+    """Names built from Vietnamese dish words, e.g. 'Bò Nướng Cay 123'"""
+    cursor.execute("""
+        INSERT INTO menu_items (category_id, item_name, description, price, status)
+        SELECT (SELECT MIN(category_id) FROM categories),
+               w[1 + g %% 24] || ' ' || w[1 + (g / 24) %% 24] || ' ' || w[1 + (g * 13) %% 24] || ' ' || g,
+               'Món ' || w[1 + (g * 7) %% 24] || ' ' || w[1 + (g * 11) %% 24],
+               10000 + g, 'AVAILABLE'
+        FROM generate_series(1, %s) g, (SELECT %s::text[] AS w) words
+    """, (count, WORDS))
+    cursor.execute("ANALYZE menu_items")
+
+def legacy_search(cursor, query: str):
+    cursor.execute("""
+        SELECT m.item_id FROM menu_items m
+        WHERE (m.item_name ILIKE %s OR m.description ILIKE %s)
+        ORDER BY m.item_name
+    """, (f"%{query}%", f"%{query}%"))
+    return cursor.fetchall()
+
+def new_search(cursor, search: MenuSearch, query: str):
+    where_sql, where_params, order_sql, order_params = search.clause(cursor, query)
+    cursor.execute("SELECT m.item_id FROM menu_items m WHERE TRUE" + where_sql + order_sql,
+                   where_params + order_params)
+    return cursor.fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    rows = []
+    try:
+        cursor = conn.cursor()
+        seeded = 0
+        for size in sorted(args.sizes):
+            seed_items(cursor, size - seeded)
+            seeded = size
+            # New instance so the fallback index is rebuilt for this catalog size
+            search = MenuSearch(check_interval=3600)
+            mode = "postgres" if search.sql_available(cursor) else "fallback"
+            for query in QUERIES:
+                legacy = measure(lambda: legacy_search(cursor, query), args.repeat)
+                found = len(new_search(cursor, search, query))
+                new = measure(lambda: new_search(cursor, search, query), args.repeat)
+                rows.append((size, query, f"{legacy['p50']:.2f}", f"{new['p50']:.2f}", found, mode))
+    finally:
+        conn.rollback()
+        conn.close()
+
+    print_table(["items", "query", "ILIKE p50 ms", "search p50 ms", "hits", "path"], rows)
+
+if __name__ == "__main__":
+    main()
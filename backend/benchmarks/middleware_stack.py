@@ -0,0 +1,135 @@
+# backend/benchmarks/middleware_stack.py
+"""
+CORS middleware stack: the old main.py setup vs middleware/cors.py
+
+    cd backend && python -m benchmarks.middleware_stack [--requests 5000] [--body-kb 1 64]
+
+The old stack was Starlette's CORSMiddleware + an @app.middleware("http")
+add_cors function (BaseHTTPMiddleware) + a catch-all OPTIONS route. Both
+stacks wrap the same trivial endpoint and are called as ASGI apps directly,
+with no server and no database, so the difference is middleware overhead only.
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
+from fastapi.responses import JSONResponse
+from middleware.cors import CORSMiddleware, CORSPolicy
+from benchmarks.common import print_table
+
+ORIGIN = b"https://menu.nhahang.vn"
+
+def endpoint_app(body: bytes) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return Response(content=body, media_type="application/json")
+
+    return app
+
+def legacy_stack(body: bytes) -> FastAPI:
+    app = endpoint_app(body)
+    app.add_middleware(StarletteCORSMiddleware, allow_origins=["*"], allow_credentials=True,
+                       allow_methods=["*"], allow_headers=["*"])
+
+    @app.middleware("http")
+    async def add_cors(request: Request, call_next):
+        response = await call_next(request)
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        response.headers["Access-Control-Allow-Methods"] = "*"
+        response.headers["Access-Control-Allow-Headers"] = "*"
+        return response
+
+    @app.options("/{full_path:path}")
+    async def options_handler(full_path: str):
+        return JSONResponse(content={"ok": True}, headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "*",
+            "Access-Control-Allow-Headers": "*",
+        })
+
+    return app
+
+def pure_asgi_stack(body: bytes) -> FastAPI:
+    app = endpoint_app(body)
+    app.add_middleware(CORSMiddleware, policy=CORSPolicy(allow_origins=("*",)))
+    return app
+
+def scope(method: str, headers: list) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": "/api/ping", "raw_path": b"/api/ping",
+        "root_path": "", "query_string": b"", "headers": headers,
+        "client": ("127.0.0.1", 5000), "server": ("127.0.0.1", 8000),
+    }
+
+async def call(app, request_scope: dict) -> int:
+    status = 0
+    body_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a client: hang up once the whole response has arrived
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    await app(request_scope, receive, send)
+    return status
+
+async def measure(app, request_scope: dict, requests: int) -> dict:
+    for _ in range(200):
+        await call(app, dict(request_scope))
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await call(app, dict(request_scope))
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    samples.sort()
+    return {"p50": samples[len(samples) // 2], "p99": samples[int(len(samples) * 0.99)],
+            "status": await call(app, dict(request_scope))}
+
+async def run(requests: int, body_sizes: list):
+    cases = [
+        ("GET, no Origin", "GET", [(b"host", b"api")]),
+        ("GET + Origin", "GET", [(b"host", b"api"), (b"origin", ORIGIN)]),
+        ("preflight", "OPTIONS", [(b"host", b"api"), (b"origin", ORIGIN),
+                                  (b"access-control-request-method", b"POST"),
+                                  (b"access-control-request-headers", b"authorization,content-type")]),
+    ]
+    rows = []
+    for kb in body_sizes:
+        body = b'{"data":"' + b"x" * (kb * 1024) + b'"}'
+        stacks = [("old: CORSMiddleware + add_cors", legacy_stack(body)),
+                  ("pure ASGI", pure_asgi_stack(body))]
+        for case, method, headers in cases:
+            if case == "preflight" and kb != body_sizes[0]:
+                continue
+            results = [(name, await measure(app, scope(method, headers), requests)) for name, app in stacks]
+            base = results[0][1]["p50"]
+            for name, r in results:
+                rows.append([f"{kb} KB" if case != "preflight" else "-", case, name, r["status"],
+                             f"{r['p50']:.0f}", f"{r['p99']:.0f}", f"{base / r['p50']:.1f}x"])
+    print_table(["body", "request", "stack", "status", "p50 µs", "p99 µs", "speedup"], rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--body-kb", type=int, nargs="+", default=[1, 64])
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.body_kb))
+
+if __name__ == "__main__":
+    main()
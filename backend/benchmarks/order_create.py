@@ -0,0 +1,77 @@
+# backend/benchmarks/order_create.py
+"""
+Order creation: per-item INSERT loop vs the batched insert in routes/order.py
+
+    cd backend && python -m benchmarks.order_create [--items 1 10 50]
+
+Replays the statements of create_public_order; every run is rolled back,
+so no orders are left behind.
+"""
+import argparse
+from config.database import get_db_connection
+from routes.order import insert_order_items, PublicOrderItem
+from benchmarks.common import counting_cursor, measure, print_table
+
+def legacy_insert_order_items(cursor, order_id: int, items):
+    for item in items:
+        cursor.execute("""
+            INSERT INTO order_items (order_id, item_id, quantity, unit_price, subtotal)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (order_id, item.item_id, item.quantity, item.price, item.price * item.quantity))
+
+def create_order_transaction(conn, cursor, table_number: int, items, insert_items):
+    """Same statements as create_public_order, rolled back at the end"""
+    try:
+        cursor.execute("SELECT table_id, status FROM dining_tables WHERE table_number = %s", (table_number,))
+        table_id = cursor.fetchone()['table_id']
+        cursor.execute("""
+            INSERT INTO orders (table_id, customer_name, total_amount, status, notes)
+            VALUES (%s, %s, %s, 'PENDING', %s)
+            RETURNING order_id
+        """, (table_id, "benchmark", sum(i.price * i.quantity for i in items), None))
+        order_id = cursor.fetchone()['order_id']
+        insert_items(cursor, order_id, items)
+        cursor.execute("UPDATE dining_tables SET status = 'OCCUPIED' WHERE table_id = %s", (table_id,))
+        cursor.execute("INSERT INTO kitchen_orders (order_id, status) VALUES (%s, 'WAITING')", (order_id,))
+    finally:
+        conn.rollback()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    rows = []
+    try:
+        cursor = counting_cursor(conn)
+        cursor.execute("SELECT table_number FROM dining_tables ORDER BY table_number LIMIT 1")
+        table_number = cursor.fetchone()['table_number']
+        cursor.execute("SELECT item_id, price FROM menu_items ORDER BY item_id")
+        menu = cursor.fetchall()
+        conn.rollback()
+        if not menu:
+            raise SystemExit("menu_items is empty - seed the database first")
+
+        for count in args.items:
+            items = [
+                PublicOrderItem(item_id=menu[i % len(menu)]['item_id'], quantity=1 + i % 3,
+                                price=float(menu[i % len(menu)]['price']))
+                for i in range(count)
+            ]
+            for name, insert_items in (("per-item", legacy_insert_order_items), ("batched", insert_order_items)):
+                run = lambda: create_order_transaction(conn, cursor, table_number, items, insert_items)
+                conn.query_count = 0
+                run()
+                queries = conn.query_count
+                timing = measure(run, args.repeat)
+                rows.append((count, name, queries, f"{timing['p50']:.2f}", f"{timing['p95']:.2f}"))
+    finally:
+        conn.rollback()
+        conn.close()
+
+    print_table(["items", "insert", "statements", "p50 ms", "p95 ms"], rows)
+
+if __name__ == "__main__":
+    main()
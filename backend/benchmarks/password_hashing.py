@@ -0,0 +1,80 @@
+# backend/benchmarks/password_hashing.py
+"""
+Login storm: event-loop stalls with inline bcrypt vs utils/hashing.py
+
+    cd backend && python -m benchmarks.password_hashing [--logins 8 32] [--rounds 12]
+
+A ticker coroutine stands in for the kitchen screen / cashier polling on the
+same worker: it wakes every 10 ms and records how late it was. No database
+is needed.
+"""
+import argparse
+import asyncio
+import time
+import bcrypt
+from starlette.concurrency import run_in_threadpool
+from utils.hashing import PasswordHasher
+from benchmarks.common import print_table
+
+TICK_SECONDS = 0.010
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append((time.perf_counter() - start - TICK_SECONDS) * 1000)
+
+async def storm(verify, logins: int) -> dict:
+    stop = asyncio.Event()
+    lags = []
+    tick_task = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(verify() for _ in range(logins)))
+    elapsed = (time.perf_counter() - start) * 1000
+    stop.set()
+    await tick_task
+    lags.sort()
+    return {
+        "total": elapsed,
+        "lag_p99": lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else elapsed,
+        "lag_max": lags[-1] if lags else elapsed,
+    }
+
+async def run(logins_list: list, rounds: int):
+    hashed = bcrypt.hashpw(b"matkhau123", bcrypt.gensalt(rounds)).decode()
+    hasher = PasswordHasher(rounds=rounds)
+    hasher.start()
+
+    async def inline():
+        # What an `async def` login did before: CPU work on the event loop
+        bcrypt.checkpw(b"matkhau123", hashed.encode())
+
+    async def threadpool():
+        await run_in_threadpool(bcrypt.checkpw, b"matkhau123", hashed.encode())
+
+    async def process_pool():
+        await hasher.verify("matkhau123", hashed)
+
+    rows = []
+    try:
+        for logins in logins_list:
+            for name, fn in [("inline", inline), ("threadpool", threadpool), ("process pool", process_pool)]:
+                r = await storm(fn, logins)
+                rows.append([logins, name, f"{r['total']:.0f}", f"{r['lag_p99']:.1f}", f"{r['lag_max']:.1f}"])
+    finally:
+        stats = hasher.stats()
+        hasher.shutdown()
+
+    print(f"bcrypt rounds={rounds}, hashing workers={stats['workers']}, peak queue={stats['peak_in_flight']}")
+    print_table(["logins", "mode", "total ms", "loop lag p99 ms", "loop lag max ms"], rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    asyncio.run(run(args.logins, args.rounds))
+
+if __name__ == "__main__":
+    main()
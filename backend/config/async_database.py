@@ -0,0 +1,102 @@
+# backend/config/async_database.py
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+import asyncpg
+from config.database import DATABASE_CONFIG
+from utils.metrics import record_query
+
+# Separate pool for `async def` handlers; queries use $1, $2 ... placeholders
+ASYNC_POOL_CONFIG = {
+    "min_size": int(os.getenv("DB_ASYNC_POOL_MIN", "2")),
+    "max_size": int(os.getenv("DB_ASYNC_POOL_MAX", "10")),
+    # Idle connections are closed after this many seconds
+    "max_inactive_connection_lifetime": float(os.getenv("DB_ASYNC_POOL_MAX_IDLE", "300")),
+    # Per-statement timeout in seconds
+    "command_timeout": float(os.getenv("DB_ASYNC_COMMAND_TIMEOUT", "30")),
+}
+
+_CONNECT_ARGS = {
+    "host": DATABASE_CONFIG["host"],
+    "port": int(DATABASE_CONFIG["port"]),
+    "database": DATABASE_CONFIG["database"],
+    "user": DATABASE_CONFIG["user"],
+    "password": DATABASE_CONFIG["password"],
+    "timeout": DATABASE_CONFIG["connect_timeout"],
+}
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+async def get_async_pool() -> asyncpg.Pool:
+    """Return the asyncpg pool of this worker, creating it on first use"""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(**_CONNECT_ARGS, **ASYNC_POOL_CONFIG)
+    return _pool
+
+async def connect() -> asyncpg.Connection:
+    """Open a dedicated connection outside the pool (e.g. for LISTEN)"""
+    return await asyncpg.connect(**_CONNECT_ARGS)
+
+async def close_async_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+def get_async_pool_stats() -> dict:
+    if _pool is None:
+        return {"size": 0, "idle": 0, "in_use": 0,
+                "min_size": ASYNC_POOL_CONFIG["min_size"], "max_size": ASYNC_POOL_CONFIG["max_size"]}
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    return {
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+    }
+
+# ==================== QUERY HELPERS ====================
+# Rows are returned as plain dicts so handlers can use them the same way
+# as RealDictCursor rows from the psycopg2 path.
+
+async def _timed(query: str, awaitable):
+    """Await a pool call and report it to utils.metrics like the psycopg2 cursor does"""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        record_query(query, time.perf_counter() - start)
+
+async def fetch(query: str, *args) -> list:
+    pool = await get_async_pool()
+    rows = await _timed(query, pool.fetch(query, *args))
+    return [dict(row) for row in rows]
+
+async def fetchrow(query: str, *args) -> Optional[dict]:
+    pool = await get_async_pool()
+    row = await _timed(query, pool.fetchrow(query, *args))
+    return dict(row) if row is not None else None
+
+async def fetchval(query: str, *args):
+    pool = await get_async_pool()
+    return await _timed(query, pool.fetchval(query, *args))
+
+async def execute(query: str, *args) -> str:
+    pool = await get_async_pool()
+    return await _timed(query, pool.execute(query, *args))
+
+@asynccontextmanager
+async def transaction():
+    """Acquire a connection and run the block in one transaction"""
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            yield conn
@@ -1,33 +1,363 @@
 # backend/config/database.py
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
+from collections import deque
+import threading
+import time
 import os
 from dotenv import load_dotenv
+from utils.log import get_logger
+from utils.metrics import record_query
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 DATABASE_CONFIG = {
     "host": os.getenv("DB_HOST", "localhost"),
     "database": os.getenv("DB_NAME", "DB"),
     "user": os.getenv("DB_USER", "postgres"),
     "password": os.getenv("DB_PASSWORD", "123456"),
-    "port": os.getenv("DB_PORT", "5432")
+    "port": os.getenv("DB_PORT", "5432"),
+    # Seconds; an unreachable database fails fast instead of hanging startup
+    "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
 }
 
-def get_db_connection():
-    """Create and return a database connection"""
-    try:
-        conn = psycopg2.connect(**DATABASE_CONFIG, cursor_factory=RealDictCursor)
+# ==================== POOL CONFIG ====================
+
+POOL_CONFIG = {
+    "min_size": int(os.getenv("DB_POOL_MIN", "2")),
+    "max_size": int(os.getenv("DB_POOL_MAX", "20")),
+    # Seconds a caller waits for a free connection before failing
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    # Connections older than this are closed instead of reused
+    "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+    # Idle connections older than this get a SELECT 1 before checkout
+    "health_check_after": float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30")),
+}
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that reports each statement's time to utils.metrics"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(query, time.perf_counter() - start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_query(query, time.perf_counter() - start)
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+class PooledConnection(extensions.connection):
+    """psycopg2 connection owned by a ConnectionPool; borrowers get a ConnectionLease"""
+
+    _pool = None
+    _created_at = 0.0
+    _returned_at = 0.0
+
+    def discard(self):
+        """Really close the underlying socket"""
+        self._pool = None
+        self.close()
+
+class ConnectionLease:
+    """
+    One checkout of a pooled connection; everything except close() goes to the connection
+
+    close() returns the connection once and detaches this lease, so a stale
+    close() cannot hand back a connection another request has checked out
+    since. A broken connection goes back too: putconn() discards it and frees
+    its slot.
+    """
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn: PooledConnection):
+        object.__setattr__(self, "_conn", conn)
+
+    def _connection(self) -> PooledConnection:
+        conn = object.__getattribute__(self, "_conn")
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already closed")
+        return conn
+
+    def __getattr__(self, name):
+        return getattr(self._connection(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection(), name, value)
+
+    def __enter__(self):
+        self._connection().__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._connection().__exit__(*exc)
+
+    @property
+    def closed(self) -> int:
+        conn = object.__getattribute__(self, "_conn")
+        return 1 if conn is None else conn.closed
+
+    def close(self):
+        conn = object.__getattribute__(self, "_conn")
+        if conn is None:
+            return
+        object.__setattr__(self, "_conn", None)
+        conn._pool.putconn(conn)
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool
+
+    - keeps between min_size and max_size connections
+    - checks connections on checkout (closed/broken, idle too long -> SELECT 1)
+    - retires connections older than max_lifetime
+    - exposes counters through stats()
+    """
+
+    def __init__(self, dsn_kwargs: dict, min_size: int = 2, max_size: int = 20,
+                 timeout: float = 10.0, max_lifetime: float = 1800.0,
+                 health_check_after: float = 30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: need 0 <= min_size <= max_size, max_size >= 1")
+
+        self._dsn_kwargs = dsn_kwargs
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+
+        self._idle = deque()
+        self._size = 0  # open connections (idle + in use)
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
 
-        #  DEBUG: kiểm tra backend đang kết nối DB nào
-        cur = conn.cursor()
-        cur.execute("SELECT current_database();")
-        print(" Backend connected to DB:", cur.fetchone())
-        cur.close()
+        self._stats = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "checkout_waits": 0,
+            "checkout_timeouts": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+            "expired": 0,
+        }
+
+    # ---------- internal ----------
+
+    def _connect(self) -> PooledConnection:
+        conn = psycopg2.connect(
+            **self._dsn_kwargs,
+            connection_factory=PooledConnection,
+            cursor_factory=InstrumentedCursor,
+        )
+        conn._pool = self
+        conn._created_at = time.monotonic()
+        conn._returned_at = conn._created_at
         return conn
+
+    def _discard(self, conn: PooledConnection):
+        """Close a connection and free its slot. Caller must NOT hold the lock."""
+        try:
+            conn.discard()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["connections_closed"] += 1
+            self._cond.notify()
+
+    def _is_expired(self, conn: PooledConnection, now: float) -> bool:
+        return self.max_lifetime > 0 and now - conn._created_at > self.max_lifetime
+
+    def _is_healthy(self, conn: PooledConnection, now: float) -> bool:
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if now - conn._returned_at < self.health_check_after:
+            return True
+
+        with self._cond:
+            self._stats["health_checks"] += 1
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    # ---------- public ----------
+
+    def warmup(self):
+        """Open connections until min_size is reached"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats["connections_created"] += 1
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def getconn(self) -> ConnectionLease:
+        """Check out a healthy connection, opening a new one if there is room"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+
+        while True:
+            conn = None
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["checkout_timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No database connection available within {self.timeout}s "
+                            f"(pool max_size={self.max_size})"
+                        )
+                    if not waited:
+                        self._stats["checkout_waits"] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["connections_created"] += 1
+                    self._stats["checkouts"] += 1
+                return ConnectionLease(conn)
+
+            now = time.monotonic()
+            if self._is_expired(conn, now):
+                with self._cond:
+                    self._stats["expired"] += 1
+                self._discard(conn)
+                continue
+            if not self._is_healthy(conn, now):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+            return ConnectionLease(conn)
+
+    def putconn(self, conn: PooledConnection):
+        """Return a connection (ConnectionLease.close() calls this); unfinished transactions are rolled back"""
+        if conn.closed:
+            # Broken (server restart, network drop): free its slot
+            self._discard(conn)
+            return
+
+        try:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        now = time.monotonic()
+        with self._cond:
+            keep = not self._closed and not self._is_expired(conn, now)
+            if keep:
+                conn._returned_at = now
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+            if not self._closed:
+                self._stats["expired"] += 1
+
+        self._discard(conn)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DATABASE_CONFIG, **POOL_CONFIG)
+    return _pool
+
+def get_pool_stats() -> dict:
+    """Pool counters, or empty stats if the pool was never created"""
+    if _pool is None:
+        return {"size": 0, "idle": 0, "in_use": 0, **POOL_CONFIG}
+    return _pool.stats()
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+def get_db_connection():
+    """Check out a pooled database connection; conn.close() returns it to the pool"""
+    try:
+        return get_pool().getconn()
     except Exception as e:
-        print(f"Error connecting to database: {e}")
+        logger.error("Error connecting to database: %s", e)
         raise
+
 def get_db():
     """Generator function for database connection (FastAPI dependency)"""
     conn = get_db_connection()
@@ -35,14 +365,3 @@ def get_db():
         yield conn
     finally:
         conn.close()
-# Test connection on import
-try:
-    test_conn = get_db_connection()
-    cursor = test_conn.cursor()
-    cursor.execute("SELECT NOW()")
-    result = cursor.fetchone()
-    print(f"Database connected successfully at: {result['now']}")
-    cursor.close()
-    test_conn.close()
-except Exception as e:
-    print(f"Database connection failed: {e}")
\ No newline at end of file
@@ -0,0 +1,20 @@
+# backend/conftest.py
+"""
+Shared pytest fixtures
+
+    cd backend && python migrate.py && python -m pytest -q test_pool.py test_table_tokens.py ...
+
+Tests that need PostgreSQL (DB_* env, see config/database.py) are skipped when
+it cannot be reached.
+"""
+import psycopg2
+import pytest
+from config.database import DATABASE_CONFIG
+
+@pytest.fixture(scope="session")
+def database():
+    """Skip the test when the database is unreachable"""
+    try:
+        psycopg2.connect(**DATABASE_CONFIG).close()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL not reachable: {e}")
@@ -1,24 +1,46 @@
 # backend/main.py - WITH CASHIER ROUTER FIXED
+import time
+_import_started = time.perf_counter()
 
 from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
-import bcrypt
 from pydantic import BaseModel
+from config.database import get_pool_stats, close_pool
+from config.async_database import get_async_pool_stats, close_async_pool
+from utils.kitchen_events import broker as kitchen_event_broker
+from utils.hashing import password_hasher
+from utils.log import get_logger, shutdown_logging, stats as get_logging_stats
+from utils.metrics import metrics
+from utils.singleflight import single_flight_stats
+from middleware.metrics import MetricsMiddleware
+from middleware.cors import CORSMiddleware, cors_policy
+from utils.startup import startup_report, database_reachable
+import json
+import os
+import random
+
+logger = get_logger("main")
+
+# Share of 422 responses whose request body is logged (bodies can be large / personal)
+VALIDATION_BODY_SAMPLE_RATE = float(os.getenv("LOG_VALIDATION_BODY_SAMPLE_RATE", "0.01"))
+MAX_LOGGED_BODY_BYTES = 2048
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
-    print("\n" + "="*60)
-    print(" Restaurant API Starting...")
-    print("="*60)
-    print(f" Local: http://localhost:8000")
-    print(f" Docs: http://localhost:8000/docs")
-    print("="*60 + "\n")
+    logger.info("Restaurant API starting", extra={"docs": "http://localhost:8000/docs"})
+    # DB pools, schema probe, bcrypt workers, caches - see utils/startup.py
+    await startup_report.run()
     yield
-    print("\n Shutting down...\n")
+    logger.info("Shutting down")
+    await kitchen_event_broker.close()
+    password_hasher.shutdown()
+    close_pool()
+    await close_async_pool()
+    shutdown_logging()
 
 app = FastAPI(
     title="Restaurant Management API",
@@ -26,16 +48,16 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# CORS - Allow everything
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# CORS - pure ASGI, configured through CORS_* env vars (middleware/cors.py)
+app.add_middleware(CORSMiddleware)
+
+logger.info("CORS configured", extra={
+    "origins": "*" if cors_policy.allow_all else sorted(cors_policy.allow_origins),
+    "credentials": cors_policy.allow_credentials,
+})
 
-print(" CORS: Allow all origins")
+# Per-route latency / status / DB query metrics, served at GET /metrics
+app.add_middleware(MetricsMiddleware)
 
 # ==================== EXCEPTION HANDLERS ====================
 
@@ -43,24 +65,19 @@ print(" CORS: Allow all origins")
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle Pydantic validation errors"""
     
-    try:
-        body = await request.body()
-        body_str = body.decode('utf-8')
-    except:
-        body_str = "Unable to read body"
-    
-    print(f"\n{'='*70}")
-    print(f" VALIDATION ERROR")
-    print(f"{'='*70}")
-    print(f"URL: {request.url}")
-    print(f"Method: {request.method}")
-    print(f"Body: {body_str}")
-    print(f"\nErrors:")
-    for error in exc.errors():
-        print(f"  - Field: {'.'.join(str(x) for x in error['loc'])}")
-        print(f"    Error: {error['msg']}")
-        print(f"    Type: {error['type']}")
-    print(f"{'='*70}\n")
+    fields = {
+        "method": request.method,
+        "path": request.url.path,
+        "errors": [
+            {"field": '.'.join(str(x) for x in error['loc']), "msg": error['msg'], "type": error['type']}
+            for error in exc.errors()
+        ],
+    }
+    # Only a sample of bodies is logged. exc.body is what FastAPI already parsed;
+    # awaiting request.body() again here waits on a drained receive channel
+    if exc.body is not None and random.random() < VALIDATION_BODY_SAMPLE_RATE:
+        fields["body"] = json.dumps(jsonable_encoder(exc.body), ensure_ascii=False)[:MAX_LOGGED_BODY_BYTES]
+    logger.warning("Validation error", extra=fields)
     
     error_messages = []
     for error in exc.errors():
@@ -74,44 +91,23 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
             "message": "Dữ liệu không hợp lệ",
             "errors": error_messages,
             "detail": exc.errors()
-        },
-        headers={"Access-Control-Allow-Origin": "*"}
+        }
     )
 @app.exception_handler(404)
 async def not_found(request: Request, exc):
     return JSONResponse(
         status_code=404,
-        content={"error": "Not found", "path": str(request.url.path)},
-        headers={"Access-Control-Allow-Origin": "*"}
+        content={"error": "Not found", "path": str(request.url.path)}
     )
 
 @app.exception_handler(500)
 async def server_error(request: Request, exc):
-    print(f" 500 error: {exc}")
+    logger.error("500 error: %s", exc)
     return JSONResponse(
         status_code=500,
         content={"error": "Internal server error", "detail": str(exc)},
-        headers={"Access-Control-Allow-Origin": "*"}
-    )
-
-@app.middleware("http")
-async def add_cors(request: Request, call_next):
-    """Add CORS headers"""
-    response = await call_next(request)
-    response.headers["Access-Control-Allow-Origin"] = "*"
-    response.headers["Access-Control-Allow-Methods"] = "*"
-    response.headers["Access-Control-Allow-Headers"] = "*"
-    return response
-
-@app.options("/{full_path:path}")
-async def options_handler(full_path: str):
-    return JSONResponse(
-        content={"ok": True},
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        }
+        # Runs outside the middleware stack, so CORS headers are added here
+        headers=cors_policy.header_dict(request.headers.get("origin"))
     )
 
 @app.get("/")
@@ -120,21 +116,41 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "db_pool": get_pool_stats(),
+        "db_async_pool": get_async_pool_stats(),
+        "password_hasher": password_hasher.stats(),
+        "single_flight": single_flight_stats(),
+        "logging": get_logging_stats()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(
+        metrics.render(pools={"sync": get_pool_stats(), "async": get_async_pool_stats()}),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/ready")
+async def ready():
+    """Readiness: startup finished and the database answers (liveness stays on /health)"""
+    await startup_report.retry_if_due()
+    report = startup_report.as_dict()
+    db_ok = report["ready"] and await database_reachable()
+    return JSONResponse(
+        status_code=200 if db_ok else 503,
+        content={**report, "ready": db_ok, "database": db_ok}
+    )
 
 class PasswordHashRequest(BaseModel):
     password: str
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(
-        password.encode('utf-8'),
-        bcrypt.gensalt()
-    ).decode('utf-8')
-
 @app.post("/api/utils/hash-password")
-def create_hash(request: PasswordHashRequest):
+async def create_hash(request: PasswordHashRequest):
     """Generate password hash"""
-    hashed = hash_password(request.password)
+    hashed = await password_hasher.hash(request.password)
     return {
         "success": True,
         "password": request.password,
@@ -142,94 +158,20 @@ def create_hash(request: PasswordHashRequest):
     }
 
 # ==================== INCLUDE ROUTERS ====================
+# A router that fails to import is a broken deploy: let the worker fail to
+# boot instead of serving a partial API
 
-print("\n📦 Loading routers...")
-
-# Import and include auth router
-try:
-    from routes import auth
-    app.include_router(auth.router)
-    print(" Auth router loaded")
-except Exception as e:
-    print(f" Auth router failed: {e}")
-    import traceback
-    traceback.print_exc()
-
-# Import and include employees router
-try:
-    from routes import employees
-    app.include_router(employees.router)
-    print("Employees router loaded")
-except Exception as e:
-    print(f" Employees router failed: {e}")
-    import traceback
-    traceback.print_exc()
-
-# Import and include tables router
-try:
-    from routes import tables
-    app.include_router(tables.router)
-    print(" Tables router loaded")
-except Exception as e:
-    print(f"Tables router failed: {e}")
-    import traceback
-    traceback.print_exc()
-
-# Import and include dashboard router
-try:
-    from routes import dashboard
-    app.include_router(dashboard.router)
-    print("Dashboard router loaded")
-except Exception as e:
-    print(f" Dashboard router failed: {e}")
-    import traceback
-    traceback.print_exc()
-
-# Import and include payment router
-try:
-    from routes import payment
-    app.include_router(payment.router)
-    print(" Payment router loaded")
-except Exception as e:
-    print(f" Payment router failed: {e}")
-    import traceback
-    traceback.print_exc()
-
-# Import and include CASHIER router (CRITICAL FIX)
-try:
-    from routes import cashier
-    app.include_router(cashier.router)
-    print(" Cashier router loaded")
-except Exception as e:
-    print(f"Cashier router failed: {e}")
-    import traceback
-    traceback.print_exc()
-
-# Import other routers if they exist
-try:
-    from routes import menu, order, kitchen
-    
-    app.include_router(menu.router)
-    print(" Menu router loaded")
-    
-    app.include_router(order.router)
-    print(" Order router loaded")
-    
-    app.include_router(kitchen.router)
-    print(" Kitchen router loaded")
-except ImportError as e:
-    print(f"ℹ  Some routers not found: {e}")
+from routes import auth, employees, tables, dashboard, cashier, menu, order, kitchen
 
-print("\n" + "="*60)
-print(" All routers loaded successfully!")
-print("="*60 + "\n")
+for module in (auth, employees, tables, dashboard, cashier, menu, order, kitchen):
+    app.include_router(module.router)
+
+startup_report.record("imports", (time.perf_counter() - _import_started) * 1000)
 
 
 if __name__ == "__main__":
     import uvicorn
     
-    print("\n Starting server...\n")
-    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -0,0 +1,145 @@
+# backend/middleware/cors.py
+import os
+import re
+from typing import Optional
+
+def _env_list(name: str, default: str) -> tuple:
+    return tuple(v.strip() for v in os.getenv(name, default).split(",") if v.strip())
+
+# Comma-separated origins, or * for any (the QR menu is opened from anywhere)
+CORS_ALLOW_ORIGINS = _env_list("CORS_ALLOW_ORIGINS", "*")
+# Optional regex for origins, e.g. https://.*\.nhahang\.vn
+CORS_ALLOW_ORIGIN_REGEX = os.getenv("CORS_ALLOW_ORIGIN_REGEX") or None
+CORS_ALLOW_METHODS = _env_list("CORS_ALLOW_METHODS", "GET,POST,PUT,PATCH,DELETE,OPTIONS")
+CORS_ALLOW_CREDENTIALS = os.getenv("CORS_ALLOW_CREDENTIALS", "true").lower() == "true"
+# Response headers the frontend may read
+CORS_EXPOSE_HEADERS = _env_list("CORS_EXPOSE_HEADERS", "ETag,Retry-After,Idempotent-Replayed,X-Table-Number")
+# Seconds browsers may cache a preflight answer
+CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", "600"))
+
+# Bound on cached header sets (distinct origins / preflight header lists)
+_CACHE_LIMIT = 512
+
+class CORSPolicy:
+    """Which origins are allowed, and the ready-made header lists for them"""
+
+    def __init__(self, allow_origins=CORS_ALLOW_ORIGINS, allow_origin_regex=CORS_ALLOW_ORIGIN_REGEX,
+                 allow_methods=CORS_ALLOW_METHODS, allow_credentials=CORS_ALLOW_CREDENTIALS,
+                 expose_headers=CORS_EXPOSE_HEADERS, max_age=CORS_MAX_AGE):
+        self.allow_all = "*" in allow_origins
+        self.allow_origins = frozenset(o.rstrip("/") for o in allow_origins if o != "*")
+        self.allow_origin_regex = re.compile(allow_origin_regex) if allow_origin_regex else None
+        self.allow_credentials = allow_credentials
+        self.allow_methods = ", ".join(allow_methods).encode("latin-1")
+        self.expose_headers = ", ".join(expose_headers).encode("latin-1")
+        self.max_age = str(max_age).encode("latin-1")
+        self._simple = {}
+        self._preflight = {}
+
+    def is_allowed(self, origin: str) -> bool:
+        return (self.allow_all or origin in self.allow_origins
+                or (self.allow_origin_regex is not None and self.allow_origin_regex.fullmatch(origin) is not None))
+
+    def _allow_origin(self, origin: str) -> list:
+        # With credentials the browser rejects "*": echo the origin and say it varies
+        if self.allow_all and not self.allow_credentials:
+            return [(b"access-control-allow-origin", b"*")]
+        headers = [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin")]
+        if self.allow_credentials:
+            headers.append((b"access-control-allow-credentials", b"true"))
+        return headers
+
+    def simple_headers(self, origin: Optional[str]) -> list:
+        """Headers added to an actual response; [] when there is no / a disallowed origin"""
+        if not origin:
+            return []
+        headers = self._simple.get(origin)
+        if headers is None:
+            headers = self._allow_origin(origin) if self.is_allowed(origin) else []
+            if headers and self.expose_headers:
+                headers.append((b"access-control-expose-headers", self.expose_headers))
+            if len(self._simple) >= _CACHE_LIMIT:
+                self._simple.clear()
+            self._simple[origin] = headers
+        return headers
+
+    def header_dict(self, origin: Optional[str]) -> dict:
+        """simple_headers() for a Response(headers=...) built outside the middleware"""
+        return {k.decode("latin-1"): v.decode("latin-1") for k, v in self.simple_headers(origin)}
+
+    def preflight_headers(self, origin: str, request_headers: str) -> Optional[list]:
+        """Complete preflight answer, or None for a disallowed origin"""
+        key = (origin, request_headers)
+        headers = self._preflight.get(key)
+        if headers is None:
+            if not self.is_allowed(origin):
+                return None
+            headers = self._allow_origin(origin) + [
+                (b"access-control-allow-methods", self.allow_methods),
+                (b"access-control-max-age", self.max_age),
+            ]
+            if request_headers:
+                # Any request header is allowed; echo the list since "*" is
+                # not honoured together with credentials
+                headers.append((b"access-control-allow-headers", request_headers.encode("latin-1")))
+            if len(self._preflight) >= _CACHE_LIMIT:
+                self._preflight.clear()
+            self._preflight[key] = headers
+        return headers
+
+class CORSMiddleware:
+    """
+    Pure ASGI CORS: answers preflights itself, adds headers on response start
+
+    Unlike an @app.middleware("http") function it does not wrap the response
+    in a streaming proxy; requests without an Origin header pass straight through.
+    """
+
+    def __init__(self, app, policy: CORSPolicy = None):
+        self.app = app
+        self.policy = policy or cors_policy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_method = None
+        request_headers = ""
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value.decode("latin-1")
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value.decode("latin-1")
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = self.policy.preflight_headers(origin, request_headers)
+            if headers is None:
+                await send({"type": "http.response.start", "status": 400,
+                            "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+                await send({"type": "http.response.body", "body": b"Disallowed CORS origin"})
+                return
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extra = self.policy.simple_headers(origin)
+        if not extra:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+cors_policy = CORSPolicy()
@@ -0,0 +1,47 @@
+# backend/middleware/metrics.py
+import time
+from utils.log import get_logger, SAMPLED
+from utils.metrics import UNMATCHED_ROUTE, begin_request, end_request, metrics
+
+logger = get_logger(__name__)
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: latency, status code, in-flight and DB counters per route
+
+    Routes are labelled with their template (/api/orders/{order_id}), taken from
+    scope["route"] which FastAPI sets when it matches, so path parameters do not
+    create one series per id.
+    """
+
+    def __init__(self, app, registry=metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats, token = begin_request()
+        self.registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.registry.in_flight -= 1
+            end_request(token)
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.registry.observe(scope["method"], route, status_code, elapsed, stats)
+            logger.debug("Request handled", extra={
+                **SAMPLED, "method": scope["method"], "route": route, "status": status_code,
+                "ms": round(elapsed * 1000, 1), "queries": stats.queries})
@@ -0,0 +1,65 @@
+# backend/migrate.py
+"""
+Apply SQL migrations in backend/migrations/ in file-name order
+
+    cd backend && python migrate.py          # apply pending migrations
+    cd backend && python migrate.py --list   # show applied / pending
+
+Applied files are recorded in schema_migrations, so running it again is safe.
+"""
+import os
+import sys
+import psycopg2
+from config.database import DATABASE_CONFIG
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+def migration_files():
+    return sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+
+def main():
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                filename VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """)
+        conn.commit()
+
+        cursor.execute("SELECT filename FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        pending = [f for f in migration_files() if f not in applied]
+
+        if "--list" in sys.argv:
+            for filename in migration_files():
+                print(f" {'[x]' if filename in applied else '[ ]'} {filename}")
+            return
+
+        if not pending:
+            print("✅ Database is up to date")
+            return
+
+        for filename in pending:
+            print(f" Applying {filename}...")
+            with open(os.path.join(MIGRATIONS_DIR, filename), encoding="utf-8") as f:
+                sql = f.read()
+            try:
+                # Each file runs in its own transaction together with its bookkeeping row
+                cursor.execute(sql)
+                cursor.execute("INSERT INTO schema_migrations (filename) VALUES (%s)", (filename,))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"❌ {filename} failed: {e}")
+                sys.exit(1)
+
+        print(f"✅ Applied {len(pending)} migration(s)")
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+-- ==========================================
+-- 001: IDEMPOTENCY KEYS (POST /api/orders/public)
+-- ==========================================
+-- One row per (table, Idempotency-Key). The row is inserted in the same
+-- transaction as the order, so a concurrent retry blocks on the primary key
+-- until the first request commits and then replays its stored response.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    table_number INTEGER NOT NULL,
+    idem_key VARCHAR(255) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    status_code INTEGER,
+    response JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (table_number, idem_key)
+);
+
+-- Expired keys are purged by created_at
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys(created_at);
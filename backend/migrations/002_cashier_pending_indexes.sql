@@ -0,0 +1,32 @@
+-- ==========================================
+-- 002: CASHIER PENDING LIST (GET /api/cashier/pending)
+-- ==========================================
+
+-- "Unpaid active orders": the predicate matches the WHERE clause of
+-- PENDING_ORDERS_QUERY in routes/cashier.py, so the list is an index scan
+-- over the few open orders instead of a scan of the whole history.
+CREATE INDEX IF NOT EXISTS idx_orders_active_created_at
+    ON orders (created_at)
+    WHERE status IN ('PENDING', 'CONFIRMED', 'READY', 'DELIVERED');
+
+-- Anti-join probe: NOT EXISTS (SELECT 1 FROM payments WHERE order_id = ? AND status = 'PAID')
+CREATE INDEX IF NOT EXISTS idx_payments_paid_order_id
+    ON payments (order_id)
+    WHERE status = 'PAID';
+
+-- ?since=<cursor> reads orders changed after the cursor
+CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON orders (updated_at);
+
+-- updated_at must move on every status change (kitchen/order routes do not set it)
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_orders_updated_at ON orders;
+CREATE TRIGGER update_orders_updated_at
+BEFORE UPDATE ON orders
+FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,41 @@
+-- ==========================================
+-- 003: SALES ROLLUPS (dashboard)
+-- ==========================================
+-- Maintained by process_payment (utils/sales_rollups.py) in the payment
+-- transaction. Fill them from existing payments once with:
+--     cd backend && python rebuild_rollups.py
+
+-- Payments per (day, hour, payment method)
+CREATE TABLE IF NOT EXISTS sales_rollup (
+    sale_date DATE NOT NULL,
+    sale_hour SMALLINT NOT NULL,
+    payment_method VARCHAR(30) NOT NULL,
+    payment_count INTEGER NOT NULL DEFAULT 0,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sale_date, sale_hour, payment_method)
+);
+
+-- Items sold per (day, hour, item, payment method); order_count = paid orders containing the item
+CREATE TABLE IF NOT EXISTS item_sales_rollup (
+    sale_date DATE NOT NULL,
+    sale_hour SMALLINT NOT NULL,
+    item_id INTEGER NOT NULL,
+    payment_method VARCHAR(30) NOT NULL,
+    category_id INTEGER NOT NULL DEFAULT 0,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sale_date, sale_hour, item_id, payment_method)
+);
+
+-- Per (day, hour, category, payment method); category_id 0 = uncategorized
+CREATE TABLE IF NOT EXISTS category_sales_rollup (
+    sale_date DATE NOT NULL,
+    sale_hour SMALLINT NOT NULL,
+    category_id INTEGER NOT NULL,
+    payment_method VARCHAR(30) NOT NULL,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    items_sold INTEGER NOT NULL DEFAULT 0,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sale_date, sale_hour, category_id, payment_method)
+);
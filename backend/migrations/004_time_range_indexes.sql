@@ -0,0 +1,15 @@
+-- ==========================================
+-- 004: TIME-RANGE INDEXES
+-- ==========================================
+-- Date filters go through utils/dates.py (created_at >= start AND
+-- created_at < end), so plain b-tree indexes on the timestamps apply.
+-- Check with: cd backend && python -m pytest -q test_date_indexes.py
+
+-- "PAID payments today / in a range" (cashier transactions, rollup rebuilds)
+CREATE INDEX IF NOT EXISTS idx_payments_status_created_at ON payments (status, created_at);
+
+-- Order list filtered by status and date, kitchen stats of today: answered by
+-- the (created_at, order_id) and (status, created_at, order_id) indexes of 005
+
+-- Bank feed summary of today
+CREATE INDEX IF NOT EXISTS idx_bank_transactions_transaction_date ON bank_transactions (transaction_date);
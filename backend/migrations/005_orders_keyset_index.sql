@@ -0,0 +1,16 @@
+-- ==========================================
+-- 005: KEYSET PAGINATION (GET /api/orders)
+-- ==========================================
+-- Pages are read with ORDER BY created_at DESC, order_id DESC and
+-- (created_at, order_id) < cursor; both indexes are scanned backwards.
+
+CREATE INDEX IF NOT EXISTS idx_orders_created_at_order_id ON orders (created_at, order_id);
+
+-- Same, when the list is filtered by status
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_at_order_id ON orders (status, created_at, order_id);
+
+-- They also answer what the single-column indexes of schema.sql did
+-- (created_at ranges, status alone); keeping those would maintain extra
+-- b-trees on every insert and status change.
+DROP INDEX IF EXISTS idx_orders_created_at;
+DROP INDEX IF EXISTS idx_orders_status;
@@ -0,0 +1,15 @@
+-- ==========================================
+-- 006: MENU VERSION (public menu cache)
+-- ==========================================
+-- Every worker caches GET /api/menu/public and compares its snapshot with
+-- this counter (utils/menu_cache.py). create/update/delete_menu_item bump it
+-- in their own transaction, so all workers see the change on their next check.
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO cache_versions (name, version) VALUES ('menu', 1)
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,47 @@
+-- ==========================================
+-- 007: MENU SEARCH (unaccent + pg_trgm)
+-- ==========================================
+-- Accent-insensitive, ranked, prefix ("type-ahead") search on menu_items
+-- used by utils/menu_search.py. "pho" finds "Phở", "banh mi" finds "Bánh mì".
+--
+-- If the server has no unaccent/pg_trgm (contrib) this file only prints a
+-- NOTICE and the API falls back to its in-memory index. After installing the
+-- extensions, apply it again with:
+--     DELETE FROM schema_migrations WHERE filename = '007_menu_search.sql';
+--     python migrate.py
+
+DO $migration$
+BEGIN
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS unaccent;
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE NOTICE 'menu search: unaccent/pg_trgm unavailable (%), using in-memory fallback', SQLERRM;
+        RETURN;
+    END;
+
+    -- unaccent() is only STABLE; this wrapper pins the dictionary so it can be indexed
+    EXECUTE $sql$
+        CREATE OR REPLACE FUNCTION menu_search_unaccent(text)
+        RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS
+        $fn$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1)) $fn$
+    $sql$;
+
+    -- Name weighs more than description in the ranking
+    EXECUTE $sql$
+        CREATE OR REPLACE FUNCTION menu_search_vector(name text, description text)
+        RETURNS tsvector LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+        $fn$
+            SELECT setweight(to_tsvector('simple', menu_search_unaccent(coalesce(name, ''))), 'A')
+                || setweight(to_tsvector('simple', menu_search_unaccent(coalesce(description, ''))), 'B')
+        $fn$
+    $sql$;
+
+    EXECUTE 'CREATE INDEX IF NOT EXISTS idx_menu_items_search_vector
+             ON menu_items USING GIN (menu_search_vector(item_name, description))';
+
+    -- Typo-tolerant name matching (word_similarity, <% operator)
+    EXECUTE 'CREATE INDEX IF NOT EXISTS idx_menu_items_name_trgm
+             ON menu_items USING GIN (menu_search_unaccent(item_name) gin_trgm_ops)';
+END
+$migration$;
@@ -0,0 +1,17 @@
+-- ==========================================
+-- 008: TABLE TOKENS (signed QR codes)
+-- ==========================================
+-- Rotation epoch of each table's QR token (utils/table_tokens.py). A table
+-- without a row is at epoch 0. No foreign key: the dining tables relation is
+-- `tables`, `dining_tables` or `restaurant_tables` depending on the database
+-- (utils/schema_registry.py), and orders.table_id already guards deleted tables.
+-- Workers reload the epochs when cache_versions 'table_tokens' moves.
+
+CREATE TABLE IF NOT EXISTS table_token_epochs (
+    table_id INTEGER PRIMARY KEY,
+    epoch INTEGER NOT NULL,
+    rotated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO cache_versions (name, version) VALUES ('table_tokens', 1)
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,59 @@
+-- ==========================================
+-- 009: STATUS TRANSITIONS (optimistic concurrency)
+-- ==========================================
+-- Kitchen, waiter and cashier screens change the same orders at the same
+-- time. Every status change is now one conditional UPDATE
+-- (utils/status_transitions.py) that only applies when:
+--   * (current status -> new status) is listed in status_transitions, and
+--   * the row's version is the one the client last saw (when it sends one)
+-- and bumps version. Otherwise nothing is written and the API answers 409.
+--
+-- ADD COLUMN with a constant default does not rewrite the tables.
+
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE kitchen_orders ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+CREATE TABLE IF NOT EXISTS status_transitions (
+    entity VARCHAR(20) NOT NULL,        -- 'order' | 'kitchen_order'
+    from_status VARCHAR(20) NOT NULL,
+    to_status VARCHAR(20) NOT NULL,
+    PRIMARY KEY (entity, from_status, to_status)
+);
+
+INSERT INTO status_transitions (entity, from_status, to_status) VALUES
+    -- Orders: PAID only through POST /api/cashier/payment; COMPLETED / CANCELLED are final
+    ('order', 'PENDING',   'CONFIRMED'),
+    ('order', 'PENDING',   'PREPARING'),
+    ('order', 'PENDING',   'READY'),
+    ('order', 'PENDING',   'DELIVERED'),
+    ('order', 'PENDING',   'PAID'),
+    ('order', 'PENDING',   'CANCELLED'),
+    ('order', 'CONFIRMED', 'PREPARING'),
+    ('order', 'CONFIRMED', 'READY'),
+    ('order', 'CONFIRMED', 'DELIVERED'),
+    ('order', 'CONFIRMED', 'PAID'),
+    ('order', 'CONFIRMED', 'CANCELLED'),
+    ('order', 'PREPARING', 'READY'),
+    ('order', 'PREPARING', 'DELIVERED'),
+    ('order', 'PREPARING', 'PAID'),
+    ('order', 'PREPARING', 'CANCELLED'),
+    ('order', 'READY',     'DELIVERED'),
+    ('order', 'READY',     'PAID'),
+    ('order', 'READY',     'COMPLETED'),
+    ('order', 'DELIVERED', 'PAID'),
+    ('order', 'DELIVERED', 'COMPLETED'),
+    ('order', 'PAID',      'COMPLETED'),
+    -- Kitchen tickets: SERVED (order paid) and CANCELLED are final
+    ('kitchen_order', 'WAITING',   'PREPARING'),
+    ('kitchen_order', 'WAITING',   'READY'),
+    ('kitchen_order', 'WAITING',   'SERVED'),
+    ('kitchen_order', 'WAITING',   'CANCELLED'),
+    ('kitchen_order', 'PREPARING', 'WAITING'),
+    ('kitchen_order', 'PREPARING', 'READY'),
+    ('kitchen_order', 'PREPARING', 'SERVED'),
+    ('kitchen_order', 'PREPARING', 'CANCELLED'),
+    ('kitchen_order', 'READY',     'PREPARING'),
+    ('kitchen_order', 'READY',     'COMPLETED'),
+    ('kitchen_order', 'READY',     'SERVED'),
+    ('kitchen_order', 'COMPLETED', 'SERVED')
+ON CONFLICT DO NOTHING;
@@ -80,6 +80,7 @@ class OrderCreate(BaseModel):
 
 class OrderStatusUpdate(BaseModel):
     status: str
+    version: Optional[int] = None  # version the screen last saw; 409 if it changed since
 
 # ==================== Table Schemas ====================
 
@@ -108,6 +109,7 @@ class EmployeeUpdate(BaseModel):
 
 class KitchenOrderStatusUpdate(BaseModel):
     status: str
+    version: Optional[int] = None  # version the screen last saw; 409 if it changed since
 
 # ==================== Cashier Schemas ====================
 
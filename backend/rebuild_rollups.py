@@ -0,0 +1,44 @@
+# backend/rebuild_rollups.py
+"""
+Backfill / rebuild the dashboard sales rollups from the payments table
+
+    cd backend && python rebuild_rollups.py                          # whole history
+    cd backend && python rebuild_rollups.py --from 2024-01-01 --to 2024-01-31
+
+Safe to run while the restaurant is open: payments wait for the rebuild to commit.
+"""
+import argparse
+import time
+from datetime import date
+import psycopg2
+from config.database import DATABASE_CONFIG
+from utils.sales_rollups import rebuild, ROLLUP_TABLES
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild dashboard sales rollups")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, default=None)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    cursor = conn.cursor()
+    try:
+        started = time.perf_counter()
+        print(f" Rebuilding rollups ({args.date_from or 'beginning'} → {args.date_to or 'today'})...")
+        rebuild(cursor, args.date_from, args.date_to)
+        conn.commit()
+
+        for table in ROLLUP_TABLES:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            print(f"   {table}: {cursor.fetchone()[0]} rows")
+        print(f"✅ Done in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Rebuild failed: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,16 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Header
+from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel
 from config.database import get_db_connection
-import bcrypt
-from datetime import datetime, timedelta
-import jwt
-import os
-from typing import Optional
+from config import async_database as adb
+from utils.auth import (
+    ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, Principal,
+    create_access_token, get_current_user
+)
+from utils.hashing import password_hasher
+from utils.log import get_logger
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
-
-# JWT Config
-SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
+logger = get_logger(__name__)
 
 # ==================== SCHEMAS ====================
 
@@ -70,73 +68,16 @@ def normalize_role_name(role_name: str, role_id: int) -> str:
     
     return ROLE_ID_MAPPING.get(role_id, "STAFF")
 
-# ==================== PASSWORD FUNCTIONS ====================
-
-def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password using bcrypt"""
-    try:
-        plain_password = plain_password.strip()
-        hashed_password = hashed_password.strip()
-        
-        print(f" Verifying password:")
-        print(f"   Plain password length: {len(plain_password)}")
-        print(f"   Hash starts with: {hashed_password[:10]}")
-        
-        result = bcrypt.checkpw(
-            plain_password.encode('utf-8'),
-            hashed_password.encode('utf-8')
-        )
-        
-        print(f"   Verification result: {result}")
-        return result
-        
-    except Exception as e:
-        print(f" Verification error: {type(e).__name__}: {e}")
-        return False
-
-# ==================== JWT FUNCTIONS ====================
-
-def create_access_token(user_id: int, username: str, role: str):
-    """Create JWT token"""
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    payload = {
-        "user_id": user_id,
-        "username": username,
-        "role": role,
-        "exp": expire,
-        "iat": datetime.utcnow()
-    }
-    
-    token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
-    print(f" Token created: {token[:30]}...")
-    
-    return token
-
-def verify_token(token: str):
-    """Verify JWT token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token đã hết hạn")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Token không hợp lệ")
-
 # ==================== UTILITY ENDPOINTS ====================
 
 @router.post("/hash-password")
-def create_password_hash(password: str):
+async def create_password_hash(password: str):
     """Utility endpoint to create password hash"""
-    hashed = hash_password(password)
+    hashed = await password_hasher.hash(password)
     return {
         "password": password,
         "hash": hashed,
-        "verify": verify_password(password, hashed)
+        "verify": await password_hasher.verify(password, hashed)
     }
 
 # ==================== LOGIN ENDPOINT ====================
@@ -150,21 +91,7 @@ async def login(credentials: UserLogin):
     thay vì tên tiếng Việt từ database
     """
     
-    conn = None
-    cursor = None
-    
     try:
-        print("\n" + "="*70)
-        print(f" LOGIN ATTEMPT")
-        print("="*70)
-        print(f"Username: {credentials.username}")
-        print(f" Password: {'*' * len(credentials.password)} (length: {len(credentials.password)})")
-        
-        # Connect to database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        print(f" Database connected")
-        
         #  CRITICAL: JOIN with roles table to get role_name
         query = """
             SELECT 
@@ -180,32 +107,21 @@ async def login(credentials: UserLogin):
             FROM users u
             LEFT JOIN roles r ON u.role_id = r.role_id
             LEFT JOIN employees e ON u.user_id = e.user_id
-            WHERE u.username = %s
+            WHERE u.username = $1
         """
         
-        print(f"\n Executing query for username: {credentials.username}")
-        cursor.execute(query, (credentials.username,))
-        user = cursor.fetchone()
+        user = await adb.fetchrow(query, credentials.username)
         
         if not user:
-            print(f" User '{credentials.username}' NOT FOUND in database")
-            print("="*70 + "\n")
+            logger.info("Login failed: unknown user", extra={"username": credentials.username})
             raise HTTPException(
                 status_code=401,
                 detail="Tên đăng nhập hoặc mật khẩu không đúng"
             )
         
-        print(f"\n User found in database:")
-        print(f"   User ID: {user['user_id']}")
-        print(f"   Username: {user['username']}")
-        print(f"   Full Name: {user.get('full_name', 'N/A')}")
-        print(f"   Position: {user.get('position', 'N/A')}")
-        print(f"   Role ID: {user['role_id']}")
-        print(f"   Role Name (from DB): {user.get('role_name', 'N/A')}")
-        
         # Check if user is active
         if not user.get('is_active', True):
-            print(f"User is inactive")
+            logger.info("Login refused: account disabled", extra={"username": user['username']})
             raise HTTPException(
                 status_code=403,
                 detail="Tài khoản đã bị vô hiệu hóa"
@@ -214,66 +130,44 @@ async def login(credentials: UserLogin):
         # Get password hash
         password_hash = user['password']
         
-        print(f"\n Password Hash Info:")
-        print(f"   Hash type: {'BCRYPT' if password_hash.startswith('$2') else 'UNKNOWN'}")
-        print(f"   Hash length: {len(password_hash)}")
-        print(f"   Hash preview: {password_hash[:30]}...")
-        
         # Verify password
-        print(f"\n Verifying password...")
-        
         is_valid = False
         
         if password_hash.startswith('$2b$') or password_hash.startswith('$2a$'):
-            # BCrypt hash
-            is_valid = verify_password(credentials.password, password_hash)
+            # BCrypt hash - CPU bound, runs in the hashing process pool (utils/hashing.py)
+            is_valid = await password_hasher.verify(credentials.password, password_hash)
             
             if not is_valid:
-                print(f" Password verification FAILED")
-                print("="*70 + "\n")
+                logger.info("Login failed: wrong password", extra={"username": user['username']})
                 raise HTTPException(
                     status_code=401,
                     detail="Tên đăng nhập hoặc mật khẩu không đúng"
                 )
             
-            print(f" Password verification SUCCESS")
-            
         else:
             # Plain text (for debugging only - NOT RECOMMENDED)
-            print(f" WARNING: Plain text password detected")
+            logger.warning("Plain text password stored for user", extra={"username": user['username']})
             is_valid = (credentials.password == password_hash)
             
             if not is_valid:
-                print(f" Plain text password mismatch")
-                print("="*70 + "\n")
+                logger.info("Login failed: wrong password", extra={"username": user['username']})
                 raise HTTPException(
                     status_code=401,
                     detail="Tên đăng nhập hoặc mật khẩu không đúng"
                 )
             
-            print(f"Plain text password matched")
-        
         #  FIX: Normalize role_name (Quản lý -> ADMIN)
         raw_role_name = user.get('role_name')
         user_role = normalize_role_name(raw_role_name, user['role_id'])
         
-        print(f"\n👤 User Role Information:")
-        print(f"   Role ID: {user['role_id']}")
-        print(f"   Raw Role Name from DB: {raw_role_name}")
-        print(f"   Normalized Role: {user_role}")  #  THIS IS WHAT WE RETURN
-        
         # Create JWT token with normalized role
         token = create_access_token(
             user_id=user['user_id'],
             username=user['username'],
-            role=user_role  #  Now "ADMIN" not "Quản lý"
+            role=user_role,  #  Now "ADMIN" not "Quản lý"
+            employee_id=user.get('employee_id')
         )
         
-        print(f"\nToken Info:")
-        print(f"   Algorithm: {ALGORITHM}")
-        print(f"   Expires in: {ACCESS_TOKEN_EXPIRE_MINUTES} minutes")
-        print(f"   Token preview: {token[:40]}...")
-        
         # Prepare response
         response = {
             "success": True,
@@ -294,10 +188,7 @@ async def login(credentials: UserLogin):
             "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60  # seconds
         }
         
-        print(f"\n LOGIN SUCCESSFUL")
-        print(f"Returning user.role: '{user_role}' (normalized)")
-        print(f"   Response keys: {list(response.keys())}")
-        print("="*70 + "\n")
+        logger.info("Login successful", extra={"username": user['username'], "role": user_role})
         
         return response
         
@@ -306,118 +197,54 @@ async def login(credentials: UserLogin):
         raise he
         
     except Exception as e:
-        print(f"\n UNEXPECTED ERROR:")
-        print(f"   Type: {type(e).__name__}")
-        print(f"   Message: {str(e)}")
-        print("="*70 + "\n")
-        
-        import traceback
-        traceback.print_exc()
+        logger.exception("Login failed with unexpected error")
         
         raise HTTPException(
             status_code=500,
             detail=f"Lỗi server: {str(e)}"
         )
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-
-# ==================== GET CURRENT USER ====================
-
-async def get_current_user(authorization: Optional[str] = Header(None)):
-    """Get current user from token"""
-    
-    if not authorization:
-        raise HTTPException(
-            status_code=401,
-            detail="Không tìm thấy token xác thực"
-        )
-    
-    try:
-        # Extract token from "Bearer <token>"
-        scheme, token = authorization.split()
-        
-        if scheme.lower() != 'bearer':
-            raise HTTPException(
-                status_code=401,
-                detail="Sai định dạng token"
-            )
-        
-        # Verify token
-        payload = verify_token(token)
-        
-        return payload
-        
-    except ValueError:
-        raise HTTPException(
-            status_code=401,
-            detail="Sai định dạng token"
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=401,
-            detail=f"Token không hợp lệ: {str(e)}"
-        )
 
 # ==================== OTHER ENDPOINTS ====================
 
 @router.get("/me")
-async def get_me(current_user = Depends(get_current_user)):
+async def get_me(current_user: Principal = Depends(get_current_user)):
     """Get current user info"""
     
-    conn = None
-    cursor = None
+    user = await adb.fetchrow(
+        """
+        SELECT 
+            u.user_id, 
+            u.username, 
+            u.role_id, 
+            r.role_name,
+            e.full_name,
+            e.position
+        FROM users u
+        LEFT JOIN roles r ON u.role_id = r.role_id
+        LEFT JOIN employees e ON u.user_id = e.user_id
+        WHERE u.user_id = $1
+        """,
+        current_user.user_id
+    )
     
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """
-            SELECT 
-                u.user_id, 
-                u.username, 
-                u.role_id, 
-                r.role_name,
-                e.full_name,
-                e.position
-            FROM users u
-            LEFT JOIN roles r ON u.role_id = r.role_id
-            LEFT JOIN employees e ON u.user_id = e.user_id
-            WHERE u.user_id = %s
-            """,
-            (current_user['user_id'],)
-        )
-        
-        user = cursor.fetchone()
-        
-        if not user:
-            raise HTTPException(status_code=404, detail="Không tìm thấy user")
-        
-        # FIX: Normalize role
-        raw_role_name = user.get('role_name')
-        normalized_role = normalize_role_name(raw_role_name, user['role_id'])
-        
-        return {
-            "success": True,
-            "user": {
-                "userId": user['user_id'],
-                "username": user['username'],
-                "fullName": user.get('full_name', user['username']),
-                "role": normalized_role,  
-                "roleId": user['role_id'],
-                "position": user.get('position')
-            }
+    if not user:
+        raise HTTPException(status_code=404, detail="Không tìm thấy user")
+    
+    # FIX: Normalize role
+    raw_role_name = user.get('role_name')
+    normalized_role = normalize_role_name(raw_role_name, user['role_id'])
+    
+    return {
+        "success": True,
+        "user": {
+            "userId": user['user_id'],
+            "username": user['username'],
+            "fullName": user.get('full_name', user['username']),
+            "role": normalized_role,  
+            "roleId": user['role_id'],
+            "position": user.get('position')
         }
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+    }
 
 @router.post("/logout")
 def logout():
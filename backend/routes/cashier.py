@@ -1,39 +1,23 @@
 # backend/routes/cashier.py - WITH BANK ACCOUNTS SUPPORT
-from fastapi import APIRouter, Depends, HTTPException, status, Header
-from config.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from config.database import get_db, get_db_connection
 from models.schemas import PaymentProcess
+from utils.kitchen_events import TICKET_STATUS_CHANGED, CHANNEL as KITCHEN_EVENTS_CHANNEL
+from utils import sales_rollups
+from utils.dates import today_filter
+from utils.singleflight import single_flight
+from utils.change_feed import CHANGE_FEED_MAX_ROWS, CURSOR_SQL, since_query, read_cursor, check_size, split_changes
+from utils.auth import Principal, get_current_user
+from utils.log import get_logger
+from utils.schema_registry import schema
 from typing import Optional, List
 from pydantic import BaseModel, Field
 from datetime import datetime, date
 from enum import Enum
-import jwt
-import os
+import psycopg2
 
 router = APIRouter(prefix="/api/cashier", tags=["Cashier"])
-
-SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
-ALGORITHM = "HS256"
-
-# ==================== AUTH DEPENDENCY ====================
-
-def verify_token(authorization: Optional[str] = Header(None)):
-    """Verify JWT token from Authorization header"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(status_code=401, detail="Invalid authorization scheme")
-        
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    except Exception as e:
-        raise HTTPException(status_code=401, detail=str(e))
+logger = get_logger(__name__)
 
 # ==================== ENUMS ====================
 
@@ -59,6 +43,7 @@ class PaymentProcessRequest(BaseModel):
     bank_transaction_id: Optional[str] = None
     card_last4: Optional[str] = None
     notes: Optional[str] = None
+    version: Optional[int] = None  # order version last seen; 409 if it changed since
 
 class SplitPaymentRequest(BaseModel):
     order_id: int
@@ -78,13 +63,17 @@ class BankTransaction(BaseModel):
 
 # ==================== HELPER FUNCTIONS ====================
 
+TAX_RATE = 0.10  # 10% VAT
+SERVICE_CHARGE_RATE = 0.05  # 5% service
+BANK_AMOUNT_TOLERANCE = 5000  # 5,000 VND tolerance for transfers
+
 def calculate_order_breakdown(subtotal) -> dict:
     """Calculate tax and service charge"""
     # Convert to float if Decimal (from PostgreSQL)
     subtotal = float(subtotal)
     
-    tax = round(subtotal * 0.1, 2)  # 10% VAT
-    service_charge = round(subtotal * 0.05, 2)  # 5% service
+    tax = round(subtotal * TAX_RATE, 2)
+    service_charge = round(subtotal * SERVICE_CHARGE_RATE, 2)
     total = round(subtotal + tax + service_charge, 2)
     
     return {
@@ -106,28 +95,13 @@ def validate_payment_amount(total, paid, method: PaymentMethod) -> tuple[bool, s
             return False, f"Insufficient payment. Need {total:.2f}, got {paid:.2f}"
         return True, "OK"
     
-    tolerance = 5000  # 5,000 VND tolerance
-    if abs(paid - total) > tolerance:
+    if abs(paid - total) > BANK_AMOUNT_TOLERANCE:
         return False, f"Payment amount mismatch. Expected {total:.2f}, got {paid:.2f}"
     
     return True, "OK"
 
-def verify_bank_transaction(transaction_id: str, expected_amount, conn) -> tuple[bool, Optional[str]]:
-    """Verify bank transaction in database"""
-    cursor = conn.cursor()
-    
-    # Convert expected_amount to float if Decimal
-    expected_amount = float(expected_amount)
-    
-    cursor.execute("""
-        SELECT transaction_id, amount, used_for_order_id, status
-        FROM bank_transactions
-        WHERE transaction_id = %s
-    """, (transaction_id,))
-    
-    transaction = cursor.fetchone()
-    cursor.close()
-    
+def check_bank_transaction(transaction: Optional[dict], expected_amount) -> tuple[bool, Optional[str]]:
+    """Check a bank_transactions row against the amount due"""
     if not transaction:
         return False, "Transaction not found in bank feed"
     
@@ -137,29 +111,41 @@ def verify_bank_transaction(transaction_id: str, expected_amount, conn) -> tuple
     if transaction['status'] != 'PENDING':
         return False, f"Transaction status is {transaction['status']}, cannot use"
     
-    # Convert transaction amount to float for comparison
+    # Convert to float for comparison (Decimal from PostgreSQL)
+    expected_amount = float(expected_amount)
     transaction_amount = float(transaction['amount'])
     
-    if abs(transaction_amount - expected_amount) > 5000:
+    if abs(transaction_amount - expected_amount) > BANK_AMOUNT_TOLERANCE:
         return False, f"Amount mismatch: Expected {expected_amount:.2f}, got {transaction_amount:.2f}"
     
     return True, None
 
+def verify_bank_transaction(transaction_id: str, expected_amount, conn) -> tuple[bool, Optional[str]]:
+    """Verify bank transaction in database"""
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT transaction_id, amount, used_for_order_id, status
+        FROM bank_transactions
+        WHERE transaction_id = %s
+    """, (transaction_id,))
+    
+    transaction = cursor.fetchone()
+    cursor.close()
+    
+    return check_bank_transaction(transaction, expected_amount)
+
 # ==================== BANK ACCOUNTS ENDPOINTS ====================
 
 @router.get("/bank-accounts/active")
 def get_active_bank_accounts(
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
     """Get active bank accounts for cashier payment"""
     cursor = conn.cursor()
     
     try:
-        print(f"\n{'='*70}")
-        print(f" FETCHING ACTIVE BANK ACCOUNTS")
-        print(f"{'='*70}")
-        
         cursor.execute("""
             SELECT id, bank_name, bank_logo, account_number, 
                    account_holder, branch_name, is_active, 
@@ -170,15 +156,8 @@ def get_active_bank_accounts(
         """)
         
         accounts = cursor.fetchall()
-        
-        print(f" Found {len(accounts)} active bank accounts")
-        for account in accounts:
-            print(f"  - {account['bank_name']}: {account['account_number']}")
-        
         cursor.close()
         
-        print(f"{'='*70}\n")
-        
         return {
             "success": True,
             "data": accounts,
@@ -187,7 +166,7 @@ def get_active_bank_accounts(
         
     except Exception as e:
         cursor.close()
-        print(f" ERROR fetching bank accounts: {e}")
+        logger.exception("Fetching bank accounts failed")
         raise HTTPException(
             status_code=500, 
             detail=f"Error fetching bank accounts: {str(e)}"
@@ -195,72 +174,112 @@ def get_active_bank_accounts(
 
 # ==================== PAYMENT ENDPOINTS ====================
 
+# Unpaid active orders. The status list must stay identical to the predicate
+# of idx_orders_active_created_at (migrations/002) for the index to be used.
+PENDING_FILTER = """
+    o.status IN ('PENDING', 'CONFIRMED', 'READY', 'DELIVERED')
+    AND NOT EXISTS (
+        SELECT 1 FROM payments p
+        WHERE p.order_id = o.order_id AND p.status = 'PAID'
+    )
+"""
+
+# One round-trip: orders + items + payment breakdown, plus the ids of orders
+# that left the list (only returned in ?since= mode) and the next cursor.
+PENDING_ORDERS_QUERY = """
+    SELECT {cursor} AS cursor, COUNT(*) AS changed,
+           COALESCE(jsonb_agg(x.order_json ORDER BY x.created_at) FILTER (WHERE x.is_pending), '[]') AS orders,
+           COALESCE(jsonb_agg(x.order_id ORDER BY x.order_id) FILTER (WHERE NOT x.is_pending), '[]') AS removed
+    FROM (
+        SELECT o.order_id, o.created_at,
+               ({pending}) AS is_pending,
+               to_jsonb(o) || jsonb_build_object(
+                   'table_number', t.table_number,
+                   'employee_name', e.full_name,
+                   'items', COALESCE(i.items, '[]'::jsonb),
+                   'payment_breakdown', jsonb_build_object(
+                       'subtotal', o.total_amount::float8,
+                       'tax', ROUND(o.total_amount * %(tax_rate)s::numeric, 2)::float8,
+                       'service_charge', ROUND(o.total_amount * %(service_rate)s::numeric, 2)::float8,
+                       'discount', 0.0,
+                       'total', (o.total_amount
+                                 + ROUND(o.total_amount * %(tax_rate)s::numeric, 2)
+                                 + ROUND(o.total_amount * %(service_rate)s::numeric, 2))::float8
+                   )
+               ) AS order_json
+        FROM orders o
+        JOIN {tables} t ON o.table_id = t.table_id
+        LEFT JOIN employees e ON o.employee_id = e.employee_id
+        LEFT JOIN LATERAL (
+            SELECT jsonb_agg(
+                       to_jsonb(oi) || jsonb_build_object('item_name', m.item_name, 'image_url', m.image_url)
+                       ORDER BY oi.order_item_id
+                   ) AS items
+            FROM order_items oi
+            JOIN menu_items m ON oi.item_id = m.item_id
+            WHERE oi.order_id = o.order_id
+        ) i ON TRUE
+        WHERE {where}
+    ) x
+"""
+
 @router.get("/pending")
+@single_flight("cashier_pending", ttl=0.5)
 def get_pending_orders(
-    current_user: dict = Depends(verify_token),
-    conn=Depends(get_db)
+    since: Optional[int] = since_query(),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get orders pending payment - FIXED to include PENDING status"""
-    cursor = conn.cursor()
-    
-    print(f"\n{'='*70}")
-    print(f" FETCHING PENDING ORDERS")
-    print(f"{'='*70}")
-    
-    # FIXED: Include 'PENDING' status so newly created orders appear
-    cursor.execute("""
-        SELECT o.*, t.table_number, e.full_name as employee_name
-        FROM orders o
-        JOIN tables t ON o.table_id = t.table_id
-        LEFT JOIN employees e ON o.employee_id = e.employee_id
-        WHERE o.status IN ('PENDING', 'CONFIRMED', 'READY', 'DELIVERED')
-        AND o.order_id NOT IN (
-            SELECT order_id FROM payments WHERE status = 'PAID'
-        )
-        ORDER BY o.created_at ASC
-    """)
+    """
+    Get orders pending payment (single query)
     
-    orders = cursor.fetchall()
-    print(f" Found {len(orders)} pending orders")
+    - no `since`: the full list, `removed` is empty
+    - `since=<cursor>`: only orders changed after the cursor; `data` holds
+      orders to add/replace, `removed` the ids that are paid/cancelled now
     
-    # Get items for each order
-    for order in orders:
-        cursor.execute("""
-            SELECT oi.*, m.item_name, m.image_url
-            FROM order_items oi
-            JOIN menu_items m ON oi.item_id = m.item_id
-            WHERE oi.order_id = %s
-        """, (order['order_id'],))
-        order['items'] = cursor.fetchall()
-        
-        # Add payment breakdown
-        order['payment_breakdown'] = calculate_order_breakdown(order['total_amount'])
-        
-        print(f"  - Order #{order['order_id']}: Table {order['table_number']}, Status: {order['status']}, Total: {order['total_amount']}")
+    Identical concurrent polls share one build (utils/singleflight.py)
+    """
     
-    cursor.close()
+    params = {"tax_rate": TAX_RATE, "service_rate": SERVICE_CHARGE_RATE}
+    if since is None:
+        where = PENDING_FILTER
+    else:
+        # Payments are written in the same transaction as the order's PAID status
+        where = "o.change_seq >= %(since)s"
+        params["since"] = since
     
-    print(f"{'='*70}\n")
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(PENDING_ORDERS_QUERY.format(
+            cursor=CURSOR_SQL, pending=PENDING_FILTER, where=where, tables=schema.tables), params)
+        result = cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+    if since is not None:
+        check_size(result['changed'])
     
     return {
         "success": True,
-        "data": orders,
-        "count": len(orders)
+        "data": result['orders'],
+        "count": len(result['orders']),
+        "removed": result['removed'],
+        "cursor": result['cursor']
     }
 
 @router.get("/orders/{order_id}/details")
 def get_order_payment_details(
     order_id: int,
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
     """Get detailed order information for payment"""
     cursor = conn.cursor()
     
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT o.*, t.table_number, e.full_name as employee_name
         FROM orders o
-        JOIN tables t ON o.table_id = t.table_id
+        JOIN {schema.tables} t ON o.table_id = t.table_id
         LEFT JOIN employees e ON o.employee_id = e.employee_id
         WHERE o.order_id = %s
     """, (order_id,))
@@ -304,145 +323,218 @@ def get_order_payment_details(
         "data": order
     }
 
+# ==================== PAYMENT SETTLEMENT ====================
+
+# Settles a payment in ONE round-trip.
+#
+# The order is not locked up front. `paid_order` is a conditional UPDATE
+# (utils/status_transitions.py): it only applies if the status may move to
+# PAID (status_transitions) and the version is still the one `ord` read. A
+# second cashier, or a kitchen/cancel change committed in between, makes it
+# match no row, and since the payment and every other write read from
+# `paid_order`, nothing is written. The bank transaction is still locked
+# FOR UPDATE so two orders cannot claim it.
+# The final SELECT always returns one row: the settled payment, or what
+# settlement_error() needs to explain the refusal.
+SETTLE_PAYMENT_QUERY = """
+    WITH ord AS (
+        SELECT o.order_id, o.table_id, o.status, o.version, o.total_amount, t.table_number,
+               o.total_amount
+                 + ROUND(o.total_amount * %(tax_rate)s::numeric, 2)
+                 + ROUND(o.total_amount * %(service_rate)s::numeric, 2) AS total,
+               EXISTS (
+                   SELECT 1 FROM status_transitions st
+                   WHERE st.entity = 'order' AND st.from_status = o.status AND st.to_status = 'PAID'
+               ) AS payable
+        FROM orders o
+        JOIN {tables} t ON o.table_id = t.table_id
+        WHERE o.order_id = %(order_id)s
+    ),
+    bank AS (
+        SELECT b.transaction_id, b.amount, b.used_for_order_id, b.status
+        FROM bank_transactions b
+        WHERE b.transaction_id = %(bank_transaction_id)s
+        FOR UPDATE
+    ),
+    accepted AS (
+        SELECT ord.*,
+               CASE WHEN %(method)s = 'cash'
+                    THEN GREATEST(%(amount_paid)s - ord.total, 0) ELSE 0 END AS change
+        FROM ord
+        WHERE ord.payable
+          AND (%(version)s::int IS NULL OR ord.version = %(version)s)
+          AND CASE WHEN %(method)s = 'cash' THEN %(amount_paid)s >= ord.total
+                   ELSE ABS(%(amount_paid)s - ord.total) <= %(tolerance)s END
+          AND (NOT %(verify_bank)s OR EXISTS (
+                SELECT 1 FROM bank
+                WHERE bank.used_for_order_id IS NULL
+                  AND bank.status = 'PENDING'
+                  AND ABS(bank.amount - ord.total) <= %(tolerance)s))
+    ),
+    paid_order AS (
+        UPDATE orders o
+        SET status = 'PAID', version = o.version + 1, updated_at = CURRENT_TIMESTAMP
+        FROM accepted
+        WHERE o.order_id = accepted.order_id
+          AND o.version = accepted.version
+        RETURNING o.*
+    ),
+    payment AS (
+        INSERT INTO payments (
+            order_id, payment_method, amount_paid, change_given,
+            bank_transaction_id, card_last4, notes,
+            cashier_id, status, created_at
+        )
+        SELECT order_id, %(method)s, accepted.total, accepted.change,
+               %(bank_transaction_id)s, %(card_last4)s, %(notes)s,
+               %(cashier_id)s, 'PAID', CURRENT_TIMESTAMP
+        FROM accepted
+        JOIN paid_order USING (order_id)
+        RETURNING payment_id, order_id, payment_method, amount_paid, change_given,
+                  status, created_at
+    ),
+    bank_used AS (
+        UPDATE bank_transactions b
+        SET used_for_order_id = payment.order_id,
+            status = 'VERIFIED',
+            verified_at = CURRENT_TIMESTAMP
+        FROM payment
+        WHERE b.transaction_id = %(bank_transaction_id)s
+    ),
+    table_released AS (
+        UPDATE {tables} t
+        SET status = 'AVAILABLE', updated_at = CURRENT_TIMESTAMP
+        FROM paid_order
+        WHERE t.table_id = paid_order.table_id
+    ),
+    tickets AS (
+        UPDATE kitchen_orders k
+        SET status = 'SERVED', version = k.version + 1, updated_at = CURRENT_TIMESTAMP
+        FROM payment
+        WHERE k.order_id = payment.order_id
+          AND k.status <> 'CANCELLED'
+        RETURNING k.kitchen_order_id
+    ),
+    -- Same message as utils.kitchen_events.notify_kitchen_event()
+    notified AS (
+        SELECT pg_notify(%(channel)s, jsonb_build_object(
+                   'type', %(event)s,
+                   'at', LOCALTIMESTAMP,
+                   'kitchen_order_id', tickets.kitchen_order_id,
+                   'order_id', accepted.order_id,
+                   'table_number', accepted.table_number,
+                   'status', 'SERVED')::text)
+        FROM tickets, accepted
+    ),
+    {rollups}
+    SELECT ord.status AS order_status, ord.version AS order_version, ord.payable, ord.total,
+           EXISTS (SELECT 1 FROM accepted) AS accepted,
+           bank.transaction_id AS bank_transaction_id, bank.amount AS bank_amount,
+           bank.used_for_order_id AS bank_used_for_order_id, bank.status AS bank_status,
+           payment.payment_id, payment.amount_paid, payment.change_given,
+           payment.created_at AS paid_at,
+           (SELECT to_jsonb(paid_order) FROM paid_order) AS paid_order,
+           (SELECT COUNT(*) FROM notified) AS tickets_served
+    FROM (SELECT 1) one
+    LEFT JOIN ord ON TRUE
+    LEFT JOIN bank ON TRUE
+    LEFT JOIN payment ON TRUE
+"""
+SETTLE_PAYMENT_ROLLUPS = sales_rollups.rollup_ctes(payments="payment")
+
+def settlement_error(result: dict, payment: PaymentProcessRequest) -> HTTPException:
+    """Why SETTLE_PAYMENT_QUERY did not insert a payment"""
+    if result['order_status'] is None:
+        return HTTPException(status_code=404, detail="Order not found")
+    
+    if result['order_status'] == 'CANCELLED':
+        return HTTPException(status_code=400, detail="Cannot pay for cancelled order")
+    
+    if result['order_status'] == 'PAID':
+        return HTTPException(status_code=409, detail="Order has already been paid")
+    
+    if not result['payable']:
+        return HTTPException(status_code=409, detail=f"Cannot pay for order in status {result['order_status']}")
+    
+    if payment.version is not None and result['order_version'] != payment.version:
+        return HTTPException(
+            status_code=409,
+            detail=f"Order was changed by another user (status {result['order_status']}, "
+                   f"version {result['order_version']}), please reload"
+        )
+    
+    if result['accepted']:
+        # All checks passed but the order changed between the read and the UPDATE
+        return HTTPException(status_code=409, detail="Order was changed by another user, please retry")
+    
+    valid, message = validate_payment_amount(result['total'], payment.amount_paid, payment.payment_method)
+    if not valid:
+        return HTTPException(status_code=400, detail=message)
+    
+    transaction = None
+    if result['bank_transaction_id'] is not None:
+        transaction = {
+            'amount': result['bank_amount'],
+            'used_for_order_id': result['bank_used_for_order_id'],
+            'status': result['bank_status'],
+        }
+    valid, error = check_bank_transaction(transaction, result['total'])
+    if not valid:
+        return HTTPException(status_code=400, detail=f"Bank verification failed: {error}")
+    
+    return HTTPException(status_code=409, detail="Payment could not be applied, please retry")
+
 @router.post("/payment")
 def process_payment(
     payment: PaymentProcessRequest,
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
-    """Process payment for an order"""
+    """Process payment for an order (one statement, see SETTLE_PAYMENT_QUERY)"""
+    verify_bank = payment.payment_method in [PaymentMethod.BANK_TRANSFER, PaymentMethod.QR_CODE]
+    if verify_bank and not payment.bank_transaction_id:
+        raise HTTPException(status_code=400, detail="Bank transaction ID required")
+    
     cursor = conn.cursor()
     
     try:
-        print(f"\n{'='*70}")
-        print(f" PROCESSING PAYMENT")
-        print(f"{'='*70}")
-        print(f"Order ID: {payment.order_id}")
-        print(f"Method: {payment.payment_method}")
-        print(f"Amount: {payment.amount_paid:,.2f}")      
-        # Get order details
-        cursor.execute("""
-            SELECT o.order_id, o.table_id, o.status, o.total_amount,
-                   t.table_number
-            FROM orders o
-            JOIN tables t ON o.table_id = t.table_id
-            WHERE o.order_id = %s
-        """, (payment.order_id,))
-        
-        order = cursor.fetchone()
-        
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
-        
-        if order['status'] == 'CANCELLED':
-            raise HTTPException(status_code=400, detail="Cannot pay for cancelled order")
-        
-        # Calculate breakdown
-        breakdown = calculate_order_breakdown(order['total_amount'])
-        total = breakdown['total']
-        
-        print(f"Order Total: {total:,.2f}")
-        
-        # Validate payment amount
-        valid, message = validate_payment_amount(total, payment.amount_paid, payment.payment_method)
-        if not valid:
-            raise HTTPException(status_code=400, detail=message)
+        cursor.execute(SETTLE_PAYMENT_QUERY.format(rollups=SETTLE_PAYMENT_ROLLUPS, tables=schema.tables), {
+            "order_id": payment.order_id,
+            "method": payment.payment_method.value,
+            "amount_paid": payment.amount_paid,
+            "bank_transaction_id": payment.bank_transaction_id,
+            "card_last4": payment.card_last4,
+            "notes": payment.notes,
+            "cashier_id": current_user.employee_id,
+            "verify_bank": verify_bank,
+            "tax_rate": TAX_RATE,
+            "service_rate": SERVICE_CHARGE_RATE,
+            "tolerance": BANK_AMOUNT_TOLERANCE,
+            "version": payment.version,
+            "channel": KITCHEN_EVENTS_CHANNEL,
+            "event": TICKET_STATUS_CHANGED,
+        })
+        result = cursor.fetchone()
         
-        print(" Amount validated")
-        
-        # Verify bank transaction if applicable
-        if payment.payment_method in [PaymentMethod.BANK_TRANSFER, PaymentMethod.QR_CODE]:
-            if not payment.bank_transaction_id:
-                raise HTTPException(status_code=400, detail="Bank transaction ID required")
-            
-            valid, error = verify_bank_transaction(payment.bank_transaction_id, total, conn)
-            if not valid:
-                raise HTTPException(status_code=400, detail=f"Bank verification failed: {error}")
-            
-            print("Bank transaction verified")
-        
-        # Calculate change (for cash)
-        change = max(0, payment.amount_paid - total) if payment.payment_method == PaymentMethod.CASH else 0
-        # Create payment record
-        cursor.execute("""
-            INSERT INTO payments (
-                order_id, payment_method, amount_paid, change_given,
-                bank_transaction_id, card_last4, notes,
-                cashier_id, status, created_at
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'PAID', CURRENT_TIMESTAMP)
-            RETURNING payment_id, created_at
-        """, (
-            payment.order_id,
-            payment.payment_method.value,
-            total,
-            change,
-            payment.bank_transaction_id,
-            payment.card_last4,
-            payment.notes,
-            current_user.get('employeeId')
-        ))
-        
-        payment_record = cursor.fetchone()
-        print(f"✓ Payment record created: #{payment_record['payment_id']}")
-        
-        # Mark bank transaction as used (if applicable)
-        if payment.bank_transaction_id:
-            cursor.execute("""
-                UPDATE bank_transactions
-                SET used_for_order_id = %s,
-                    status = 'VERIFIED',
-                    verified_at = CURRENT_TIMESTAMP
-                WHERE transaction_id = %s
-            """, (payment.order_id, payment.bank_transaction_id))
-            print(f"✓ Bank transaction marked as used")
-        
-        # Update order status
-        cursor.execute("""
-            UPDATE orders
-            SET status = 'PAID', updated_at = CURRENT_TIMESTAMP
-            WHERE order_id = %s
-            RETURNING *
-        """, (payment.order_id,))
-        
-        updated_order = cursor.fetchone()
-        print(f"✓ Order status updated to PAID")
-        
-        # Update table status to empty
-        cursor.execute("""
-            UPDATE tables
-            SET status = 'AVAILABLE', updated_at = CURRENT_TIMESTAMP
-            WHERE table_id = %s
-        """, (order['table_id'],))
-        print(f"✓ Table {order['table_number']} released")
-        
-        # Update kitchen order if exists
-        cursor.execute("""
-            UPDATE kitchen_orders
-            SET status = 'SERVED', updated_at = CURRENT_TIMESTAMP
-            WHERE order_id = %s
-        """, (payment.order_id,))
+        if result['payment_id'] is None:
+            raise settlement_error(result, payment)
         
         conn.commit()
-        
-        print(f" PAYMENT SUCCESSFUL")
-        print(f"{'='*70}\n")
-        
         cursor.close()
         
         return {
             "success": True,
             "message": "Payment processed successfully",
             "data": {
-                "payment_id": payment_record['payment_id'],
+                "payment_id": result['payment_id'],
                 "order_id": payment.order_id,
-                "amount": total,
+                "amount": float(result['amount_paid']),
                 "amount_paid": payment.amount_paid,
-                "change": change,
+                "change": float(result['change_given']),
                 "payment_method": payment.payment_method.value,
-                "paid_at": payment_record['created_at'].isoformat(),
-                "order": updated_order,
-                "breakdown": breakdown
+                "paid_at": result['paid_at'].isoformat(),
+                "order": result['paid_order'],
+                "breakdown": calculate_order_breakdown(result['paid_order']['total_amount'])
             }
         }
         
@@ -450,25 +542,34 @@ def process_payment(
         conn.rollback()
         cursor.close()
         raise
+    except psycopg2.errors.UniqueViolation:
+        # payments.order_id is UNIQUE: a payment row already exists for this order
+        conn.rollback()
+        cursor.close()
+        raise HTTPException(status_code=409, detail="Order has already been paid")
     except Exception as e:
         conn.rollback()
         cursor.close()
-        print(f" ERROR: {e}")
+        logger.exception("Payment failed", extra={"order_id": payment.order_id})
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/bank-feed")
 def get_bank_feed(
     status: Optional[str] = "PENDING",
     limit: int = 50,
-    current_user: dict = Depends(verify_token),
+    since: Optional[int] = since_query(),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
-    """Get bank transactions for verification"""
-    cursor = conn.cursor()   
-    print(f"\n{'='*50}")
-    print(f" FETCHING BANK FEED")
-    print(f"Status filter: {status}")
-    print(f"{'='*50}")
+    """
+    Get bank transactions for verification
+    
+    `since=<cursor>`: only transactions changed after the cursor; those that
+    no longer match `status` are listed in `removed`, and `summary` is null
+    when nothing changed (keep the previous one)
+    """
+    cursor = conn.cursor()
+    new_cursor = read_cursor(cursor)
     
     query = """
         SELECT transaction_id, amount, description, 
@@ -478,41 +579,56 @@ def get_bank_feed(
         WHERE 1=1
     """
     params = []
+    removed = []
     
-    if status:
+    if since is not None:
+        # Status is checked below: a transaction that left the list is reported
+        query += " AND change_seq >= %s"
+        params.append(since)
+    elif status:
         query += " AND status = %s"
         params.append(status)
     
     query += " ORDER BY transaction_date DESC, created_at DESC LIMIT %s"
-    params.append(limit)
+    params.append(limit if since is None else CHANGE_FEED_MAX_ROWS + 1)
     
     cursor.execute(query, params)
     transactions = cursor.fetchall()
     
-    print(f" Found {len(transactions)} transactions")
+    if since is not None:
+        check_size(len(transactions))
+        if status:
+            transactions, removed = split_changes(
+                transactions, lambda t: t['status'] == status, "transaction_id")
+        if not transactions and not removed:
+            cursor.close()
+            return {
+                "success": True,
+                "data": {"transactions": [], "removed": [], "summary": None, "cursor": new_cursor}
+            }
     
     # Summary
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT 
             COUNT(*) as total_count,
             SUM(amount) as total_amount,
             COUNT(CASE WHEN status = 'PENDING' THEN 1 END) as pending_count,
             COUNT(CASE WHEN status = 'VERIFIED' THEN 1 END) as verified_count
         FROM bank_transactions
-        WHERE DATE(transaction_date) = CURRENT_DATE
+        WHERE {today_filter("transaction_date")}
     """)
     
     summary = cursor.fetchone()
     
     cursor.close()
     
-    print(f"{'='*50}\n")
-    
     return {
         "success": True,
         "data": {
             "transactions": transactions,
+            "removed": removed,
             "summary": summary,
+            "cursor": new_cursor,
             "last_updated": datetime.now().isoformat()
         }
     }
@@ -521,7 +637,7 @@ def get_bank_feed(
 def verify_bank_transaction_endpoint(
     transaction_id: str,
     order_id: int,
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
     """Verify a bank transaction matches an order"""
@@ -559,31 +675,52 @@ def verify_bank_transaction_endpoint(
 
 @router.get("/transactions/today")
 def get_today_transactions(
-    current_user: dict = Depends(verify_token),
+    since: Optional[int] = since_query(),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
-    """Get today's completed transactions"""
+    """
+    Get today's completed transactions
+    
+    `since=<cursor>`: only payments changed after the cursor; those no longer
+    PAID (refunded) are listed in `removed`, and `summary` is null when
+    nothing changed (keep the previous one)
+    """
     cursor = conn.cursor()
+    new_cursor = read_cursor(cursor)
     
-    cursor.execute("""
+    where = "p.status = 'PAID'" if since is None else "p.change_seq >= %(since)s"
+    cursor.execute(f"""
         SELECT p.payment_id, p.order_id, p.amount_paid as total_amount,
-               p.payment_method, p.change_given, p.created_at,
+               p.payment_method, p.change_given, p.created_at, p.status,
                t.table_number, e.full_name as employee_name,
                ce.full_name as cashier_name
         FROM payments p
         JOIN orders o ON p.order_id = o.order_id
-        JOIN tables t ON o.table_id = t.table_id
+        JOIN {schema.tables} t ON o.table_id = t.table_id
         LEFT JOIN employees e ON o.employee_id = e.employee_id
         LEFT JOIN employees ce ON p.cashier_id = ce.employee_id
-        WHERE p.status = 'PAID'
-        AND DATE(p.created_at) = CURRENT_DATE
+        WHERE {where}
+        AND {today_filter("p.created_at")}
         ORDER BY p.created_at DESC
-    """)
+        LIMIT %(limit)s
+    """, {"since": since, "limit": None if since is None else CHANGE_FEED_MAX_ROWS + 1})
     
     transactions = cursor.fetchall()
+    removed = []
+    
+    if since is not None:
+        check_size(len(transactions))
+        transactions, removed = split_changes(transactions, lambda p: p['status'] == 'PAID', "payment_id")
+        if not transactions and not removed:
+            cursor.close()
+            return {
+                "success": True,
+                "data": {"transactions": [], "removed": [], "summary": None, "cursor": new_cursor}
+            }
     
     # Calculate summary
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT 
             COUNT(*) as transaction_count,
             SUM(amount_paid) as total_revenue,
@@ -593,7 +730,7 @@ def get_today_transactions(
             SUM(CASE WHEN payment_method = 'card' THEN amount_paid ELSE 0 END) as card_total
         FROM payments
         WHERE status = 'PAID'
-        AND DATE(created_at) = CURRENT_DATE
+        AND {today_filter("created_at")}
     """)
     
     summary = cursor.fetchone()
@@ -604,6 +741,8 @@ def get_today_transactions(
         "success": True,
         "data": {
             "transactions": transactions,
+            "removed": removed,
+            "cursor": new_cursor,
             "summary": {
                 "count": summary['transaction_count'] or 0,
                 "total_revenue": float(summary['total_revenue'] or 0),
@@ -1,42 +1,25 @@
-# backend/routes/dashboard.py - FIXED: LẤY DOANH THU TỪ BẢNG PAYMENTS
-from fastapi import APIRouter, Depends, HTTPException, Header
+# backend/routes/dashboard.py - ĐỌC TỪ BẢNG ROLLUP (utils/sales_rollups.py)
+from fastapi import APIRouter, Depends, HTTPException
 from config.database import get_db_connection
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from typing import Optional
-import jwt
-import os
+from utils.dates import date_range_filter
+from utils.auth import Principal, get_current_user
+from utils.log import get_logger
+from utils.schema_registry import schema
+from utils.singleflight import single_flight
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
-
-SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
-ALGORITHM = "HS256"
-
-def verify_token(authorization: Optional[str] = Header(None)):
-    """Verify JWT token from Authorization header"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(status_code=401, detail="Invalid authorization scheme")
-        
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    except Exception as e:
-        raise HTTPException(status_code=401, detail=str(e))
+logger = get_logger(__name__)
 
 @router.get("/stats")
+@single_flight("dashboard", ttl=5.0)
 def get_dashboard_stats(
-    date_from: Optional[str] = None,
-    date_to: Optional[str] = None,
-    current_user: dict = Depends(verify_token)
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Dashboard stats - LẤY TỪ BẢNG PAYMENTS"""
+    """Dashboard stats - LẤY TỪ BẢNG ROLLUP"""
     conn = None
     cursor = None
     
@@ -44,79 +27,53 @@ def get_dashboard_stats(
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        print(f"\n{'='*70}")
-        print(f"📊 LOADING DASHBOARD STATS")
-        print(f"{'='*70}")
-        
-        date_filter = ""
-        params = []
-        
-        if date_from:
-            date_filter += " AND DATE(p.created_at) >= %s"
-            params.append(date_from)
-        
-        if date_to:
-            date_filter += " AND DATE(p.created_at) <= %s"
-            params.append(date_to)
-        
-        # 1. DOANH THU TỪ BẢNG PAYMENTS
-        query = f"""
-            SELECT COALESCE(SUM(amount_paid), 0) as total_revenue
-            FROM payments p
-            WHERE status = 'PAID'
-            {date_filter}
-        """
-        cursor.execute(query, params) if params else cursor.execute(query)
-        revenue_result = cursor.fetchone()
-        total_revenue = float(revenue_result['total_revenue']) if revenue_result else 0
-        
-        print(f"💰 Total Revenue: {total_revenue:,.0f}đ")
-        
-        # 2. TỔNG ĐƠN HÀNG
-        query = f"""
-            SELECT COUNT(*) as total_orders
-            FROM payments p
-            WHERE status = 'PAID'
-            {date_filter}
-        """
-        cursor.execute(query, params) if params else cursor.execute(query)
-        orders_result = cursor.fetchone()
-        total_orders = int(orders_result['total_orders']) if orders_result else 0
-        
-        print(f"📦 Total Orders: {total_orders}")
+        date_filter, params = date_range_filter("r.sale_date", date_from, date_to)
+        
+        # 1-2. DOANH THU + TỔNG ĐƠN (đã thanh toán)
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(revenue), 0) as total_revenue,
+                   COALESCE(SUM(payment_count), 0) as total_orders
+            FROM sales_rollup r
+            WHERE TRUE {date_filter}
+        """, params)
+        totals = cursor.fetchone()
+        total_revenue = float(totals['total_revenue'])
+        total_orders = int(totals['total_orders'])
         
         # 3. GIÁ TRỊ TRUNG BÌNH
         avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-        print(f"📊 Avg Value: {avg_order_value:,.0f}đ")
         
         # 4-5. BÀN
-        cursor.execute("SELECT COUNT(*) as total_tables FROM tables")
+        cursor.execute(f"SELECT COUNT(*) as total_tables FROM {schema.tables}")
         total_tables = int(cursor.fetchone()['total_tables'])
         
-        cursor.execute("SELECT COUNT(*) as occupied FROM tables WHERE status = 'OCCUPIED'")
+        cursor.execute(f"SELECT COUNT(*) as occupied FROM {schema.tables} WHERE status = 'OCCUPIED'")
         occupied_tables = int(cursor.fetchone()['occupied'])
         
         # 6. TOP MÓN BÁN CHẠY
-        query = f"""
+        cursor.execute(f"""
             SELECT 
                 m.item_name,
                 m.image_url,
                 c.category_name,
-                COUNT(DISTINCT p.payment_id) as order_count,
-                SUM(oi.quantity) as total_quantity,
-                SUM(oi.quantity * m.price) as revenue
-            FROM payments p
-            JOIN orders o ON p.order_id = o.order_id
-            JOIN order_items oi ON o.order_id = oi.order_id
-            JOIN menu_items m ON oi.item_id = m.item_id
+                top.order_count,
+                top.total_quantity,
+                top.revenue
+            FROM (
+                SELECT item_id,
+                       SUM(order_count) as order_count,
+                       SUM(quantity) as total_quantity,
+                       SUM(revenue) as revenue
+                FROM item_sales_rollup r
+                WHERE TRUE {date_filter}
+                GROUP BY item_id
+                ORDER BY order_count DESC
+                LIMIT 5
+            ) top
+            JOIN menu_items m ON top.item_id = m.item_id
             LEFT JOIN categories c ON m.category_id = c.category_id
-            WHERE p.status = 'PAID'
-            {date_filter}
-            GROUP BY m.item_id, m.item_name, m.image_url, c.category_name
-            ORDER BY order_count DESC
-            LIMIT 5
-        """
-        cursor.execute(query, params) if params else cursor.execute(query)
+            ORDER BY top.order_count DESC
+        """, params)
         popular_items = cursor.fetchall()
         
         # 7. TRẠNG THÁI ĐƠN HÀNG
@@ -131,8 +88,6 @@ def get_dashboard_stats(
         """)
         status_breakdown = cursor.fetchone()
         
-        print(f"{'='*70}\n")
-        
         return {
             "success": True,
             "data": {
@@ -147,9 +102,7 @@ def get_dashboard_stats(
         }
         
     except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Dashboard stats failed")
         raise HTTPException(status_code=500, detail=str(e))
         
     finally:
@@ -159,8 +112,9 @@ def get_dashboard_stats(
             conn.close()
 
 @router.get("/today")
-def get_today_summary(current_user: dict = Depends(verify_token)):
-    """Thống kê hôm nay - LẤY TỪ PAYMENTS"""
+@single_flight("dashboard", ttl=5.0)
+def get_today_summary(current_user: Principal = Depends(get_current_user)):
+    """Thống kê hôm nay - LẤY TỪ BẢNG ROLLUP"""
     conn = None
     cursor = None
     
@@ -168,23 +122,16 @@ def get_today_summary(current_user: dict = Depends(verify_token)):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # DOANH THU HÔM NAY
-        cursor.execute("""
-            SELECT COALESCE(SUM(amount_paid), 0) as today_revenue
-            FROM payments
-            WHERE DATE(created_at) = CURRENT_DATE
-            AND status = 'PAID'
-        """)
-        today_revenue = float(cursor.fetchone()['today_revenue'])
-        
-        # ĐƠN HÀNG HÔM NAY
+        # DOANH THU + ĐƠN HÀNG HÔM NAY
         cursor.execute("""
-            SELECT COUNT(*) as today_orders
-            FROM payments
-            WHERE DATE(created_at) = CURRENT_DATE
-            AND status = 'PAID'
+            SELECT COALESCE(SUM(revenue), 0) as today_revenue,
+                   COALESCE(SUM(payment_count), 0) as today_orders
+            FROM sales_rollup
+            WHERE sale_date = CURRENT_DATE
         """)
-        today_orders = int(cursor.fetchone()['today_orders'])
+        today = cursor.fetchone()
+        today_revenue = float(today['today_revenue'])
+        today_orders = int(today['today_orders'])
         
         # ĐƠN ĐANG XỬ LÝ
         cursor.execute("""
@@ -195,15 +142,13 @@ def get_today_summary(current_user: dict = Depends(verify_token)):
         active_orders = int(cursor.fetchone()['active_orders'])
         
         # BÀN CÓ KHÁCH
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT COUNT(*) as occupied_tables
-            FROM tables
+            FROM {schema.tables}
             WHERE status = 'OCCUPIED'
         """)
         occupied_tables = int(cursor.fetchone()['occupied_tables'])
         
-        print(f"📅 HÔM NAY: {today_revenue:,.0f}đ | {today_orders} đơn")
-        
         return {
             "success": True,
             "data": {
@@ -215,7 +160,7 @@ def get_today_summary(current_user: dict = Depends(verify_token)):
         }
         
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.exception("Today summary failed")
         raise HTTPException(status_code=500, detail=str(e))
         
     finally:
@@ -225,12 +170,13 @@ def get_today_summary(current_user: dict = Depends(verify_token)):
             conn.close()
 
 @router.get("/revenue")
+@single_flight("dashboard", ttl=5.0)
 def get_revenue_data(
     period: str = "daily",
     limit: int = 30,
-    current_user: dict = Depends(verify_token)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Biểu đồ doanh thu - LẤY TỪ PAYMENTS"""
+    """Biểu đồ doanh thu - LẤY TỪ BẢNG ROLLUP"""
     conn = None
     cursor = None
     
@@ -241,13 +187,12 @@ def get_revenue_data(
         if period == "daily":
             cursor.execute("""
                 SELECT 
-                    DATE(created_at) as date, 
-                    COALESCE(SUM(amount_paid), 0) as revenue,
-                    COUNT(*) as orders
-                FROM payments
-                WHERE status = 'PAID'
-                AND created_at >= CURRENT_DATE - INTERVAL '30 days'
-                GROUP BY DATE(created_at)
+                    sale_date as date, 
+                    COALESCE(SUM(revenue), 0) as revenue,
+                    SUM(payment_count) as orders
+                FROM sales_rollup
+                WHERE sale_date >= CURRENT_DATE - 30
+                GROUP BY sale_date
                 ORDER BY date DESC
                 LIMIT %s
             """, (limit,))
@@ -255,13 +200,12 @@ def get_revenue_data(
         elif period == "weekly":
             cursor.execute("""
                 SELECT 
-                    DATE_TRUNC('week', created_at) as date,
-                    COALESCE(SUM(amount_paid), 0) as revenue,
-                    COUNT(*) as orders
-                FROM payments
-                WHERE status = 'PAID'
-                AND created_at >= CURRENT_DATE - INTERVAL '12 weeks'
-                GROUP BY DATE_TRUNC('week', created_at)
+                    DATE_TRUNC('week', sale_date::timestamp) as date,
+                    COALESCE(SUM(revenue), 0) as revenue,
+                    SUM(payment_count) as orders
+                FROM sales_rollup
+                WHERE sale_date >= CURRENT_DATE - INTERVAL '12 weeks'
+                GROUP BY 1
                 ORDER BY date DESC
                 LIMIT %s
             """, (limit,))
@@ -269,13 +213,12 @@ def get_revenue_data(
         elif period == "monthly":
             cursor.execute("""
                 SELECT 
-                    DATE_TRUNC('month', created_at) as date,
-                    COALESCE(SUM(amount_paid), 0) as revenue,
-                    COUNT(*) as orders
-                FROM payments
-                WHERE status = 'PAID'
-                AND created_at >= CURRENT_DATE - INTERVAL '12 months'
-                GROUP BY DATE_TRUNC('month', created_at)
+                    DATE_TRUNC('month', sale_date::timestamp) as date,
+                    COALESCE(SUM(revenue), 0) as revenue,
+                    SUM(payment_count) as orders
+                FROM sales_rollup
+                WHERE sale_date >= CURRENT_DATE - INTERVAL '12 months'
+                GROUP BY 1
                 ORDER BY date DESC
                 LIMIT %s
             """, (limit,))
@@ -293,7 +236,7 @@ def get_revenue_data(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.exception("Revenue chart failed", extra={"period": period})
         raise HTTPException(status_code=500, detail=str(e))
         
     finally:
@@ -303,12 +246,13 @@ def get_revenue_data(
             conn.close()
 
 @router.get("/categories/stats")
+@single_flight("dashboard", ttl=5.0)
 def get_category_stats(
-    date_from: Optional[str] = None,
-    date_to: Optional[str] = None,
-    current_user: dict = Depends(verify_token)
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Thống kê theo danh mục - LẤY TỪ PAYMENTS"""
+    """Thống kê theo danh mục - LẤY TỪ BẢNG ROLLUP"""
     conn = None
     cursor = None
     
@@ -316,45 +260,29 @@ def get_category_stats(
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        date_filter = ""
-        params = []
-        
-        if date_from:
-            date_filter += " AND DATE(p.created_at) >= %s"
-            params.append(date_from)
-        
-        if date_to:
-            date_filter += " AND DATE(p.created_at) <= %s"
-            params.append(date_to)
+        date_filter, params = date_range_filter("r.sale_date", date_from, date_to)
         
         # TỔNG DOANH THU
-        query = f"""
-            SELECT COALESCE(SUM(amount_paid), 1) as total
-            FROM payments p
-            WHERE status = 'PAID' 
-            {date_filter}
-        """
-        cursor.execute(query, params) if params else cursor.execute(query)
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(revenue), 1) as total
+            FROM sales_rollup r
+            WHERE TRUE {date_filter}
+        """, params)
         total_revenue = float(cursor.fetchone()['total'])
         
         # THỐNG KÊ THEO DANH MỤC
-        query = f"""
+        cursor.execute(f"""
             SELECT 
                 COALESCE(c.category_name, 'Uncategorized') as category_name,
-                COUNT(DISTINCT p.payment_id) as order_count,
-                SUM(oi.quantity) as items_sold,
-                COALESCE(SUM(oi.quantity * m.price), 0) as revenue
-            FROM payments p
-            JOIN orders o ON p.order_id = o.order_id
-            JOIN order_items oi ON o.order_id = oi.order_id
-            JOIN menu_items m ON oi.item_id = m.item_id
-            LEFT JOIN categories c ON m.category_id = c.category_id
-            WHERE p.status = 'PAID'
-            {date_filter}
-            GROUP BY c.category_id, c.category_name
+                SUM(r.order_count) as order_count,
+                SUM(r.items_sold) as items_sold,
+                COALESCE(SUM(r.revenue), 0) as revenue
+            FROM category_sales_rollup r
+            LEFT JOIN categories c ON r.category_id = c.category_id
+            WHERE TRUE {date_filter}
+            GROUP BY r.category_id, c.category_name
             ORDER BY revenue DESC
-        """
-        cursor.execute(query, params) if params else cursor.execute(query)
+        """, params)
         category_stats = cursor.fetchall()
         
         # TÍNH %
@@ -372,7 +300,7 @@ def get_category_stats(
         }
         
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.exception("Category stats failed")
         raise HTTPException(status_code=500, detail=str(e))
         
     finally:
@@ -382,7 +310,8 @@ def get_category_stats(
             conn.close()
 
 @router.get("/performance/hourly")
-def get_hourly_performance(current_user: dict = Depends(verify_token)):
+@single_flight("dashboard", ttl=5.0)
+def get_hourly_performance(current_user: Principal = Depends(get_current_user)):
     """Thống kê theo giờ"""
     conn = None
     cursor = None
@@ -392,13 +321,12 @@ def get_hourly_performance(current_user: dict = Depends(verify_token)):
         
         cursor.execute("""
             SELECT 
-                EXTRACT(HOUR FROM created_at)::INTEGER as hour,
-                COUNT(*) as order_count,
-                COALESCE(SUM(amount_paid), 0) as revenue
-            FROM payments
-            WHERE DATE(created_at) = CURRENT_DATE
-            AND status = 'PAID'
-            GROUP BY EXTRACT(HOUR FROM created_at)
+                sale_hour::INTEGER as hour,
+                SUM(payment_count) as order_count,
+                COALESCE(SUM(revenue), 0) as revenue
+            FROM sales_rollup
+            WHERE sale_date = CURRENT_DATE
+            GROUP BY sale_hour
             ORDER BY hour ASC
         """)
         
@@ -408,7 +336,7 @@ def get_hourly_performance(current_user: dict = Depends(verify_token)):
         }
         
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.exception("Hourly performance failed")
         raise HTTPException(status_code=500, detail=str(e))
         
     finally:
@@ -418,9 +346,10 @@ def get_hourly_performance(current_user: dict = Depends(verify_token)):
             conn.close()
 
 @router.get("/orders/chart")
+@single_flight("dashboard", ttl=5.0)
 def get_orders_chart_data(
     days: int = 7,
-    current_user: dict = Depends(verify_token)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Biểu đồ đơn hàng"""
     conn = None
@@ -430,24 +359,32 @@ def get_orders_chart_data(
         conn = get_db_connection()
         cursor = conn.cursor()
         
+        # Doanh thu theo ngày lấy từ sales_rollup thay vì subquery trên payments
         cursor.execute("""
             SELECT 
-                DATE(o.created_at) as date,
-                COUNT(*) as total_orders,
-                COUNT(CASE WHEN o.status IN ('COMPLETED', 'PAID') THEN 1 END) as completed,
-                COUNT(CASE WHEN o.status = 'CANCELLED' THEN 1 END) as cancelled,
-                COALESCE(
-                    (SELECT SUM(p.amount_paid) 
-                     FROM payments p 
-                     WHERE DATE(p.created_at) = DATE(o.created_at) 
-                     AND p.status = 'PAID'), 
-                    0
-                ) as revenue
-            FROM orders o
-            WHERE o.created_at >= CURRENT_DATE - INTERVAL '%s days'
-            GROUP BY DATE(o.created_at)
-            ORDER BY date ASC
-        """, (days,))
+                d.date,
+                d.total_orders,
+                d.completed,
+                d.cancelled,
+                COALESCE(r.revenue, 0) as revenue
+            FROM (
+                SELECT 
+                    DATE(o.created_at) as date,
+                    COUNT(*) as total_orders,
+                    COUNT(CASE WHEN o.status IN ('COMPLETED', 'PAID') THEN 1 END) as completed,
+                    COUNT(CASE WHEN o.status = 'CANCELLED' THEN 1 END) as cancelled
+                FROM orders o
+                WHERE o.created_at >= CURRENT_DATE - %s
+                GROUP BY DATE(o.created_at)
+            ) d
+            LEFT JOIN (
+                SELECT sale_date, SUM(revenue) as revenue
+                FROM sales_rollup
+                WHERE sale_date >= CURRENT_DATE - %s
+                GROUP BY sale_date
+            ) r ON r.sale_date = d.date
+            ORDER BY d.date ASC
+        """, (days, days))
         
         return {
             "success": True,
@@ -455,7 +392,7 @@ def get_orders_chart_data(
         }
         
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.exception("Orders chart failed")
         raise HTTPException(status_code=500, detail=str(e))
         
     finally:
@@ -1,39 +1,14 @@
 # routes/employees.py - WITH PASSWORD RESET ENDPOINT
-from fastapi import APIRouter, Depends, HTTPException, Header
-from utils.auth import get_password_hash
+from fastapi import APIRouter, Depends, HTTPException
+from utils.auth import Principal, get_current_user
+from utils.hashing import password_hasher
+from utils.log import get_logger
 from config.database import get_db_connection
 from pydantic import BaseModel
 from typing import Optional
-import jwt
-import os
 
 router = APIRouter(prefix="/api/employees", tags=["employees"])
-
-SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
-ALGORITHM = "HS256"
-
-# ============================================================================
-# AUTH DEPENDENCY - USES AUTHORIZATION HEADER
-# ============================================================================
-
-def verify_token(authorization: Optional[str] = Header(None)):
-    """Verify JWT token from Authorization header"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != 'bearer':
-            raise HTTPException(status_code=401, detail="Invalid authorization scheme")
-        
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    except Exception as e:
-        raise HTTPException(status_code=401, detail=str(e))
+logger = get_logger(__name__)
 
 # ============================================================================
 # POSITION TO ROLE MAPPING
@@ -52,8 +27,6 @@ def get_role_id_from_position(cursor, position: str) -> int:
     # Map position to role_name
     role_name = POSITION_TO_ROLE.get(position, "STAFF")  # Default to STAFF
     
-    print(f"📍  Position: '{position}' → Role: '{role_name}'")
-    
     # Get role_id from database
     cursor.execute(
         "SELECT role_id FROM roles WHERE role_name = %s LIMIT 1",
@@ -72,7 +45,7 @@ def get_role_id_from_position(cursor, position: str) -> int:
             raise Exception(f"Cannot find role_id for position '{position}'")
     
     role_id = role_result['role_id']
-    print(f"   → role_id: {role_id}")
+    logger.debug("Position mapped to role", extra={"position": position, "role": role_name, "role_id": role_id})
     
     return role_id
 
@@ -155,19 +128,15 @@ def validate_employee_data(employee: EmployeeCreate) -> dict:
 # ============================================================================
 
 @router.get("")
-def get_employees(current_user: dict = Depends(verify_token)):
+def get_employees(current_user: Principal = Depends(get_current_user)):
     """Get all employees - OWNER/ADMIN only"""
     
     conn = None
     cursor = None
     
     try:
-        print(f"\n{'='*70}")
-        print(f"[GET EMPLOYEES]")
-        print(f"{'='*70}")
-        
         # Allow OWNER and ADMIN to view
-        if current_user.get("role") not in ["OWNER", "ADMIN"]:
+        if current_user.role not in ["OWNER", "ADMIN"]:
             raise HTTPException(
                 status_code=403,
                 detail="Chỉ OWNER/ADMIN mới có quyền xem danh sách nhân viên"
@@ -210,9 +179,6 @@ def get_employees(current_user: dict = Depends(verify_token)):
                 'is_active': row['is_active']
             })
 
-        print(f"✅ Loaded {len(employees)} employees")
-        print(f"{'='*70}\n")
-
         return {
             "success": True,
             "data": employees
@@ -221,9 +187,7 @@ def get_employees(current_user: dict = Depends(verify_token)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Loading employees failed")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if cursor:
@@ -234,24 +198,13 @@ def get_employees(current_user: dict = Depends(verify_token)):
 @router.post("")
 def create_employee(
     employee: EmployeeCreate,
-    current_user: dict = Depends(verify_token)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create new employee - OWNER/ADMIN only, auto-assign role based on position"""
     
-    print(f"\n{'='*70}")
-    print(f"➕ [CREATE EMPLOYEE] REQUEST RECEIVED")
-    print(f"{'='*70}")
-    print(f"Current user: {current_user.get('username')} (role: {current_user.get('role')})")
-    print(f"\n📝 RAW DATA:")
-    print(f"  username: '{employee.username}'")
-    print(f"  full_name: '{employee.full_name}'")
-    print(f"  phone: '{employee.phone}'")
-    print(f"  position: '{employee.position}'")
-    print(f"{'='*70}\n")
-    
     # Check permission
-    if current_user.get("role") not in ["OWNER", "ADMIN"]:
-        print(f"❌ Permission denied")
+    if current_user.role not in ["OWNER", "ADMIN"]:
+        logger.warning("Create employee denied", extra={"username": current_user.username, "role": current_user.role})
         raise HTTPException(
             status_code=403, 
             detail="Chỉ OWNER/ADMIN mới có quyền tạo nhân viên"
@@ -262,18 +215,13 @@ def create_employee(
     
     try:
         # Validate data
-        print(f"🔍 Validating data...")
         validated_data = validate_employee_data(employee)
-        print(f"✅ Data validated")
         
         # Connect to database
-        print(f"\n🔌 Connecting to database...")
         conn = get_db_connection()
         cursor = conn.cursor()
-        print(f"✅ Database connected")
         
         # Check username exists
-        print(f"\n🔍 Checking if username exists...")
         cursor.execute(
             "SELECT user_id, username FROM users WHERE username = %s", 
             (validated_data['username'],)
@@ -281,26 +229,18 @@ def create_employee(
         existing = cursor.fetchone()
         
         if existing:
-            print(f"❌ Username already exists: {existing['username']}")
             raise HTTPException(
                 status_code=400, 
                 detail=f"Tên đăng nhập '{validated_data['username']}' đã tồn tại"
             )
         
-        print(f"✅ Username available")
-        
         # Hash password
-        print(f"\n🔐 Hashing password...")
-        hashed_password = get_password_hash(validated_data['password'])
-        print(f"✅ Password hashed")
+        hashed_password = password_hasher.hash_blocking(validated_data['password'])
         
         # GET ROLE_ID FROM POSITION
-        print(f"\n📍 Mapping position to role...")
         role_id = get_role_id_from_position(cursor, validated_data['position'])
-        print(f"✅ Position '{validated_data['position']}' → role_id: {role_id}")
         
         # Create user account
-        print(f"\n👤 Creating user account...")
         cursor.execute("""
             INSERT INTO users (username, password, role_id, is_active)
             VALUES (%s, %s, %s, true)
@@ -313,10 +253,8 @@ def create_employee(
             raise Exception("Failed to create user - no user_id returned")
         
         user_id = user_result['user_id']
-        print(f"✅ User created - User ID: {user_id}")
         
         # Create employee record
-        print(f"\n👔 Creating employee record...")
         cursor.execute("""
             INSERT INTO employees (user_id, full_name, phone, position, hire_date)
             VALUES (%s, %s, %s, %s, CURRENT_DATE)
@@ -334,12 +272,9 @@ def create_employee(
             raise Exception("Failed to create employee - no employee_id returned")
         
         employee_id = emp_result['employee_id']
-        print(f"✅ Employee created - Employee ID: {employee_id}")
         
         # Commit transaction
-        print(f"\n💾 Committing transaction...")
         conn.commit()
-        print(f"✅ Transaction committed")
         
         result = {
             "success": True,
@@ -355,33 +290,21 @@ def create_employee(
             }
         }
         
-        print(f"\n{'='*70}")
-        print(f"✅ CREATE EMPLOYEE SUCCESS")
-        print(f"   Employee: {validated_data['full_name']}")
-        print(f"   Position: {validated_data['position']}")
-        print(f"   Role: {POSITION_TO_ROLE[validated_data['position']]}")
-        print(f"{'='*70}\n")
+        logger.info("Employee created", extra={"employee_id": employee_id, "user_id": user_id,
+                                               "position": validated_data['position'], "by": current_user.username})
         
         return result
         
     except HTTPException as he:
         if conn:
             conn.rollback()
-            print(f"🔄 Transaction rolled back (HTTP error)")
         raise he
         
     except Exception as e:
         if conn:
             conn.rollback()
-            print(f"🔄 Transaction rolled back")
         
-        print(f"\n{'='*70}")
-        print(f"❌ CREATE EMPLOYEE ERROR")
-        print(f"{'='*70}")
-        print(f"Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print(f"{'='*70}\n")
+        logger.exception("Creating employee failed")
         
         raise HTTPException(
             status_code=500, 
@@ -398,15 +321,11 @@ def create_employee(
 def update_employee(
     employee_id: int,
     employee: EmployeeUpdate,
-    current_user: dict = Depends(verify_token)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Update employee - OWNER/ADMIN only, changing position changes role"""
     
-    print(f"\n{'='*70}")
-    print(f"✏️ [UPDATE EMPLOYEE] ID: {employee_id}")
-    print(f"{'='*70}")
-    
-    if current_user.get("role") not in ["OWNER", "ADMIN"]:
+    if current_user.role not in ["OWNER", "ADMIN"]:
         raise HTTPException(
             status_code=403, 
             detail="Chỉ OWNER/ADMIN mới có quyền cập nhật nhân viên"
@@ -471,8 +390,6 @@ def update_employee(
         
         # IF POSITION CHANGED, UPDATE ROLE IN USERS TABLE
         if employee.position and employee.position != old_position:
-            print(f"\n📍 Position changed: '{old_position}' → '{employee.position}'")
-            
             new_role_id = get_role_id_from_position(cursor, employee.position)
             
             cursor.execute("""
@@ -481,12 +398,9 @@ def update_employee(
                 WHERE user_id = %s
             """, (new_role_id, user_id))
             
-            print(f"✅ Role updated to match new position")
-        
         conn.commit()
         
-        print(f"✅ Updated employee ID: {employee_id}")
-        print(f"{'='*70}\n")
+        logger.info("Employee updated", extra={"employee_id": employee_id, "by": current_user.username})
         
         return {
             "success": True,
@@ -500,7 +414,7 @@ def update_employee(
     except Exception as e:
         if conn:
             conn.rollback()
-        print(f"❌ UPDATE ERROR: {e}")
+        logger.exception("Updating employee failed", extra={"employee_id": employee_id})
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if cursor:
@@ -516,16 +430,12 @@ def update_employee(
 def reset_employee_password(
     employee_id: int,
     password_data: PasswordReset,
-    current_user: dict = Depends(verify_token)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Reset employee password - OWNER/ADMIN only"""
     
-    print(f"\n{'='*70}")
-    print(f"🔑 [RESET PASSWORD] Employee ID: {employee_id}")
-    print(f"{'='*70}")
-    
     # Only OWNER/ADMIN can reset passwords
-    if current_user.get("role") not in ["OWNER", "ADMIN"]:
+    if current_user.role not in ["OWNER", "ADMIN"]:
         raise HTTPException(
             status_code=403,
             detail="Chỉ OWNER/ADMIN mới có quyền đặt lại mật khẩu"
@@ -566,16 +476,14 @@ def reset_employee_password(
         username = result['username']
         
         # Prevent self password reset through this endpoint (they should use change password)
-        if user_id == current_user.get('user_id'):
+        if user_id == current_user.user_id:
             raise HTTPException(
                 status_code=400,
                 detail="Không thể đặt lại mật khẩu của chính mình qua tính năng này. Vui lòng sử dụng chức năng đổi mật khẩu."
             )
         
         # Hash new password
-        print(f"🔐 Hashing new password...")
-        hashed_password = get_password_hash(password_data.new_password)
-        print(f"✅ Password hashed")
+        hashed_password = password_hasher.hash_blocking(password_data.new_password)
         
         # Update password
         cursor.execute("""
@@ -586,8 +494,7 @@ def reset_employee_password(
         
         conn.commit()
         
-        print(f"✅ Password reset for: {full_name} ({username})")
-        print(f"{'='*70}\n")
+        logger.info("Employee password reset", extra={"employee_id": employee_id, "by": current_user.username})
         
         return {
             "success": True,
@@ -601,9 +508,7 @@ def reset_employee_password(
     except Exception as e:
         if conn:
             conn.rollback()
-        print(f"❌ RESET PASSWORD ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Resetting employee password failed", extra={"employee_id": employee_id})
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if cursor:
@@ -614,15 +519,11 @@ def reset_employee_password(
 @router.delete("/{employee_id}")
 def delete_employee(
     employee_id: int,
-    current_user: dict = Depends(verify_token)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Delete employee - OWNER/ADMIN only"""
     
-    print(f"\n{'='*70}")
-    print(f"🗑️ [DELETE EMPLOYEE] ID: {employee_id}")
-    print(f"{'='*70}")
-    
-    if current_user.get("role") not in ["OWNER", "ADMIN"]:
+    if current_user.role not in ["OWNER", "ADMIN"]:
         raise HTTPException(
             status_code=403, 
             detail="Chỉ OWNER/ADMIN mới có quyền xóa nhân viên"
@@ -656,7 +557,7 @@ def delete_employee(
         username = result['username']
         
         # Prevent self-deletion
-        if user_id == current_user.get('user_id'):
+        if user_id == current_user.user_id:
             raise HTTPException(
                 status_code=400,
                 detail="Không thể xóa chính mình"
@@ -670,8 +571,7 @@ def delete_employee(
         
         conn.commit()
         
-        print(f" Deleted: {full_name} ({username})")
-        print(f"{'='*70}\n")
+        logger.info("Employee deleted", extra={"employee_id": employee_id, "by": current_user.username})
         
         return {
             "success": True,
@@ -685,7 +585,7 @@ def delete_employee(
     except Exception as e:
         if conn:
             conn.rollback()
-        print(f"❌ DELETE ERROR: {e}")
+        logger.exception("Deleting employee failed", extra={"employee_id": employee_id})
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if cursor:
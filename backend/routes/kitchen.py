@@ -1,82 +1,170 @@
 # backend/routes/kitchen.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from config.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from config.database import get_db, get_db_connection
 from models.schemas import KitchenOrderStatusUpdate
-from middleware.auth import verify_token
+from utils.auth import Principal, get_current_user
+from utils.log import get_logger, SAMPLED
+from utils.kitchen_events import broker, notify_kitchen_event, TICKET_STATUS_CHANGED
+from utils.dates import today_filter
+from utils.singleflight import single_flight
+from utils.change_feed import CHANGE_FEED_MAX_ROWS, since_query, read_cursor, check_size, split_changes
+from utils.schema_registry import schema
+from utils.status_transitions import transition, try_transition
 from typing import Optional
+import asyncio
+import json
+import os
+
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("KITCHEN_STREAM_HEARTBEAT", "15"))
 
 router = APIRouter(prefix="/api/kitchen", tags=["Kitchen Management"])
+logger = get_logger(__name__)
+
+# One round-trip: items are aggregated per ticket and elapsed time is computed
+# by PostgreSQL, instead of two extra queries for every ticket on the board.
+KITCHEN_BOARD_QUERY = """
+    SELECT ko.*, o.order_id, o.total_amount, o.created_at as order_time,
+           t.table_number,
+           FLOOR(EXTRACT(EPOCH FROM (NOW() - o.created_at)) / 60)::int as elapsed_minutes,
+           COALESCE(items.items, '[]'::jsonb) as items
+    FROM kitchen_orders ko
+    JOIN orders o ON ko.order_id = o.order_id
+    JOIN {tables} t ON o.table_id = t.table_id
+    LEFT JOIN LATERAL (
+        SELECT jsonb_agg(
+                   to_jsonb(oi) || jsonb_build_object(
+                       'item_name', m.item_name,
+                       'description', m.description
+                   )
+                   ORDER BY oi.order_item_id
+               ) as items
+        FROM order_items oi
+        JOIN menu_items m ON oi.item_id = m.item_id
+        WHERE oi.order_id = o.order_id
+    ) items ON TRUE
+    WHERE {where}
+    ORDER BY ko.updated_at ASC, o.created_at ASC
+    {limit}
+"""
+
+def on_board(ticket: dict, status: Optional[str] = None) -> bool:
+    """Whether a ticket is shown on a board filtered by `status` (same rule as fetch_kitchen_board)"""
+    return ticket['status'] == status.upper() if status else ticket['status'] != 'COMPLETED'
+
+def fetch_kitchen_board(cursor, status: Optional[str] = None, since: Optional[int] = None) -> list:
+    """
+    Build the kitchen board (tickets + items + elapsed time) in a single query
+
+    With `since`, every ticket changed after that cursor, whatever its status
+    (order cancel/payment cascade to the tickets, so ticket changes are enough).
+    """
+    if since is not None:
+        cursor.execute(KITCHEN_BOARD_QUERY.format(
+            where="ko.change_seq >= %s", tables=schema.tables, limit="LIMIT %s"),
+            (since, CHANGE_FEED_MAX_ROWS + 1))
+    elif status:
+        cursor.execute(KITCHEN_BOARD_QUERY.format(where="ko.status = %s", tables=schema.tables, limit=""),
+                       (status.upper(),))
+    else:
+        # By default, don't show completed orders
+        cursor.execute(KITCHEN_BOARD_QUERY.format(where="ko.status != 'COMPLETED'", tables=schema.tables, limit=""))
+    return cursor.fetchall()
+
+def ticket_order_id(cursor, kitchen_order_id: int) -> int:
+    """Order of a ticket (plain read, no lock); 404 if the ticket does not exist"""
+    cursor.execute("SELECT order_id FROM kitchen_orders WHERE kitchen_order_id = %s", (kitchen_order_id,))
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Kitchen order not found")
+    return row['order_id']
 
 @router.get("")
+@single_flight("kitchen_board", ttl=0.5)
 def get_kitchen_orders(
     status: Optional[str] = None,
-    current_user: dict = Depends(verify_token),
-    conn=Depends(get_db)
+    since: Optional[int] = since_query(),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all kitchen orders"""
-    cursor = conn.cursor()
-    
-    query = """
-        SELECT ko.*, o.order_id, o.total_amount, o.created_at as order_time,
-               t.table_number
-        FROM kitchen_orders ko
-        JOIN orders o ON ko.order_id = o.order_id
-        JOIN tables t ON o.table_id = t.table_id
-        WHERE 1=1
     """
-    params = []
-    
-    if status:
-        query += " AND ko.status = %s"
-        params.append(status.upper())
-    else:
-        # By default, don't show completed orders
-        query += " AND ko.status != 'COMPLETED'"
-    
-    query += " ORDER BY ko.updated_at ASC, o.created_at ASC"
+    Get all kitchen orders
     
-    cursor.execute(query, params)
-    orders = cursor.fetchall()
+    `since=<cursor>`: only tickets changed after the cursor; `removed` holds
+    the ids of those that left the board (completed, or outside `status`)
     
-    # Get items for each order
-    for order in orders:
-        cursor.execute("""
-            SELECT oi.*, m.item_name, m.description
-            FROM order_items oi
-            JOIN menu_items m ON oi.item_id = m.item_id
-            WHERE oi.order_id = %s
-        """, (order['order_id'],))
-        order['items'] = cursor.fetchall()
-        # Calculate elapsed time in minutes
-        cursor.execute("""
-            SELECT EXTRACT(EPOCH FROM (NOW() - o.created_at))/60 as elapsed_minutes
-            FROM orders o
-            WHERE o.order_id = %s
-        """, (order['order_id'],))
-        time_result = cursor.fetchone()
-        order['elapsed_minutes'] = int(time_result['elapsed_minutes']) if time_result else 0
-    
-    cursor.close()
+    Identical concurrent polls share one build (utils/singleflight.py)
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        new_cursor = read_cursor(cursor)
+        orders = fetch_kitchen_board(cursor, status, since)
+        cursor.close()
+    finally:
+        conn.close()
+    removed = []
+    if since is not None:
+        check_size(len(orders))
+        orders, removed = split_changes(orders, lambda t: on_board(t, status), "kitchen_order_id")
     return {
         "success": True,
         "data": orders,
-        "count": len(orders)
+        "count": len(orders),
+        "removed": removed,
+        "cursor": new_cursor
     }
+
+@router.get("/stream")
+async def stream_kitchen_events(
+    request: Request,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Server-Sent Events stream of ticket changes
+
+    Events: ticket_created, ticket_status_changed, ticket_cancelled, and
+    resync (the screen missed events and should reload GET /api/kitchen once).
+    """
+    queue = await broker.subscribe()
+
+    async def event_stream():
+        try:
+            yield "event: ready\ndata: {}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                logger.debug("Kitchen event sent", extra={**SAMPLED, "type": event.get('type')})
+                yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{kitchen_order_id}")
 def get_kitchen_order(
     kitchen_order_id: int,
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
     """Get single kitchen order"""
     cursor = conn.cursor()
     
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT ko.*, o.order_id, o.total_amount, o.created_at as order_time,
                t.table_number
         FROM kitchen_orders ko
         JOIN orders o ON ko.order_id = o.order_id
-        JOIN tables t ON o.table_id = t.table_id
+        JOIN {schema.tables} t ON o.table_id = t.table_id
         WHERE ko.kitchen_order_id = %s
     """, (kitchen_order_id,))
     order = cursor.fetchone()
@@ -101,10 +189,15 @@ def get_kitchen_order(
 def update_kitchen_order_status(
     kitchen_order_id: int,
     status_data: KitchenOrderStatusUpdate,
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
-    """Update kitchen order status"""
+    """
+    Update kitchen order status
+
+    Only moves listed in status_transitions; send `version` to get 409 when
+    another screen changed the ticket since it was loaded.
+    """
     cursor = conn.cursor()
     
     try:
@@ -116,40 +209,23 @@ def update_kitchen_order_status(
                 detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
             )
         
-        # Check if kitchen order exists
-        cursor.execute(
-            "SELECT kitchen_order_id, order_id FROM kitchen_orders WHERE kitchen_order_id = %s",
-            (kitchen_order_id,)
-        )
-        kitchen_order = cursor.fetchone()
-        
-        if not kitchen_order:
-            raise HTTPException(status_code=404, detail="Kitchen order not found")
+        # Also move the main order, unless it is already further (e.g. PAID).
+        # Order row before ticket row, like cancel_order and process_payment,
+        # so concurrent requests cannot deadlock; a refused ticket move below
+        # rolls this back too.
+        if status_data.status.upper() in ('READY', 'PREPARING'):
+            order_id = ticket_order_id(cursor, kitchen_order_id)
+            try_transition(cursor, "order", "order_id", order_id, status_data.status)
         
-        # Update kitchen order status
-        cursor.execute("""
-            UPDATE kitchen_orders
-            SET status = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE kitchen_order_id = %s
-            RETURNING *
-        """, (status_data.status.upper(), kitchen_order_id))
-        
-        updated_order = cursor.fetchone()
-        
-        # Also update main order status if kitchen order is ready
-        if status_data.status.upper() == 'READY':
-            cursor.execute("""
-                UPDATE orders
-                SET status = 'READY'
-                WHERE order_id = %s
-            """, (kitchen_order['order_id'],))
-        elif status_data.status.upper() == 'PREPARING':
-            cursor.execute("""
-                UPDATE orders
-                SET status = 'PREPARING'
-                WHERE order_id = %s AND status = 'PENDING'
-            """, (kitchen_order['order_id'],))
+        updated_order = transition(cursor, "kitchen_order", kitchen_order_id,
+                                   status_data.status, status_data.version)
         
+        notify_kitchen_event(
+            cursor, TICKET_STATUS_CHANGED,
+            kitchen_order_id=kitchen_order_id,
+            order_id=updated_order['order_id'],
+            status=updated_order['status']
+        )
         conn.commit()
         cursor.close()
         
@@ -160,6 +236,8 @@ def update_kitchen_order_status(
         }
         
     except HTTPException:
+        conn.rollback()
+        cursor.close()
         raise
     except Exception as e:
         conn.rollback()
@@ -169,34 +247,25 @@ def update_kitchen_order_status(
 @router.post("/{kitchen_order_id}/start")
 def start_preparing(
     kitchen_order_id: int,
-    current_user: dict = Depends(verify_token),
+    version: Optional[int] = Query(None, description="Ticket version last seen; 409 if it changed"),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
     """Start preparing order (shortcut for status=PREPARING)"""
     cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT order_id FROM kitchen_orders WHERE kitchen_order_id = %s", (kitchen_order_id,))
-        kitchen_order = cursor.fetchone()
-        
-        if not kitchen_order:
-            raise HTTPException(status_code=404, detail="Kitchen order not found")
-        
-        cursor.execute("""
-            UPDATE kitchen_orders
-            SET status = 'PREPARING', updated_at = CURRENT_TIMESTAMP
-            WHERE kitchen_order_id = %s
-            RETURNING *
-        """, (kitchen_order_id,))
+        # Update main order (only from PENDING / CONFIRMED); order row first, see above
+        try_transition(cursor, "order", "order_id", ticket_order_id(cursor, kitchen_order_id), "PREPARING")
         
-        updated_order = cursor.fetchone()
-        
-        # Update main order
-        cursor.execute("""
-            UPDATE orders SET status = 'PREPARING'
-            WHERE order_id = %s
-        """, (kitchen_order['order_id'],))
+        updated_order = transition(cursor, "kitchen_order", kitchen_order_id, "PREPARING", version)
         
+        notify_kitchen_event(
+            cursor, TICKET_STATUS_CHANGED,
+            kitchen_order_id=kitchen_order_id,
+            order_id=updated_order['order_id'],
+            status='PREPARING'
+        )
         conn.commit()
         cursor.close()
         
@@ -207,6 +276,8 @@ def start_preparing(
         }
         
     except HTTPException:
+        conn.rollback()
+        cursor.close()
         raise
     except Exception as e:
         conn.rollback()
@@ -216,34 +287,26 @@ def start_preparing(
 @router.post("/{kitchen_order_id}/complete")
 def complete_order(
     kitchen_order_id: int,
-    current_user: dict = Depends(verify_token),
+    version: Optional[int] = Query(None, description="Ticket version last seen; 409 if it changed"),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
     """Mark order as ready (shortcut for status=READY)"""
     cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT order_id FROM kitchen_orders WHERE kitchen_order_id = %s", (kitchen_order_id,))
-        kitchen_order = cursor.fetchone()
+        # Update main order, unless the cashier already moved it on (PAID);
+        # order row first, see update_kitchen_order_status
+        try_transition(cursor, "order", "order_id", ticket_order_id(cursor, kitchen_order_id), "READY")
         
-        if not kitchen_order:
-            raise HTTPException(status_code=404, detail="Kitchen order not found")
-        
-        cursor.execute("""
-            UPDATE kitchen_orders
-            SET status = 'READY', updated_at = CURRENT_TIMESTAMP
-            WHERE kitchen_order_id = %s
-            RETURNING *
-        """, (kitchen_order_id,))
-        
-        updated_order = cursor.fetchone()
-        
-        # Update main order
-        cursor.execute("""
-            UPDATE orders SET status = 'READY'
-            WHERE order_id = %s
-        """, (kitchen_order['order_id'],))
+        updated_order = transition(cursor, "kitchen_order", kitchen_order_id, "READY", version)
         
+        notify_kitchen_event(
+            cursor, TICKET_STATUS_CHANGED,
+            kitchen_order_id=kitchen_order_id,
+            order_id=updated_order['order_id'],
+            status='READY'
+        )
         conn.commit()
         cursor.close()
         
@@ -254,6 +317,8 @@ def complete_order(
         }
         
     except HTTPException:
+        conn.rollback()
+        cursor.close()
         raise
     except Exception as e:
         conn.rollback()
@@ -262,7 +327,7 @@ def complete_order(
 
 @router.get("/stats/summary")
 def get_kitchen_stats(
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
     """Get kitchen statistics"""
@@ -282,12 +347,12 @@ def get_kitchen_stats(
     stats = cursor.fetchone()
     
     # Get average preparation time today
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT AVG(EXTRACT(EPOCH FROM (ko.updated_at - o.created_at))/60) as avg_prep_time
         FROM kitchen_orders ko
         JOIN orders o ON ko.order_id = o.order_id
         WHERE ko.status = 'READY'
-        AND DATE(o.created_at) = CURRENT_DATE
+        AND {today_filter("o.created_at")}
     """)
     
     prep_time = cursor.fetchone()
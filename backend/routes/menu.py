@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response, status
 from config.database import get_db
 from models.schemas import MenuItemCreate, MenuItemUpdate
+from utils.menu_cache import menu_cache, bump_menu_version, etag_matches, accepts_gzip
+from utils.menu_search import menu_search
+from utils.table_tokens import table_claim
+from utils.log import get_logger, SAMPLED
 from typing import Optional
-from psycopg2.extras import RealDictCursor
 
 router = APIRouter(prefix="/api/menu", tags=["Menu Management"])
+logger = get_logger(__name__)
 
 
 # ✅ GET ALL MENU (ADMIN)
@@ -15,7 +19,7 @@ def get_menu_items(
     search: Optional[str] = None,
     conn=Depends(get_db)
 ):
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor = conn.cursor()
     query = """
         SELECT 
             m.item_id,
@@ -42,11 +46,15 @@ def get_menu_items(
         query += " AND UPPER(m.status) = %s"
         params.append(status_filter.upper())
 
+    # Không dấu + tiền tố + xếp hạng (utils/menu_search.py)
+    order_sql, order_params = " ORDER BY m.item_name", []
     if search:
-        query += " AND (m.item_name ILIKE %s OR m.description ILIKE %s)"
-        params.extend([f"%{search}%", f"%{search}%"])
+        where_sql, where_params, order_sql, order_params = menu_search.clause(cursor, search)
+        query += where_sql
+        params.extend(where_params)
 
-    query += " ORDER BY m.item_name"
+    query += order_sql
+    params.extend(order_params)
 
     cursor.execute(query, params)
     items = cursor.fetchall()
@@ -60,36 +68,42 @@ def get_menu_items(
 
 
 # ✅ GET PUBLIC MENU (CUSTOMER)
+# Served from the in-process snapshot (utils/menu_cache.py): no query per scan,
+# pre-compressed body, and 304 when the phone already has this version.
 @router.get("/public")
-def get_public_menu_items(conn=Depends(get_db)):
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    query = """
-        SELECT 
-            m.item_id,
-            m.item_name,
-            m.description,
-            m.price,
-            m.image_url,
-            m.category_id,
-            c.category_name
-        FROM menu_items m
-        LEFT JOIN categories c ON m.category_id = c.category_id
-        WHERE UPPER(m.status) = 'AVAILABLE'
-        ORDER BY m.item_name
-    """
-    cursor.execute(query)
-    items = cursor.fetchall()
-    cursor.close()
-
-    return {
-        "success": True,
-        "count": len(items),
-        "data": items
+def get_public_menu_items(
+    t: Optional[str] = Query(None, description="Mã QR của bàn; kiểm tra trước khi khách chọn món"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    # A replaced / forged QR code fails here, before the customer fills a cart
+    claim = table_claim(t)
+    snapshot = menu_cache.get()
+
+    use_gzip = accepts_gzip(accept_encoding)
+    etag = snapshot.gzip_etag if use_gzip else snapshot.etag
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
     }
+    if claim:
+        headers["X-Table-Number"] = str(claim.table_number)
+
+    not_modified = etag_matches(if_none_match, snapshot.etag) or etag_matches(if_none_match, snapshot.gzip_etag)
+    logger.debug("Public menu from snapshot", extra={
+        **SAMPLED, "version": snapshot.version, "not_modified": not_modified, "gzip": use_gzip})
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 # CREATE MENU ITEM
 @router.post("")
 def create_menu_item(item: MenuItemCreate, conn=Depends(get_db)):
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor = conn.cursor()
     try:
         status_value = "AVAILABLE"
         if hasattr(item, 'status') and item.status:
@@ -109,8 +123,10 @@ def create_menu_item(item: MenuItemCreate, conn=Depends(get_db)):
             status_value
         ))
         new_item = cursor.fetchone()
+        bump_menu_version(cursor)
         conn.commit()
         cursor.close()
+        menu_cache.invalidate()
         return {
             "success": True,
             "message": "Menu item created successfully",
@@ -120,12 +136,12 @@ def create_menu_item(item: MenuItemCreate, conn=Depends(get_db)):
     except Exception as e:
         conn.rollback()
         cursor.close()
-        print(f"🔥 CREATE ERROR: {e}")
+        logger.exception("Creating menu item failed")
         raise HTTPException(status_code=500, detail=str(e))
 #  UPDATE MENU ITEM
 @router.put("/{item_id}")
 def update_menu_item(item_id: int, item: MenuItemUpdate, conn=Depends(get_db)):
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor = conn.cursor()
     try:
         cursor.execute("SELECT * FROM menu_items WHERE item_id = %s", (item_id,))
         if not cursor.fetchone():
@@ -153,8 +169,10 @@ def update_menu_item(item_id: int, item: MenuItemUpdate, conn=Depends(get_db)):
 
         cursor.execute(query, params)
         updated_item = cursor.fetchone()
+        bump_menu_version(cursor)
         conn.commit()
         cursor.close()
+        menu_cache.invalidate()
 
         return {
             "success": True,
@@ -167,7 +185,7 @@ def update_menu_item(item_id: int, item: MenuItemUpdate, conn=Depends(get_db)):
     except Exception as e:
         conn.rollback()
         cursor.close()
-        print(f"🔥 UPDATE ERROR: {e}")
+        logger.exception("Updating menu item failed", extra={"item_id": item_id})
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -182,8 +200,10 @@ def delete_menu_item(item_id: int, conn=Depends(get_db)):
             raise HTTPException(status_code=404, detail="Menu item not found")
 
         cursor.execute("DELETE FROM menu_items WHERE item_id = %s", (item_id,))
+        bump_menu_version(cursor)
         conn.commit()
         cursor.close()
+        menu_cache.invalidate()
 
         return {
             "success": True,
@@ -195,5 +215,5 @@ def delete_menu_item(item_id: int, conn=Depends(get_db)):
     except Exception as e:
         conn.rollback()
         cursor.close()
-        print(f"🔥 DELETE ERROR: {e}")
+        logger.exception("Deleting menu item failed", extra={"item_id": item_id})
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,13 +1,40 @@
 # routes/order.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, status
+from fastapi.responses import JSONResponse
 from config.database import get_db
+from psycopg2.extras import execute_values
+import psycopg2
 from models.schemas import OrderCreate, OrderStatusUpdate
-from middleware.auth import verify_token
+from utils.auth import Principal, get_current_user
+from utils.kitchen_events import notify_kitchen_event, TICKET_CREATED, TICKET_CANCELLED
+from utils import idempotency
+from utils.status_transitions import transition, try_transition
+from utils.dates import date_range_filter
+from utils.change_feed import CHANGE_FEED_MAX_ROWS, since_query, read_cursor, check_size, split_changes
+from utils.log import get_logger
+from utils.schema_registry import schema
+from utils.table_tokens import table_claim, TABLE_TOKEN_REQUIRED
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date
 
 router = APIRouter(prefix="/api/orders", tags=["Order Management"])
+logger = get_logger(__name__)
+
+def insert_order_items(cursor, order_id: int, items) -> None:
+    """Write all lines of an order in one multi-row INSERT (one round-trip)"""
+    if not items:
+        return
+    execute_values(
+        cursor,
+        """
+        INSERT INTO order_items (order_id, item_id, quantity, unit_price, subtotal)
+        VALUES %s
+        """,
+        [(order_id, item.item_id, item.quantity, item.price, item.price * item.quantity)
+         for item in items],
+        page_size=len(items)
+    )
 
 # ========================================
 # MODELS CHO PUBLIC ORDER (khách hàng đặt món)
@@ -19,12 +46,21 @@ class PublicOrderItem(BaseModel):
     price: float
 
 class PublicOrderCreate(BaseModel):
-    table_number: int  # Số bàn (VD: 5)
+    table_token: Optional[str] = None  # Mã QR đã ký của bàn (utils/table_tokens.py)
+    table_number: Optional[int] = None  # Số bàn (VD: 5), khi không có table_token
     customer_name: str  # Tên khách hàng
     items: List[PublicOrderItem]
     total_amount: float
     notes: Optional[str] = None
 
+def _replay_response(stored: idempotency.StoredResponse) -> JSONResponse:
+    """Original response of a request that was already processed"""
+    return JSONResponse(
+        status_code=stored.status_code,
+        content=stored.body,
+        headers={"Idempotent-Replayed": "true"}
+    )
+
 # ========================================
 # PUBLIC ENDPOINT - KHÁCH HÀNG ĐẶT MÓN QUA QR CODE
 # KHÔNG CẦN AUTHENTICATION 
@@ -33,15 +69,22 @@ class PublicOrderCreate(BaseModel):
 @router.post("/public", status_code=status.HTTP_201_CREATED)
 def create_public_order(
     order_data: PublicOrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     conn=Depends(get_db)
 ):
     """
      PUBLIC ENDPOINT - Khách hàng đặt món qua QR code
     KHÔNG CẦN TOKEN
     
+    Header tùy chọn `Idempotency-Key`: gửi lại cùng key (double tap / retry)
+    sẽ nhận lại response của lần đầu, không tạo thêm đơn hay phiếu bếp.
+    
+    Bàn được xác định bằng `table_token` (mã QR đã ký, không cần truy vấn
+    database). `table_number` chỉ dùng cho mã QR cũ, khi TABLE_TOKEN_REQUIRED tắt.
+    
     Request body:
     {
-        "table_number": 5,
+        "table_token": "v1.5.5.main.0.<chữ ký>",
         "customer_name": "Nguyễn Văn A",
         "items": [
             {"item_id": 1, "quantity": 2, "price": 25000},
@@ -51,27 +94,57 @@ def create_public_order(
         "notes": "Không đá"
     }
     """
+    claim = table_claim(order_data.table_token)
+    if claim:
+        if order_data.table_number is not None and order_data.table_number != claim.table_number:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="table_number không khớp với mã QR của bàn"
+            )
+        table_number = claim.table_number
+    elif TABLE_TOKEN_REQUIRED or order_data.table_number is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Thiếu mã QR của bàn (table_token), vui lòng quét lại mã trên bàn"
+        )
+    else:
+        table_number = order_data.table_number
+    
+    idempotency_key = idempotency.validate_key(idempotency_key)
+    if idempotency_key:
+        request_hash = idempotency.request_fingerprint(order_data)
+        replay = idempotency.store.lookup(table_number, idempotency_key, request_hash)
+        if replay:
+            return _replay_response(replay)
+    
     cursor = conn.cursor()
     
     try:
-        print(f"\n📱 [PUBLIC ORDER] Table {order_data.table_number} - {order_data.customer_name}")
-        print(f"   Items: {len(order_data.items)} | Total: {order_data.total_amount:,}đ")
-        
-        # 1. Tìm table_id từ table_number
-        cursor.execute("""
-            SELECT table_id, status FROM dining_tables 
-            WHERE table_number = %s
-        """, (order_data.table_number,))
-        
-        table = cursor.fetchone()
-        if not table:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Không tìm thấy bàn số {order_data.table_number}"
-            )
-        
-        table_id = table['table_id']
-        print(f"   ✓ Found table_id: {table_id} (status: {table['status']})")
+        # 0. Giữ Idempotency-Key trong cùng transaction với đơn hàng
+        if idempotency_key:
+            replay = idempotency.store.claim(cursor, table_number, idempotency_key, request_hash)
+            if replay:
+                conn.rollback()
+                cursor.close()
+                return _replay_response(replay)
+        
+        # 1. table_id: từ mã QR đã ký, hoặc tìm theo table_number (mã QR cũ)
+        if claim:
+            table_id = claim.table_id
+        else:
+            cursor.execute(f"""
+                SELECT table_id, status FROM {schema.tables} 
+                WHERE table_number = %s
+            """, (table_number,))
+            
+            table = cursor.fetchone()
+            if not table:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Không tìm thấy bàn số {table_number}"
+                )
+            
+            table_id = table['table_id']
         
         # 2. Tạo order với RETURNING (PostgreSQL)
         cursor.execute("""
@@ -93,59 +166,61 @@ def create_public_order(
         # Lấy order_id từ RETURNING
         result = cursor.fetchone()
         order_id = result['order_id']
-        print(f"   ✓ Order created: #{order_id}")
         
-        # FIX: Thêm order items với ĐÚNG tên cột và subtotal
-        for item in order_data.items:
-            subtotal = item.price * item.quantity  # Tính subtotal
-            
-            cursor.execute("""
-                INSERT INTO order_items (order_id, item_id, quantity, unit_price, subtotal)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                order_id, 
-                item.item_id, 
-                item.quantity, 
-                item.price,      # unit_price
-                subtotal         # subtotal
-            ))
-            
-            print(f"      • Item {item.item_id}: {item.quantity} × {item.price:,.0f}đ = {subtotal:,.0f}đ")
-        
-        print(f"   ✓ {len(order_data.items)} items added")
+        # 3. Thêm order items (unit_price + subtotal) trong MỘT câu lệnh
+        insert_order_items(cursor, order_id, order_data.items)
         
         # 4. Cập nhật trạng thái bàn thành OCCUPIED
-        cursor.execute("""
-            UPDATE dining_tables 
+        cursor.execute(f"""
+            UPDATE {schema.tables} 
             SET status = 'OCCUPIED'
             WHERE table_id = %s
         """, (table_id,))
-        print(f"   ✓ Table {order_data.table_number} → OCCUPIED")
         
         # 5. Thêm vào kitchen orders để bếp thấy
         cursor.execute("""
             INSERT INTO kitchen_orders (order_id, status)
             VALUES (%s, 'WAITING')
+            RETURNING kitchen_order_id
         """, (order_id,))
-        print(f"   ✓ Kitchen order created")
-        
-        conn.commit()
-        cursor.close()
-        
-        print(f" [PUBLIC ORDER] Bàn {order_data.table_number} đặt món thành công!")
+        kitchen_order_id = cursor.fetchone()['kitchen_order_id']
+        
+        notify_kitchen_event(
+            cursor, TICKET_CREATED,
+            kitchen_order_id=kitchen_order_id,
+            order_id=order_id,
+            table_number=table_number,
+            status='WAITING',
+            items=[{"item_id": i.item_id, "quantity": i.quantity} for i in order_data.items]
+        )
         
-        return {
+        response = {
             "success": True,
             "message": "Đặt món thành công! Nhân viên sẽ phục vụ trong giây lát.",
             "data": {
                 "order_id": order_id,
-                "table_number": order_data.table_number,
+                "table_number": table_number,
                 "customer_name": order_data.customer_name,
                 "total_amount": order_data.total_amount,
                 "status": "PENDING",
                 "created_at": datetime.now().isoformat()
             }
         }
+        if idempotency_key:
+            idempotency.store.save(cursor, table_number, idempotency_key, request_hash,
+                                   status.HTTP_201_CREATED, response)
+        
+        conn.commit()
+        cursor.close()
+        
+        if idempotency_key:
+            idempotency.store.remember(table_number, idempotency_key, request_hash,
+                                       status.HTTP_201_CREATED, response)
+        
+        logger.info("Public order created", extra={"order_id": order_id, "table_number": table_number,
+                                                    "items": len(order_data.items)})
+        
+        return response
         
     except HTTPException:
         conn.rollback()
@@ -154,9 +229,13 @@ def create_public_order(
     except Exception as e:
         conn.rollback()
         cursor.close()
-        print(f" [PUBLIC ORDER ERROR]: {e}")
-        import traceback
-        traceback.print_exc()
+        if isinstance(e, psycopg2.errors.ForeignKeyViolation) and e.diag.table_name == "orders":
+            # Valid token of a table that has since been deleted
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Không tìm thấy bàn số {table_number}"
+            )
+        logger.exception("Public order failed", extra={"table_number": table_number})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Không thể tạo đơn hàng: {str(e)}"
@@ -166,28 +245,83 @@ def create_public_order(
 # STAFF ENDPOINTS - CẦN AUTHENTICATION 
 # ========================================
 
+ORDERS_PAGE_MAX = 200
+
+def encode_order_cursor(order: dict) -> str:
+    """Cursor "<created_at ISO>,<order_id>" of the last order of a page"""
+    return f"{order['created_at'].isoformat()},{order['order_id']}"
+
+def decode_order_cursor(cursor_value: str) -> tuple:
+    try:
+        created_at, order_id = cursor_value.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor không hợp lệ (định dạng: <created_at>,<order_id>)"
+        )
+
+def fetch_items_by_order(cursor, order_ids: list) -> dict:
+    """Items of many orders in ONE query, grouped by order_id"""
+    items_by_order = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return items_by_order
+    cursor.execute("""
+        SELECT oi.*, m.item_name, m.image_url
+        FROM order_items oi
+        JOIN menu_items m ON oi.item_id = m.item_id
+        WHERE oi.order_id = ANY(%s)
+        ORDER BY oi.order_id, oi.order_item_id
+    """, (order_ids,))
+    for item in cursor.fetchall():
+        items_by_order[item['order_id']].append(item)
+    return items_by_order
+
 @router.get("")
 def get_orders(
     status: Optional[str] = None,
     table_id: Optional[int] = None,
-    date_from: Optional[str] = None,
-    date_to: Optional[str] = None,
-    current_user: dict = Depends(verify_token),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[str] = Query(None, description="next_cursor của trang trước"),
+    limit: int = Query(50, ge=1, le=ORDERS_PAGE_MAX),
+    include_items: bool = True,
+    since: Optional[int] = since_query(),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
-    """✅ Lấy danh sách đơn hàng - Nhân viên"""
+    """
+    ✅ Lấy danh sách đơn hàng - Nhân viên (phân trang keyset)
+    
+    Mới nhất trước. Trang sau: gọi lại với `after=<next_cursor>`; hết dữ liệu
+    khi `next_cursor` là null. `include_items=false` bỏ danh sách món.
+    
+    Polling: gọi lại với `since=<cursor>` của lần trước để chỉ nhận các đơn
+    đã thay đổi (không phân trang); `removed` là các đơn không còn khớp `status`.
+    """
+    if since is not None and after:
+        raise HTTPException(
+            status_code=400,
+            detail="Không dùng `after` cùng với `since`"
+        )
+    
     cursor = conn.cursor()
+    new_cursor = read_cursor(cursor)
     
-    query = """
+    query = f"""
         SELECT o.*, t.table_number, e.full_name as employee_name
         FROM orders o
-        LEFT JOIN dining_tables t ON o.table_id = t.table_id
+        LEFT JOIN {schema.tables} t ON o.table_id = t.table_id
         LEFT JOIN employees e ON o.employee_id = e.employee_id
         WHERE 1=1
     """
     params = []
     
-    if status:
+    if since is not None:
+        # Status is checked below: an order that left the filter is reported
+        query += " AND o.change_seq >= %s"
+        params.append(since)
+    elif status:
         query += " AND o.status = %s"
         params.append(status.upper())
     
@@ -195,35 +329,53 @@ def get_orders(
         query += " AND o.table_id = %s"
         params.append(table_id)
     
-    if date_from:
-        query += " AND DATE(o.created_at) >= %s"
-        params.append(date_from)
+    date_filter, date_params = date_range_filter("o.created_at", date_from, date_to)
+    query += date_filter
+    params.extend(date_params)
     
-    if date_to:
-        query += " AND DATE(o.created_at) <= %s"
-        params.append(date_to)
+    if after:
+        # Row comparison matches the (created_at, order_id) index order
+        query += " AND (o.created_at, o.order_id) < (%s, %s)"
+        params.extend(decode_order_cursor(after))
     
-    query += " ORDER BY o.created_at DESC"
+    # One extra row tells whether there is a next page
+    query += " ORDER BY o.created_at DESC, o.order_id DESC LIMIT %s"
+    params.append(limit + 1 if since is None else CHANGE_FEED_MAX_ROWS + 1)
     
     cursor.execute(query, params)
     orders = cursor.fetchall()
+    removed = []
     
-    for order in orders:
-        cursor.execute("""
-            SELECT oi.*, m.item_name, m.image_url
-            FROM order_items oi
-            JOIN menu_items m ON oi.item_id = m.item_id
-            WHERE oi.order_id = %s
-        """, (order['order_id'],))
-        order['items'] = cursor.fetchall()
+    if since is None:
+        has_more = len(orders) > limit
+        orders = orders[:limit]
+    else:
+        check_size(len(orders))
+        has_more = False
+        if status:
+            orders, removed = split_changes(
+                orders, lambda o: o['status'] == status.upper(), "order_id")
+    
+    if include_items:
+        items_by_order = fetch_items_by_order(cursor, [o['order_id'] for o in orders])
+        for order in orders:
+            order['items'] = items_by_order[order['order_id']]
     
     cursor.close()
     
-    return {"success": True, "data": orders, "count": len(orders)}
+    return {
+        "success": True,
+        "data": orders,
+        "count": len(orders),
+        "next_cursor": encode_order_cursor(orders[-1]) if has_more else None,
+        "removed": removed,
+        "cursor": new_cursor
+    }
+
 @router.post("", status_code=status.HTTP_201_CREATED)
 def create_order(
     order_data: OrderCreate,
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
     """Tạo đơn hàng - Nhân viên"""
@@ -237,36 +389,35 @@ def create_order(
             RETURNING order_id
         """, (
             order_data.table_id,
-            current_user.get('employeeId'),
+            current_user.employee_id,
             order_data.customer_id,
             total_amount
         ))      
         result = cursor.fetchone()
         order_id = result['order_id']      
-        # 🔥 FIX: Dùng unit_price và subtotal
-        for item in order_data.items:
-            subtotal = item.price * item.quantity
-            
-            cursor.execute("""
-                INSERT INTO order_items (order_id, item_id, quantity, unit_price, subtotal)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                order_id, 
-                item.item_id, 
-                item.quantity, 
-                item.price,
-                subtotal
-            ))
+        # 🔥 FIX: Dùng unit_price và subtotal - một INSERT cho tất cả món
+        insert_order_items(cursor, order_id, order_data.items)
         
-        cursor.execute("UPDATE dining_tables SET status = 'OCCUPIED' WHERE table_id = %s", (order_data.table_id,))
-        cursor.execute("INSERT INTO kitchen_orders (order_id, status) VALUES (%s, 'WAITING')", (order_id,))
+        cursor.execute(f"UPDATE {schema.tables} SET status = 'OCCUPIED' WHERE table_id = %s", (order_data.table_id,))
+        cursor.execute(
+            "INSERT INTO kitchen_orders (order_id, status) VALUES (%s, 'WAITING') RETURNING kitchen_order_id",
+            (order_id,)
+        )
+        notify_kitchen_event(
+            cursor, TICKET_CREATED,
+            kitchen_order_id=cursor.fetchone()['kitchen_order_id'],
+            order_id=order_id,
+            table_id=order_data.table_id,
+            status='WAITING',
+            items=[{"item_id": i.item_id, "quantity": i.quantity} for i in order_data.items]
+        )
         
         conn.commit()       
         # Fetch created order
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT o.*, t.table_number
             FROM orders o
-            LEFT JOIN dining_tables t ON o.table_id = t.table_id
+            LEFT JOIN {schema.tables} t ON o.table_id = t.table_id
             WHERE o.order_id = %s
         """, (order_id,))
         order = cursor.fetchone()
@@ -280,16 +431,16 @@ def create_order(
 @router.get("/{order_id}")
 def get_order_detail(
     order_id: int,
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
     """Lấy chi tiết đơn hàng - Nhân viên"""
     cursor = conn.cursor()
     try:
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT o.*, t.table_number, e.full_name as employee_name
             FROM orders o
-            LEFT JOIN dining_tables t ON o.table_id = t.table_id
+            LEFT JOIN {schema.tables} t ON o.table_id = t.table_id
             LEFT JOIN employees e ON o.employee_id = e.employee_id
             WHERE o.order_id = %s
         """, (order_id,))
@@ -323,37 +474,32 @@ def get_order_detail(
 def update_order_status(
     order_id: int,
     status_data: OrderStatusUpdate,
-    current_user: dict = Depends(verify_token),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
-    """ Cập nhật trạng thái đơn hàng - Nhân viên"""
+    """
+     Cập nhật trạng thái đơn hàng - Nhân viên
+    
+    Chỉ các bước chuyển trong status_transitions; gửi `version` (lấy từ lần đọc
+    trước) để nhận 409 nếu màn hình khác đã đổi đơn trong lúc đó.
+    """
     cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT order_id, table_id FROM orders WHERE order_id = %s", (order_id,))
-        order = cursor.fetchone()
-        
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
+        order = transition(cursor, "order", order_id, status_data.status, status_data.version)
         
-        cursor.execute("""
-            UPDATE orders 
-            SET status = %s
-            WHERE order_id = %s
-        """, (status_data.status.upper(), order_id))
-        
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT o.*, t.table_number
             FROM orders o
-            LEFT JOIN dining_tables t ON o.table_id = t.table_id
+            LEFT JOIN {schema.tables} t ON o.table_id = t.table_id
             WHERE o.order_id = %s
         """, (order_id,))
         updated_order = cursor.fetchone()
         
         # Nếu hoàn thành hoặc hủy → Giải phóng bàn
         if status_data.status.upper() in ['COMPLETED', 'CANCELLED']:
-            cursor.execute("""
-                UPDATE dining_tables 
+            cursor.execute(f"""
+                UPDATE {schema.tables} 
                 SET status = 'AVAILABLE'
                 WHERE table_id = %s
             """, (order['table_id'],))
@@ -363,6 +509,10 @@ def update_order_status(
         
         return {"success": True, "message": "Order status updated", "data": updated_order}
         
+    except HTTPException:
+        conn.rollback()
+        cursor.close()
+        raise
     except Exception as e:
         conn.rollback()
         cursor.close()
@@ -371,67 +521,49 @@ def update_order_status(
 @router.put("/{order_id}/cancel")
 def cancel_order(
     order_id: int,
-    current_user: dict = Depends(verify_token),
+    version: Optional[int] = Query(None, description="version đã đọc; 409 nếu đơn đã bị đổi"),
+    current_user: Principal = Depends(get_current_user),
     conn=Depends(get_db)
 ):
-    """ Hủy đơn hàng - Nhân viên"""
+    """ Hủy đơn hàng - Nhân viên (409 nếu đơn đã sang bước không hủy được, VD đang thanh toán)"""
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
-            SELECT o.order_id, o.table_id, o.status, o.total_amount, t.table_number
-            FROM orders o
-            LEFT JOIN dining_tables t ON o.table_id = t.table_id
-            WHERE o.order_id = %s
-        """, (order_id,))
-        
-        order = cursor.fetchone()
-        
-        if not order:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Không tìm thấy đơn hàng #{order_id}"
-            )
-        
-        current_status = order['status']
-        allowed_cancel_statuses = ['PENDING', 'PREPARING', 'WAITING']
-        
-        if current_status not in allowed_cancel_statuses:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Không thể hủy đơn hàng ở trạng thái '{current_status}'."
-            )
-        
-        cursor.execute("""
-            UPDATE orders
-            SET status = 'CANCELLED'
-            WHERE order_id = %s
-        """, (order_id,))
+        order = transition(cursor, "order", order_id, "CANCELLED", version)
+        current_status = order['previous_status']
         
+        table_number = None
         if order['table_id']:
-            cursor.execute("""
-                UPDATE dining_tables
+            cursor.execute(f"""
+                UPDATE {schema.tables}
                 SET status = 'AVAILABLE'
                 WHERE table_id = %s
+                RETURNING table_number
             """, (order['table_id'],))
-        
-        cursor.execute("""
-            UPDATE kitchen_orders
-            SET status = 'CANCELLED'
-            WHERE order_id = %s
-        """, (order_id,))
+            table = cursor.fetchone()
+            table_number = table['table_number'] if table else None
+        
+        for ticket in try_transition(cursor, "kitchen_order", "order_id", order_id, "CANCELLED"):
+            notify_kitchen_event(
+                cursor, TICKET_CANCELLED,
+                kitchen_order_id=ticket['kitchen_order_id'],
+                order_id=order_id,
+                table_number=table_number,
+                status='CANCELLED'
+            )
         
         conn.commit()
         cursor.close()
         
         return {
             "success": True,
-            "message": f"Đã hủy đơn hàng Bàn {order.get('table_number', order_id)}",
+            "message": f"Đã hủy đơn hàng Bàn {table_number or order_id}",
             "data": {
                 "order_id": order_id,
-                "table_number": order.get('table_number'),
+                "table_number": table_number,
                 "previous_status": current_status,
-                "new_status": "CANCELLED"
+                "new_status": "CANCELLED",
+                "version": order['version']
             }
         }
     
@@ -446,11 +578,3 @@ def cancel_order(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Hủy đơn hàng thất bại: {str(e)}"
         )
-
-print("Order router loaded (PostgreSQL):")
-print("    POST /api/orders/public - Khách hàng đặt món (no auth)")
-print("    GET  /api/orders - Nhân viên xem danh sách (auth required)")
-print("    POST /api/orders - Nhân viên tạo order (auth required)")
-print("    GET  /api/orders/{id} - Chi tiết order (auth required)")
-print("    PUT  /api/orders/{id}/status - Cập nhật trạng thái (auth required)")
-print("    PUT  /api/orders/{id}/cancel - Hủy order (auth required)")
\ No newline at end of file
@@ -3,13 +3,20 @@
 # ========================================
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 from pydantic import BaseModel
-from datetime import datetime
-from config.database import get_db_connection
-from utils.auth import get_current_user
+from config import async_database as adb
+from utils.auth import Principal, get_current_user
+from utils.log import get_logger
+from utils.schema_registry import schema
+from utils.table_tokens import table_tokens
+from utils import table_qr
+from utils.singleflight import single_flight
 
 router = APIRouter(prefix="/api/tables", tags=["tables"])
+logger = get_logger(__name__)
 
 # ========================================
 # SCHEMAS
@@ -26,60 +33,28 @@ class TableUpdate(BaseModel):
     changeToken: Optional[bool] = False
 
 # ========================================
-# GET ALL TABLES - FIXED WITH BOTH ROUTES
+# GET ALL TABLES
 # ========================================
 
+def table_columns() -> str:
+    """Columns returned by every endpoint; qr_code may not exist (schema.sql)"""
+    return (f"table_id, table_number as number, capacity, status, "
+            f"{schema.column_or_null('tables', 'qr_code')}, created_at, updated_at")
+
 @router.get("")  # Handles /api/tables
 @router.get("/")  # Handles /api/tables/
-async def get_tables(current_user: dict = Depends(get_current_user)):
+@single_flight("tables", ttl=1.0)
+async def get_tables(current_user: Principal = Depends(get_current_user)):
     """
     Get all tables
     Requires authentication
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # ✅ Try different possible table names
-        table_names = ['tables', 'dining_tables', 'restaurant_tables']
-        
-        tables_data = None
-        used_table_name = None
-        
-        for table_name in table_names:
-            try:
-                cursor.execute(f"""
-                    SELECT 
-                        table_id,
-                        table_number as number,
-                        capacity,
-                        status,
-                        qr_code,
-                        created_at,
-                        updated_at
-                    FROM {table_name}
-                    ORDER BY table_number
-                """)
-                
-                tables_data = cursor.fetchall()
-                used_table_name = table_name
-                print(f"✅ Found tables in '{table_name}'")
-                break
-                
-            except Exception as e:
-                print(f"⚠️  Table '{table_name}' not found: {e}")
-                continue
-        
-        if tables_data is None:
-            # If no table found, return empty array
-            print("⚠️  No tables table found in database")
-            return {
-                "success": True,
-                "data": [],
-                "message": "No tables table found in database. Please run database migration."
-            }
-        
-        print(f"✅ Loaded {len(tables_data)} tables from '{used_table_name}'")
+        tables_data = await adb.fetch(f"""
+            SELECT {table_columns()}
+            FROM {schema.tables}
+            ORDER BY table_number
+        """)
         
         return {
             "success": True,
@@ -87,14 +62,11 @@ async def get_tables(current_user: dict = Depends(get_current_user)):
         }
         
     except Exception as e:
-        print(f"❌ Error getting tables: {str(e)}")
+        logger.exception("Getting tables failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error getting tables: {str(e)}"
         )
-    finally:
-        cursor.close()
-        conn.close()
 
 # ========================================
 # CREATE TABLE
@@ -104,63 +76,58 @@ async def get_tables(current_user: dict = Depends(get_current_user)):
 @router.post("/")
 async def create_table(
     table: TableCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Create new table
     Requires authentication
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Check if table number already exists
-        cursor.execute(
-            "SELECT table_id FROM tables WHERE table_number = %s",
-            (table.table_number,)
-        )
-        
-        if cursor.fetchone():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Bàn số {table.table_number} đã tồn tại"
+        async with adb.transaction() as conn:
+            # Check if table number already exists
+            existing = await conn.fetchrow(
+                f"SELECT table_id FROM {schema.tables} WHERE table_number = $1",
+                table.table_number
             )
-        
-        # Insert new table
-        cursor.execute("""
-            INSERT INTO tables (table_number, capacity, status, qr_code)
-            VALUES (%s, %s, %s, %s)
-            RETURNING table_id, table_number as number, capacity, status, qr_code, created_at
-        """, (
-            table.table_number,
-            table.capacity,
-            table.status.upper(),
-            f"QR-{table.table_number}"  # Simple QR code placeholder
-        ))
-        
-        new_table = cursor.fetchone()
-        conn.commit()
-        
-        print(f"✅ Created table {table.table_number}")
+            
+            if existing:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Bàn số {table.table_number} đã tồn tại"
+                )
+            
+            # Insert new table
+            new_table = dict(await conn.fetchrow(f"""
+                INSERT INTO {schema.tables} (table_number, capacity, status)
+                VALUES ($1, $2, $3)
+                RETURNING {table_columns()}
+            """, table.table_number, table.capacity, table.status.upper()))
+            
+            # Signed QR token (utils/table_tokens.py); a new table is at epoch 0
+            token = table_tokens.issue(new_table['table_id'], table.table_number, epoch=0)
+            if schema.has_column("tables", "qr_code"):
+                await conn.execute(
+                    f"UPDATE {schema.tables} SET qr_code = $1 WHERE table_id = $2",
+                    token, new_table['table_id']
+                )
+                new_table['qr_code'] = token
+        
+        logger.info("Table created", extra={"table_number": table.table_number})
         
         return {
             "success": True,
             "message": "Thêm bàn thành công",
-            "data": new_table
+            "data": {**new_table, "qr_token": token, "qr_url": table_qr.order_url(token)}
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        conn.rollback()
-        print(f"❌ Error creating table: {str(e)}")
+        logger.exception("Creating table failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Lỗi tạo bàn: {str(e)}"
         )
-    finally:
-        cursor.close()
-        conn.close()
 
 # ========================================
 # UPDATE TABLE
@@ -170,85 +137,89 @@ async def create_table(
 async def update_table(
     table_number: int,
     table: TableUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Update table info
     Requires authentication
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Check if table exists
-        cursor.execute(
-            "SELECT table_id FROM tables WHERE table_number = %s",
-            (table_number,)
-        )
-        
-        if not cursor.fetchone():
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Không tìm thấy bàn số {table_number}"
-            )
-        
         # Build update query dynamically
         update_fields = []
         params = []
         
         if table.capacity is not None:
-            update_fields.append("capacity = %s")
             params.append(table.capacity)
+            update_fields.append(f"capacity = ${len(params)}")
         
         if table.status is not None:
-            update_fields.append("status = %s")
             params.append(table.status.upper())
+            update_fields.append(f"status = ${len(params)}")
         
-        if table.changeToken:
-            update_fields.append("qr_code = %s")
-            params.append(f"QR-{table_number}-{int(datetime.now().timestamp())}")
-        
-        if not update_fields:
+        if not update_fields and not table.changeToken:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Không có thông tin để cập nhật"
             )
         
-        # Add table_number to params
-        params.append(table_number)
-        
-        # Execute update
-        query = f"""
-            UPDATE tables 
-            SET {', '.join(update_fields)}, updated_at = NOW()
-            WHERE table_number = %s
-            RETURNING table_id, table_number as number, capacity, status, qr_code, updated_at
-        """
-        
-        cursor.execute(query, params)
-        updated_table = cursor.fetchone()
-        conn.commit()
-        
-        print(f"✅ Updated table {table_number}")
+        token = None
+        async with adb.transaction() as conn:
+            if table.changeToken:
+                # New epoch: every QR code printed for this table stops working
+                row = await conn.fetchrow(
+                    f"SELECT table_id FROM {schema.tables} WHERE table_number = $1 FOR UPDATE",
+                    table_number
+                )
+                if not row:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Không tìm thấy bàn số {table_number}"
+                    )
+                epoch = await table_tokens.rotate(conn, row['table_id'])
+                token = table_tokens.issue(row['table_id'], table_number, epoch)
+                if schema.has_column("tables", "qr_code"):
+                    params.append(token)
+                    update_fields.append(f"qr_code = ${len(params)}")
+            
+            # Add table_number to params
+            params.append(table_number)
+            
+            # Execute update (no row back means the table does not exist)
+            updated_table = await conn.fetchrow(f"""
+                UPDATE {schema.tables} 
+                SET {', '.join(update_fields + ['updated_at = NOW()'])}
+                WHERE table_number = ${len(params)}
+                RETURNING {table_columns()}
+            """, *params)
+            
+            if not updated_table:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Không tìm thấy bàn số {table_number}"
+                )
+        
+        data = dict(updated_table)
+        if token:
+            # This worker sees the new epoch at once, the others on their next check
+            table_tokens.invalidate()
+            data.update(qr_token=token, qr_url=table_qr.order_url(token))
+        
+        logger.info("Table updated", extra={"table_number": table_number, "token_rotated": token is not None})
         
         return {
             "success": True,
             "message": "Cập nhật bàn thành công",
-            "data": updated_table
+            "data": data
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        conn.rollback()
-        print(f"❌ Error updating table: {str(e)}")
+        logger.exception("Updating table failed", extra={"table_number": table_number})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Lỗi cập nhật bàn: {str(e)}"
         )
-    finally:
-        cursor.close()
-        conn.close()
 
 # ========================================
 # DELETE TABLE
@@ -257,45 +228,39 @@ async def update_table(
 @router.delete("/{table_number}")
 async def delete_table(
     table_number: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Delete table
     Requires authentication
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Check if table is occupied
-        cursor.execute(
-            "SELECT status FROM tables WHERE table_number = %s",
-            (table_number,)
-        )
-        
-        result = cursor.fetchone()
-        
-        if not result:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Không tìm thấy bàn số {table_number}"
+        async with adb.transaction() as conn:
+            # Check if table is occupied
+            result = await conn.fetchrow(
+                f"SELECT status FROM {schema.tables} WHERE table_number = $1 FOR UPDATE",
+                table_number
             )
-        
-        if result['status'] == 'OCCUPIED':
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Không thể xóa bàn đang có khách"
+            
+            if not result:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Không tìm thấy bàn số {table_number}"
+                )
+            
+            if result['status'] == 'OCCUPIED':
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Không thể xóa bàn đang có khách"
+                )
+            
+            # Delete table
+            await conn.execute(
+                f"DELETE FROM {schema.tables} WHERE table_number = $1",
+                table_number
             )
         
-        # Delete table
-        cursor.execute(
-            "DELETE FROM tables WHERE table_number = %s",
-            (table_number,)
-        )
-        
-        conn.commit()
-        
-        print(f"✅ Deleted table {table_number}")
+        logger.info("Table deleted", extra={"table_number": table_number})
         
         return {
             "success": True,
@@ -305,15 +270,61 @@ async def delete_table(
     except HTTPException:
         raise
     except Exception as e:
-        conn.rollback()
-        print(f"❌ Error deleting table: {str(e)}")
+        logger.exception("Deleting table failed", extra={"table_number": table_number})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Lỗi xóa bàn: {str(e)}"
         )
-    finally:
-        cursor.close()
-        conn.close()
+
+# ========================================
+# QR CODES (PNG, utils/table_qr.py)
+# ========================================
+
+@router.post("/qr/render")
+async def render_table_qr_codes(current_user: Principal = Depends(get_current_user)):
+    """
+    Render the QR PNG of every table into QR_CACHE_DIR
+    Only new tables and tables whose token was replaced are drawn again
+    """
+    tables_data = await adb.fetch(
+        f"SELECT table_id, table_number FROM {schema.tables} ORDER BY table_number"
+    )
+    try:
+        results = await run_in_threadpool(table_qr.render_all, tables_data)
+    except table_qr.QRUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    
+    return {
+        "success": True,
+        "message": f"Đã tạo {sum(r['rendered'] for r in results)} mã QR mới",
+        "data": [
+            {"table_number": r["table_number"], "url": r["url"], "rendered": r["rendered"],
+             "image": f"/api/tables/{r['table_number']}/qr.png"}
+            for r in results
+        ]
+    }
+
+@router.get("/{table_number}/qr.png")
+async def get_table_qr(
+    table_number: int,
+    current_user: Principal = Depends(get_current_user)
+):
+    """QR image to print for one table (?token=<jwt> works for <img> tags)"""
+    table = await adb.fetchrow(
+        f"SELECT table_id, table_number FROM {schema.tables} WHERE table_number = $1",
+        table_number
+    )
+    if not table:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Không tìm thấy bàn số {table_number}"
+        )
+    try:
+        result = await run_in_threadpool(table_qr.qr_file, table['table_id'], table_number)
+    except table_qr.QRUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    
+    return FileResponse(result["path"], media_type="image/png", filename=f"ban-{table_number}.png")
 
 # ========================================
 # GET TABLE BY NUMBER
@@ -322,30 +333,18 @@ async def delete_table(
 @router.get("/{table_number}")
 async def get_table(
     table_number: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get specific table by number
     Requires authentication
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute("""
-            SELECT 
-                table_id,
-                table_number as number,
-                capacity,
-                status,
-                qr_code,
-                created_at,
-                updated_at
-            FROM tables
-            WHERE table_number = %s
-        """, (table_number,))
-        
-        table = cursor.fetchone()
+        table = await adb.fetchrow(f"""
+            SELECT {table_columns()}
+            FROM {schema.tables}
+            WHERE table_number = $1
+        """, table_number)
         
         if not table:
             raise HTTPException(
@@ -361,11 +360,8 @@ async def get_table(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting table: {str(e)}")
+        logger.exception("Getting table failed", extra={"table_number": table_number})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Lỗi lấy thông tin bàn: {str(e)}"
-        )
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        )
\ No newline at end of file
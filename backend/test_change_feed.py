@@ -0,0 +1,73 @@
+# backend/test_change_feed.py
+"""Change-feed cursor (utils/change_feed.py, migrations/010) against the database"""
+import pytest
+from config.database import get_db_connection
+from utils.change_feed import read_cursor, split_changes
+
+@pytest.fixture
+def order_id(database):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO orders (status, total_amount, notes) VALUES ('PENDING', 0, 'test-change-feed') RETURNING order_id")
+    order_id = cursor.fetchone()['order_id']
+    conn.commit()
+    yield order_id
+    cursor.execute("DELETE FROM orders WHERE order_id = %s", (order_id,))
+    conn.commit()
+    conn.close()
+
+def changed_ids(cursor, since: int) -> set:
+    cursor.execute("SELECT order_id FROM orders WHERE change_seq >= %s", (since,))
+    return {row['order_id'] for row in cursor.fetchall()}
+
+def test_nothing_changed_returns_nothing(order_id):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        since = read_cursor(cursor)
+        conn.rollback()
+        assert order_id not in changed_ids(cursor, since)
+    finally:
+        conn.rollback()
+        conn.close()
+
+def test_change_committed_after_the_poll_is_not_missed(order_id):
+    """The writer started before the poll read its cursor and commits after it"""
+    writer = get_db_connection()
+    poller = get_db_connection()
+    try:
+        w = writer.cursor()
+        w.execute("UPDATE orders SET status = 'READY' WHERE order_id = %s RETURNING change_seq", (order_id,))
+        stamped = w.fetchone()['change_seq']
+
+        p = poller.cursor()
+        since = read_cursor(p)
+        assert order_id not in changed_ids(p, since)  # not committed yet
+        poller.rollback()
+        assert since <= stamped
+
+        writer.commit()
+        assert order_id in changed_ids(p, since)  # next poll with the returned cursor
+    finally:
+        writer.rollback(); writer.close()
+        poller.rollback(); poller.close()
+
+def test_trigger_stamps_updated_at_and_seq(order_id):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT change_seq, updated_at FROM orders WHERE order_id = %s", (order_id,))
+        before = cursor.fetchone()
+        conn.commit()
+        cursor.execute("UPDATE orders SET notes = notes WHERE order_id = %s RETURNING change_seq, updated_at", (order_id,))
+        after = cursor.fetchone()
+        assert after['change_seq'] > before['change_seq']
+        assert after['updated_at'] >= before['updated_at']
+    finally:
+        conn.rollback()
+        conn.close()
+
+def test_split_changes():
+    rows = [{"id": 1, "status": "PENDING"}, {"id": 2, "status": "PAID"}]
+    data, removed = split_changes(rows, lambda r: r["status"] == "PENDING", "id")
+    assert data == rows[:1] and removed == [2]
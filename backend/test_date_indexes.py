@@ -0,0 +1,89 @@
+# backend/test_date_indexes.py
+"""
+EXPLAIN check: date filters built by utils/dates.py must use an index
+
+    cd backend && python migrate.py && python -m pytest -q test_date_indexes.py
+
+A year of synthetic orders/payments/bank transactions is added and ANALYZEd
+first so the plans look like production; everything runs in one transaction
+that is rolled back. A check passes only if the date column appears in an
+"Index Cond", i.e. the range itself is answered by the index; a non-sargable
+filter like DATE(created_at) = CURRENT_DATE can only ever be a Filter.
+"""
+from datetime import date, timedelta
+import pytest
+from config.database import get_db_connection
+from utils.dates import date_range_filter, today_filter
+
+week_ago = date.today() - timedelta(days=7)
+range_sql, range_params = date_range_filter("created_at", week_ago, date.today())
+
+# (name, column that must be in an Index Cond, query, params)
+CHECKS = [
+    ("payments PAID today", "created_at",
+     f"SELECT * FROM payments WHERE status = 'PAID' AND {today_filter('created_at')}", []),
+    ("payments PAID in range", "created_at",
+     f"SELECT * FROM payments WHERE status = 'PAID' {range_sql}", range_params),
+    ("orders in range", "created_at",
+     f"SELECT * FROM orders WHERE TRUE {range_sql}", range_params),
+    ("orders by status in range", "created_at",
+     f"SELECT * FROM orders WHERE status = 'PENDING' {range_sql}", range_params),
+    ("orders created today", "created_at",
+     f"SELECT * FROM orders WHERE {today_filter('created_at')}", []),
+    ("bank transactions today", "transaction_date",
+     f"SELECT * FROM bank_transactions WHERE {today_filter('transaction_date')}", []),
+]
+
+SEED_ROWS = 20000
+
+def seed(cursor):
+    """~1 year of orders (one every 30 min) with one payment and bank transaction each"""
+    cursor.execute("""
+        INSERT INTO orders (status, total_amount, notes, created_at)
+        SELECT CASE WHEN g %% 20 = 0 THEN 'PENDING' ELSE 'PAID' END, 100000,
+               'explain-check', NOW() - g * INTERVAL '30 minutes'
+        FROM generate_series(1, %s) g
+    """, (SEED_ROWS,))
+    cursor.execute("""
+        INSERT INTO payments (order_id, payment_method, amount_paid, status, created_at)
+        SELECT order_id, 'cash', total_amount, 'PAID', created_at
+        FROM orders WHERE notes = 'explain-check' AND status = 'PAID'
+    """)
+    cursor.execute("""
+        INSERT INTO bank_transactions (transaction_id, amount, description, transaction_date)
+        SELECT 'explain-check-' || g, 100000, 'explain-check', NOW() - g * INTERVAL '30 minutes'
+        FROM generate_series(1, %s) g
+    """, (SEED_ROWS,))
+    cursor.execute("ANALYZE orders")
+    cursor.execute("ANALYZE payments")
+    cursor.execute("ANALYZE bank_transactions")
+
+def plan_for(cursor, query, params) -> str:
+    cursor.execute("EXPLAIN " + query, params)
+    return "\n".join(row['QUERY PLAN'] for row in cursor.fetchall())
+
+def uses_index_for(plan: str, column: str) -> bool:
+    return any("Index Cond" in line and f"({column} " in line for line in plan.splitlines())
+
+@pytest.fixture(scope="module")
+def cursor(database):
+    """Cursor on the seeded data; rolled back after the module"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        seed(cursor)
+        yield cursor
+    finally:
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+@pytest.mark.parametrize("name, column, query, params", CHECKS, ids=[c[0] for c in CHECKS])
+def test_date_filter_uses_index(cursor, name, column, query, params):
+    plan = plan_for(cursor, query, params)
+    assert uses_index_for(plan, column), f"{name}:\n{plan}"
+
+def test_old_date_filter_is_not_index_backed(cursor):
+    """DATE(created_at) = CURRENT_DATE must fail the check; proves the check can fail"""
+    plan = plan_for(cursor, "SELECT * FROM payments WHERE status = 'PAID' AND DATE(created_at) = CURRENT_DATE", [])
+    assert not uses_index_for(plan, "created_at"), plan
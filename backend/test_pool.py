@@ -0,0 +1,82 @@
+# backend/test_pool.py
+"""Slot accounting of config/database.ConnectionPool"""
+import pytest
+import psycopg2
+from config.database import DATABASE_CONFIG, ConnectionPool, PoolTimeout
+
+@pytest.fixture
+def pool(database):
+    pool = ConnectionPool(DATABASE_CONFIG, min_size=0, max_size=1, timeout=1.0)
+    yield pool
+    pool.closeall()
+
+def break_connection(pool, conn):
+    """Terminate the backend of `conn` from another session, as a server restart would"""
+    killer = pool._connect()
+    try:
+        cur = killer.cursor()
+        cur.execute("SELECT pg_terminate_backend(%s)", (conn.get_backend_pid(),))
+        killer.commit()
+    finally:
+        killer.discard()
+    with pytest.raises(Exception):
+        conn.cursor().execute("SELECT 1")
+    assert conn.closed
+
+def test_close_returns_connection(pool):
+    conn = pool.getconn()
+    pid = conn.get_backend_pid()
+    conn.close()
+    conn.close()  # second close from the same borrower is ignored
+    assert conn.closed
+    assert pool.stats()["idle"] == 1
+    assert pool.getconn().get_backend_pid() == pid
+
+def test_stale_close_does_not_return_a_reused_connection(pool):
+    first = pool.getconn()
+    pid = first.get_backend_pid()
+    first.close()
+    second = pool.getconn()
+    assert second.get_backend_pid() == pid  # same connection, new checkout
+
+    first.close()  # stale: must not put it back while `second` uses it
+
+    assert pool.stats()["in_use"] == 1
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    with pytest.raises(psycopg2.InterfaceError):
+        first.cursor()
+    cur = second.cursor()
+    cur.execute("SELECT 1 AS ok")
+    assert cur.fetchone()["ok"] == 1
+    second.close()
+
+def test_pool_full_times_out(pool):
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+def test_broken_connection_frees_its_slot(pool):
+    conn = pool.getconn()
+    pid = conn.get_backend_pid()
+    break_connection(pool, conn)
+
+    conn.close()
+
+    stats = pool.stats()
+    assert stats["size"] == 0
+    assert stats["idle"] == 0
+    fresh = pool.getconn()
+    assert fresh.get_backend_pid() != pid
+    cur = fresh.cursor()
+    cur.execute("SELECT 1 AS ok")
+    assert cur.fetchone()["ok"] == 1
+    fresh.close()
+
+def test_broken_connections_never_exhaust_the_pool(pool):
+    for _ in range(3):
+        conn = pool.getconn()
+        break_connection(pool, conn)
+        conn.close()
+    assert pool.stats()["size"] == 0
+    pool.getconn().close()
@@ -0,0 +1,128 @@
+# backend/test_singleflight.py
+"""utils/singleflight.py: coalescing, micro-TTL and error sharing (no database)"""
+import asyncio
+import threading
+import time
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from utils.auth import Principal
+from utils.singleflight import SingleFlight, request_key, single_flight
+
+def principal(role: str) -> Principal:
+    return Principal(user_id=1, username="u", role=role, employee_id=None, expires_at=0)
+
+def run_concurrently(n: int, call) -> list:
+    results = [None] * n
+
+    def worker(i):
+        try:
+            results[i] = call()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def slow_build(calls: list, value=None, error: Exception = None, seconds: float = 0.2):
+    def build():
+        calls.append(1)
+        time.sleep(seconds)
+        if error:
+            raise error
+        return value if value is not None else {"n": len(calls)}
+    return build
+
+def test_concurrent_calls_share_one_build():
+    flight, calls = SingleFlight("t"), []
+    results = run_concurrently(8, lambda: flight.do("k", slow_build(calls)))
+    assert len(calls) == 1
+    assert {body for body, _ in results} == {b'{"n":1}'}
+    assert sorted(outcome for _, outcome in results).count("leader") == 1
+
+def test_error_reaches_waiters_and_is_not_cached():
+    flight, calls = SingleFlight("t", ttl=10), []
+    results = run_concurrently(5, lambda: flight.do("k", slow_build(calls, error=HTTPException(410))))
+    assert len(calls) == 1
+    assert all(isinstance(r, HTTPException) and r.status_code == 410 for r in results)
+    body, outcome = flight.do("k", lambda: {"ok": True})
+    assert (body, outcome) == (b'{"ok":true}', "leader")
+
+def test_ttl_reuses_then_expires():
+    flight = SingleFlight("t", ttl=0.1)
+    assert flight.do("k", lambda: 1) == (b"1", "leader")
+    assert flight.do("k", lambda: 2) == (b"1", "cached")
+    time.sleep(0.15)
+    assert flight.do("k", lambda: 3) == (b"3", "leader")
+
+def test_no_ttl_builds_again_after_completion():
+    flight = SingleFlight("t", ttl=0)
+    flight.do("k", lambda: 1)
+    assert flight.do("k", lambda: 2) == (b"2", "leader")
+
+def test_key_covers_parameters_and_role_not_dependencies():
+    base = request_key({"status": "READY", "since": 5, "current_user": principal("ADMIN"), "conn": object()})
+    assert base == request_key({"since": 5, "status": "READY", "current_user": principal("ADMIN"), "conn": object()})
+    assert base != request_key({"status": "READY", "since": 5, "current_user": principal("WAITER")})
+    assert base != request_key({"status": "READY", "since": 6, "current_user": principal("ADMIN")})
+
+def test_async_calls_share_one_task_and_errors():
+    async def scenario():
+        flight, calls = SingleFlight("a"), []
+
+        async def build():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"n": len(calls)}
+
+        results = await asyncio.gather(*[flight.ado("k", build) for _ in range(5)])
+        assert len(calls) == 1
+        assert {body for body, _ in results} == {b'{"n":1}'}
+
+        async def fail():
+            await asyncio.sleep(0.05)
+            raise ValueError("boom")
+
+        errors = await asyncio.gather(*[flight.ado("e", fail) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(e, ValueError) for e in errors)
+        assert "e" not in flight._tasks
+
+        # The first caller going away does not cancel the build the others wait for
+        first = asyncio.ensure_future(flight.ado("c", build))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.ado("c", build))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        body, outcome = await second
+        assert outcome == "shared" and body == b'{"n":2}'
+
+    asyncio.run(scenario())
+
+def test_decorator_keeps_the_handler_signature():
+    app = FastAPI()
+    calls = []
+
+    def user() -> Principal:
+        return principal("ADMIN")
+
+    @app.get("/board")
+    @single_flight("test_board", ttl=5)
+    def board(limit: int = 10, current_user: Principal = Depends(user)):
+        calls.append(limit)
+        return {"limit": limit}
+
+    with TestClient(app) as client:
+        first = client.get("/board", params={"limit": 3})
+        again = client.get("/board", params={"limit": 3})
+        other = client.get("/board", params={"limit": 4})
+        bad = client.get("/board", params={"limit": "x"})
+
+    assert first.json() == {"limit": 3} and first.headers["X-Single-Flight"] == "leader"
+    assert again.headers["X-Single-Flight"] == "cached"
+    assert other.headers["X-Single-Flight"] == "leader"
+    assert bad.status_code == 422
+    assert calls == [3, 4]
@@ -0,0 +1,96 @@
+# backend/test_status_transitions.py
+"""utils/status_transitions.py against the database (migrations/009 applied)"""
+import threading
+import pytest
+from fastapi import HTTPException
+from config.database import get_db_connection
+from utils.status_transitions import transition, try_transition
+
+@pytest.fixture
+def order(database):
+    """A committed PENDING order with one WAITING ticket; removed afterwards"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO orders (status, total_amount, notes) VALUES ('PENDING', 0, 'test-transitions') RETURNING order_id")
+    order_id = cursor.fetchone()['order_id']
+    cursor.execute("INSERT INTO kitchen_orders (order_id, status) VALUES (%s, 'WAITING') RETURNING kitchen_order_id", (order_id,))
+    ticket_id = cursor.fetchone()['kitchen_order_id']
+    conn.commit()
+    yield order_id, ticket_id
+    cursor.execute("DELETE FROM orders WHERE order_id = %s", (order_id,))
+    conn.commit()
+    conn.close()
+
+@pytest.fixture
+def cursor(order):
+    """Uncommitted work; set up after `order` so it rolls back before the order is removed"""
+    conn = get_db_connection()
+    yield conn.cursor()
+    conn.rollback()
+    conn.close()
+
+def expect_http(status_code, call, *args):
+    with pytest.raises(HTTPException) as e:
+        call(*args)
+    assert e.value.status_code == status_code
+    return e.value.detail
+
+def test_allowed_move_bumps_version(order, cursor):
+    order_id, _ = order
+    row = transition(cursor, "order", order_id, "preparing", version=1)
+    assert (row['status'], row['previous_status'], row['version']) == ("PREPARING", "PENDING", 2)
+
+def test_stale_version_is_409(order, cursor):
+    order_id, _ = order
+    transition(cursor, "order", order_id, "PREPARING")
+    detail = expect_http(409, transition, cursor, "order", order_id, "READY", 1)
+    assert "version 2" in detail
+
+def test_move_not_listed_is_409(order, cursor):
+    order_id, _ = order
+    transition(cursor, "order", order_id, "CANCELLED")
+    expect_http(409, transition, cursor, "order", order_id, "READY")
+
+def test_same_status_returns_row_unchanged(order, cursor):
+    _, ticket_id = order
+    transition(cursor, "kitchen_order", ticket_id, "PREPARING")
+    row = transition(cursor, "kitchen_order", ticket_id, "PREPARING")
+    assert (row['status'], row['version']) == ("PREPARING", 2)
+
+def test_missing_row_is_404(cursor):
+    expect_http(404, transition, cursor, "order", -1, "READY")
+
+def test_paid_only_through_settlement(order, cursor):
+    order_id, _ = order
+    detail = expect_http(400, transition, cursor, "order", order_id, "PAID")
+    assert "/api/cashier/payment" in detail
+    assert try_transition(cursor, "order", "order_id", order_id, "PAID") == []
+    cursor.execute("SELECT status FROM orders WHERE order_id = %s", (order_id,))
+    assert cursor.fetchone()['status'] == "PENDING"
+
+def test_try_transition_skips_rows_that_may_not_move(order, cursor):
+    order_id, ticket_id = order
+    transition(cursor, "kitchen_order", ticket_id, "SERVED")
+    assert try_transition(cursor, "kitchen_order", "order_id", order_id, "CANCELLED") == []
+
+def test_previous_status_is_the_replaced_one_under_concurrency(order):
+    """B starts while A's change is uncommitted; B must report A's status as previous"""
+    order_id, _ = order
+    a = get_db_connection()
+    b = get_db_connection()
+    try:
+        transition(a.cursor(), "order", order_id, "PREPARING")
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(
+            row=transition(b.cursor(), "order", order_id, "READY")))
+        worker.start()
+        worker.join(0.3)
+        assert worker.is_alive()  # waits for A's row lock
+        a.commit()
+        worker.join(5)
+        b.commit()
+        assert result['row']['previous_status'] == "PREPARING"
+        assert result['row']['version'] == 3
+    finally:
+        a.rollback(); a.close()
+        b.rollback(); b.close()
@@ -0,0 +1,65 @@
+# backend/test_table_tokens.py
+"""utils/table_tokens.py: what TableTokens.verify accepts and rejects (no database)"""
+import time
+import pytest
+from fastapi import HTTPException
+from utils import table_tokens as tt
+from utils.table_tokens import InvalidTableToken, TableTokens
+
+def make_tokens(branch: str = "main", epochs: dict = None) -> TableTokens:
+    """TableTokens with its epochs preloaded, so nothing is read from the database"""
+    tokens = TableTokens(branch=branch, check_interval=3600)
+    tokens._epochs = dict(epochs or {})
+    tokens._checked_at = time.monotonic()
+    return tokens
+
+def test_valid_token_round_trips():
+    tokens = make_tokens(epochs={7: 2})
+    claim = tokens.verify(tokens.issue(7, 12))
+    assert (claim.table_id, claim.table_number, claim.branch, claim.epoch) == (7, 12, "main", 2)
+
+@pytest.mark.parametrize("token", ["", "QR-12", "v1.7.12.main.0", "v2.7.12.main.0.sig", "v1.7.12.main.sig"])
+def test_malformed_tokens_are_rejected(token):
+    with pytest.raises(InvalidTableToken):
+        make_tokens().verify(token)
+
+def test_forged_signature_is_rejected():
+    tokens = make_tokens()
+    message, _, signature = tokens.issue(7, 12).rpartition(".")
+    forged = f"{message}.{'A' * len(signature)}"
+    with pytest.raises(InvalidTableToken):
+        tokens.verify(forged)
+
+def test_edited_table_number_is_rejected():
+    tokens = make_tokens()
+    edited = tokens.issue(7, 12).replace(".7.12.", ".7.13.")
+    with pytest.raises(InvalidTableToken):
+        tokens.verify(edited)
+
+def test_token_from_other_branch_is_rejected():
+    other = make_tokens(branch="branch2")
+    with pytest.raises(InvalidTableToken, match="chi nhánh"):
+        make_tokens().verify(other.issue(7, 12))
+
+def test_token_signed_with_other_secret_is_rejected(monkeypatch):
+    tokens = make_tokens()
+    monkeypatch.setattr(tt, "TABLE_TOKEN_SECRET", "another-secret")
+    foreign = tokens.issue(7, 12)
+    monkeypatch.undo()
+    with pytest.raises(InvalidTableToken):
+        tokens.verify(foreign)
+
+def test_replaced_qr_code_is_rejected():
+    tokens = make_tokens()
+    old = tokens.issue(7, 12)
+    tokens._epochs[7] = 1  # PUT /api/tables/12 with changeToken
+    with pytest.raises(InvalidTableToken, match="thay mới"):
+        tokens.verify(old)
+    assert tokens.verify(tokens.issue(7, 12)).epoch == 1
+
+def test_table_claim_maps_rejection_to_403(monkeypatch):
+    monkeypatch.setattr(tt, "table_tokens", make_tokens())
+    assert tt.table_claim(None) is None
+    with pytest.raises(HTTPException) as e:
+        tt.table_claim("QR-12")
+    assert e.value.status_code == 403
@@ -1,188 +1,212 @@
 # ========================================
-# FILE: backend/utils/auth.py - PHIÊN BẢN HOÀN CHỈNH
+# FILE: backend/utils/auth.py - XÁC THỰC DÙNG CHUNG CHO MỌI ROUTER
 # ========================================
-
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+# One JWT dependency for the whole API: get_current_user() returns a typed
+# Principal. Verified tokens are kept in a bounded LRU cache until they
+# expire, so polling screens (kitchen, cashier) do not re-verify the HMAC on
+# every request.
+
+from fastapi import HTTPException, Header, Query, status
+from dataclasses import dataclass
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
+import threading
+import time
+import bcrypt
+import jwt
 import os
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 # ========================================
 # PASSWORD HASHING
 # ========================================
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """
-    Verify a plain password against a hashed password
-    
-    Args:
-        plain_password: Plain text password from user
-        hashed_password: Hashed password from database
-    Returns:
-        bool: True if password matches, False otherwise
-    """
+    """Verify a plain password against a bcrypt hash"""
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
     except Exception as e:
-        print(f" Password verification error: {e}")
+        logger.warning("Password verification error: %s", e)
         return False
 
 def get_password_hash(password: str) -> str:
-    """
-    Hash a password for storing in database
-    
-    Args:
-        password: Plain text password
-    
-    Returns:
-        str: Hashed password
-    """
-    return pwd_context.hash(password)
+    """Hash a password for storing in database"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
+# ========================================
 # JWT TOKEN
 # ========================================
 
-# JWT Settings from environment or defaults
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production-please")
+SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24 hours
 
-def create_access_token(user_id: int, username: str, role: str, expires_delta: Optional[timedelta] = None) -> str:
-    """
-    Create JWT access token
-    
-    Args:
-        user_id: User ID
-        username: Username
-        role: User role (OWNER, admin, CASHIER, etc.)
-        expires_delta: Optional custom expiration time
-    Returns:
-        str: JWT token
-    """
-    # Prepare data to encode
-    to_encode = {
+# Max verified tokens kept per worker
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+
+def create_access_token(user_id: int, username: str, role: str,
+                        employee_id: Optional[int] = None,
+                        expires_delta: Optional[timedelta] = None) -> str:
+    """Create JWT access token"""
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+    payload = {
         "user_id": user_id,
         "username": username,
         "role": role,
+        "employee_id": employee_id,
+        "exp": expire,
+        "iat": now
     }
-    
-    # Calculate expiration time
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    # Add expiration to payload
-    to_encode.update({"exp": expire})
-    
-    # Encode JWT
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    
-    print(f" Created token for user_id={user_id}, expires at {expire}")
-    
-    return encoded_jwt
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 # ========================================
-# TOKEN VERIFICATION
+# PRINCIPAL
 # ========================================
 
-# HTTP Bearer scheme for extracting token from Authorization header
-security = HTTPBearer()
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated user of a request"""
+    user_id: int
+    username: str
+    role: Optional[str]
+    employee_id: Optional[int]
+    expires_at: float
+
+    # Old handlers read the token payload as a dict
+    _ALIASES = {"employeeId": "employee_id", "userId": "user_id", "exp": "expires_at"}
+
+    def get(self, key: str, default=None):
+        value = getattr(self, self._ALIASES.get(key, key), None)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        attr = self._ALIASES.get(key, key)
+        if attr.startswith("_") or not hasattr(self, attr):
+            raise KeyError(key)
+        return getattr(self, attr)
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "Principal":
+        return cls(
+            user_id=payload.get("user_id"),
+            username=payload.get("username"),
+            role=payload.get("role"),
+            employee_id=payload.get("employee_id"),
+            expires_at=float(payload.get("exp") or 0),
+        )
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    """
-    Verify JWT token from Authorization header and return user data
-    
-    Expected header format: Authorization: Bearer <token>
-    
-    Args:
-        credentials: HTTPAuthorizationCredentials from FastAPI
-    
-    Returns:
-        dict: User data (user_id, username, role)
-    
-    Raises:
-        HTTPException: If token is invalid or expired
-    """
-    token = credentials.credentials
-    
-    credentials_exception = HTTPException(
+# ========================================
+# VERIFIED TOKEN CACHE
+# ========================================
+
+class TokenCache:
+    """Bounded LRU: token -> Principal; an entry lives only until its token expires"""
+
+    def __init__(self, max_entries: int = AUTH_TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            principal = self._entries.get(token)
+            if principal is None:
+                self._stats["misses"] += 1
+                return None
+            if principal.expires_at <= time.time():
+                del self._entries[token]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(token)
+            self._stats["hits"] += 1
+            return principal
+
+    def put(self, token: str, principal: Principal):
+        with self._lock:
+            self._entries[token] = principal
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries}
+
+token_cache = TokenCache()
+
+# ========================================
+# TOKEN VERIFICATION
+# ========================================
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="No authentication token found",
+        detail=detail,
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def decode_token(token: str) -> Principal:
+    """Verify a JWT (signature + exp) and return its Principal, using the cache"""
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
     try:
-        # Decode JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        
-        # Extract user info
-        user_id: int = payload.get("user_id")
-        username: str = payload.get("username")
-        role: str = payload.get("role")
-        
-        # Validate required fields
-        if user_id is None or username is None:
-            print(f"Token missing required fields: user_id={user_id}, username={username}")
-            raise credentials_exception
-        
-        # Check token expiration
-        exp = payload.get("exp")
-        if exp:
-            current_time = datetime.utcnow().timestamp()
-            if current_time > exp:
-                print(f" Token expired: exp={exp}, current={current_time}")
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token has expired",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-        
-        print(f" Token verified for user: {username} (role: {role})")
-        
-        return {
-            "user_id": user_id,
-            "username": username,
-            "role": role
-        }
-        
-    except JWTError as e:
-        print(f" JWT decode error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Invalid authentication token: {str(e)}",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
-    except Exception as e:
-        print(f" Unexpected error in get_current_user: {str(e)}")
-        raise credentials_exception 
-# ========================================
-# OPTIONAL USER (for endpoints that work with or without auth)
-# ========================================
-def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> Optional[dict]:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp"]})
+    except jwt.ExpiredSignatureError:
+        raise _unauthorized("Token đã hết hạn")
+    except jwt.InvalidTokenError:
+        raise _unauthorized("Token không hợp lệ")
+
+    principal = Principal.from_payload(payload)
+    if principal.user_id is None or principal.username is None:
+        raise _unauthorized("Token không hợp lệ")
+
+    token_cache.put(token, principal)
+    return principal
+
+def _extract_token(authorization: Optional[str], token: Optional[str]) -> Optional[str]:
+    if authorization:
+        scheme, _, credentials = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not credentials.strip():
+            raise _unauthorized("Sai định dạng token")
+        return credentials.strip()
+    return token
+
+async def get_current_user(
+    authorization: Optional[str] = Header(None),
+    token: Optional[str] = Query(None, include_in_schema=False),
+) -> Principal:
     """
-    Get current user if token is provided, otherwise return None
-    Useful for endpoints that have different behavior for authenticated vs anonymous users
-    
-    Args:
-        credentials: Optional HTTPAuthorizationCredentials
-    
-    Returns:
-        dict or None: User data if authenticated, None otherwise
+    Auth dependency for every router
+
+    Reads "Authorization: Bearer <token>"; ?token=<jwt> is accepted for
+    clients that cannot set headers (EventSource / SSE).
     """
-    if not credentials:
-        return None
-    
+    raw = _extract_token(authorization, token)
+    if not raw:
+        raise _unauthorized("Không tìm thấy token xác thực")
+    return decode_token(raw)
+
+async def get_current_user_optional(
+    authorization: Optional[str] = Header(None),
+    token: Optional[str] = Query(None, include_in_schema=False),
+) -> Optional[Principal]:
+    """Principal if a valid token is sent, otherwise None"""
     try:
-        return get_current_user(credentials)
+        raw = _extract_token(authorization, token)
+        return decode_token(raw) if raw else None
     except HTTPException:
         return None
 
@@ -190,17 +214,8 @@ def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials
 # HELPER FUNCTIONS
 # ========================================
 
-def create_test_user_token(username: str = "test", role: str = "admin") -> str:
-    """
-    Create a test token for development/testing
-    
-    Args:
-        username: Test username
-        role: Test user role
-    
-    Returns:
-        str: JWT token
-    """
+def create_test_user_token(username: str = "test", role: str = "OWNER") -> str:
+    """Create a test token for development/testing"""
     return create_access_token(
         user_id=999,
         username=username,
@@ -209,54 +224,9 @@ def create_test_user_token(username: str = "test", role: str = "admin") -> str:
     )
 
 def decode_token_without_verification(token: str) -> dict:
-    """
-    Decode token without verifying signature (for debugging)
-    
-    Args:
-        token: JWT token
-    
-    Returns:
-        dict: Decoded payload
-    """
+    """Decode token without verifying signature (for debugging only!)"""
     try:
-        # Decode without verification (ONLY for debugging!)
-        payload = jwt.decode(token, options={"verify_signature": False})
-        return payload
+        return jwt.decode(token, options={"verify_signature": False})
     except Exception as e:
-        print(f" Failed to decode token: {e}")
+        logger.debug("Failed to decode token: %s", e)
         return {}
-
-# ========================================
-# TESTING FUNCTIONS
-# ========================================
-
-if __name__ == "__main__":
-    # Test password hashing
-    print("\n" + "=" * 60)
-    print("Testing Password Hashing")
-    print("=" * 60)
-    
-    password = "password"
-    hashed = get_password_hash(password)
-    print(f"Plain password: {password}")
-    print(f"Hashed: {hashed}")
-    print(f"Verification: {verify_password(password, hashed)}")
-    print(f"Wrong password: {verify_password('wrong', hashed)}")
-    
-    # Test token creation
-    print("\n" + "=" * 60)
-    print("Testing Token Creation")
-    print("=" * 60)
-    
-    token = create_access_token(
-        user_id=1,
-        username="admin",
-        role="admin"
-    )
-    print(f"Token: {token}")
-    
-    # Decode token
-    payload = decode_token_without_verification(token)
-    print(f"Decoded payload: {payload}")
-    
-    print("\n All tests completed!")
\ No newline at end of file
@@ -0,0 +1,39 @@
+# ========================================
+# FILE: backend/utils/dates.py
+# ========================================
+# Date filters that keep the column bare so PostgreSQL can use its index.
+#
+#   DATE(o.created_at) >= '2024-01-01'      -> function on the column, seq scan
+#   o.created_at >= '2024-01-01'
+#   AND o.created_at < '2024-01-02'         -> half-open range, index scan
+#
+# Date params are inclusive calendar days; the upper bound becomes the start
+# of the NEXT day, so every timestamp of date_to is still included.
+
+from datetime import date, timedelta
+from typing import Optional
+
+def date_range_filter(column: str, date_from: Optional[date] = None,
+                      date_to: Optional[date] = None) -> tuple[str, list]:
+    """
+    " AND column >= %s AND column < %s" for the given inclusive days
+
+    Returns ("", []) when neither bound is given. Works for TIMESTAMP and DATE
+    columns alike.
+    """
+    sql = ""
+    params = []
+
+    if date_from:
+        sql += f" AND {column} >= %s"
+        params.append(date_from)
+
+    if date_to:
+        sql += f" AND {column} < %s"
+        params.append(date_to + timedelta(days=1))
+
+    return sql, params
+
+def today_filter(column: str) -> str:
+    """Sargable "DATE(column) = CURRENT_DATE" (uses the database's notion of today)"""
+    return f"{column} >= CURRENT_DATE AND {column} < CURRENT_DATE + 1"
@@ -0,0 +1,164 @@
+# ========================================
+# FILE: backend/utils/hashing.py - BCRYPT NGOÀI EVENT LOOP
+# ========================================
+# bcrypt at cost 12 is ~250 ms of pure CPU. Running it inside a handler
+# stalls every other request on the worker (kitchen screens, cashier polling)
+# during a shift-change login storm.
+#
+# PasswordHasher sends hashes/verifies to a small process pool:
+#   - await password_hasher.verify(...) / .hash(...) from async handlers
+#   - password_hasher.hash_blocking(...) from sync handlers (threadpool)
+# At most HASH_MAX_PENDING jobs are admitted; beyond that callers get
+# 429 + Retry-After instead of queueing without bound.
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import bcrypt
+from fastapi import HTTPException, status
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Leave one core for the event loop
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+# Running + queued jobs admitted before answering 429
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_POOL_WORKERS * 16)))
+RETRY_AFTER_SECONDS = 1
+
+# ==================== WORKER FUNCTIONS (run in child processes) ====================
+
+def _hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _verify_password(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.strip().encode('utf-8'), hashed.strip().encode('utf-8'))
+    except ValueError:
+        # Malformed hash in the database
+        return False
+
+def _ping() -> int:
+    return os.getpid()
+
+# ==================== HASHER ====================
+
+class PasswordHasher:
+    """Bounded process pool for bcrypt with queue metrics"""
+
+    def __init__(self, workers: int = HASH_POOL_WORKERS, max_pending: int = HASH_MAX_PENDING,
+                 rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {"completed": 0, "failed": 0, "rejected": 0, "peak_in_flight": 0,
+                       "total_ms": 0.0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a worker that holds DB pools and threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Hệ thống đang bận, vui lòng thử lại sau giây lát",
+                    headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+                )
+            self._in_flight += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+
+    def _done(self, started: float, future: Future):
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._stats["failed"] += 1
+            else:
+                self._stats["completed"] += 1
+                self._stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+    def _submit(self, fn, *args) -> Future:
+        self._admit()
+        started = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A child died (OOM killer...): start a fresh pool once
+                self._reset_executor(executor)
+                future = self._get_executor().submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+                self._stats["failed"] += 1
+            raise
+        future.add_done_callback(lambda f: self._done(started, f))
+        return future
+
+    # ---------- async API ----------
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash_password, password, self.rounds))
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await asyncio.wrap_future(self._submit(_verify_password, password, hashed))
+
+    # ---------- sync API (for `def` handlers, already off the event loop) ----------
+
+    def hash_blocking(self, password: str) -> str:
+        return self._submit(_hash_password, password, self.rounds).result()
+
+    def verify_blocking(self, password: str, hashed: str) -> bool:
+        return self._submit(_verify_password, password, hashed).result()
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Spawn the worker processes now instead of on the first login"""
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._stats["completed"]
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "peak_in_flight": self._stats["peak_in_flight"],
+                "completed": completed,
+                "failed": self._stats["failed"],
+                "rejected": self._stats["rejected"],
+                "avg_ms": round(self._stats["total_ms"] / completed, 1) if completed else 0.0,
+            }
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,185 @@
+# ========================================
+# FILE: backend/utils/idempotency.py
+# ========================================
+# Idempotency-Key support for POST /api/orders/public.
+#
+# A retried request (double tap, frontend retry on bad Wi-Fi) carrying the same
+# key for the same table gets the ORIGINAL response back instead of creating a
+# second order and a second kitchen ticket.
+#
+# Two layers:
+#   1. bounded in-memory LRU per worker -> replay without touching the database
+#   2. idempotency_keys table (migrations/001) -> shared by all workers; the key
+#      is claimed inside the order transaction, so concurrent duplicates block
+#      on the primary key until the first one commits
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException, status
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "2048"))
+MAX_KEY_LENGTH = 255
+# Expired rows are deleted at most this often per worker
+PURGE_INTERVAL_SECONDS = 300
+
+class StoredResponse:
+    """Response recorded for a (table, key) pair"""
+
+    __slots__ = ("request_hash", "status_code", "body", "expires_at")
+
+    def __init__(self, request_hash: str, status_code: int, body: dict, expires_at: float):
+        self.request_hash = request_hash
+        self.status_code = status_code
+        self.body = body
+        self.expires_at = expires_at
+
+def request_fingerprint(payload) -> str:
+    """sha256 of the request body, to detect a key reused for a different order"""
+    if hasattr(payload, "model_dump_json"):
+        raw = payload.model_dump_json()
+    else:
+        raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def validate_key(key: Optional[str]) -> Optional[str]:
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key phải có từ 1 đến {MAX_KEY_LENGTH} ký tự"
+        )
+    return key
+
+def _check_same_request(stored: StoredResponse, request_hash: str):
+    if stored.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key đã được dùng cho một yêu cầu khác"
+        )
+
+class IdempotencyStore:
+    """Bounded LRU cache in front of the idempotency_keys table"""
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_CACHE_SIZE,
+                 ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._stats = {"memory_hits": 0, "db_hits": 0, "claims": 0, "evictions": 0}
+
+    # ---------- memory layer ----------
+
+    def _remember(self, scope: tuple, stored: StoredResponse):
+        with self._lock:
+            self._entries[scope] = stored
+            self._entries.move_to_end(scope)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def lookup(self, table_number: int, key: str, request_hash: str) -> Optional[StoredResponse]:
+        """Replay from memory only; None means "ask the database" """
+        scope = (table_number, key)
+        with self._lock:
+            stored = self._entries.get(scope)
+            if stored is None:
+                return None
+            if stored.expires_at <= time.time():
+                del self._entries[scope]
+                return None
+            self._entries.move_to_end(scope)
+            self._stats["memory_hits"] += 1
+        _check_same_request(stored, request_hash)
+        return stored
+
+    # ---------- database layer (psycopg2 cursor of the order transaction) ----------
+
+    def claim(self, cursor, table_number: int, key: str, request_hash: str) -> Optional[StoredResponse]:
+        """
+        Claim the key inside the current transaction
+
+        Returns None when this request owns the key (go ahead and create the
+        order), or the stored response of an earlier request to replay.
+        """
+        self._purge_expired(cursor)
+
+        # An expired row is taken over as if it did not exist
+        cursor.execute("""
+            INSERT INTO idempotency_keys (table_number, idem_key, request_hash)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (table_number, idem_key) DO UPDATE
+                SET request_hash = EXCLUDED.request_hash,
+                    status_code = NULL,
+                    response = NULL,
+                    created_at = NOW()
+                WHERE idempotency_keys.created_at < NOW() - make_interval(secs => %s)
+            RETURNING idem_key
+        """, (table_number, key, request_hash, self.ttl_seconds))
+        if cursor.fetchone():
+            with self._lock:
+                self._stats["claims"] += 1
+            return None
+
+        cursor.execute("""
+            SELECT request_hash, status_code, response,
+                   EXTRACT(EPOCH FROM created_at)::float8 AS created_epoch
+            FROM idempotency_keys
+            WHERE table_number = %s AND idem_key = %s
+        """, (table_number, key))
+        row = cursor.fetchone()
+        if not row or row['response'] is None:
+            # Only happens if the row vanished between the two statements
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Yêu cầu với Idempotency-Key này đang được xử lý, vui lòng thử lại"
+            )
+
+        stored = StoredResponse(row['request_hash'], row['status_code'], row['response'],
+                                row['created_epoch'] + self.ttl_seconds)
+        _check_same_request(stored, request_hash)
+        with self._lock:
+            self._stats["db_hits"] += 1
+        self._remember((table_number, key), stored)
+        return stored
+
+    def save(self, cursor, table_number: int, key: str, request_hash: str,
+             status_code: int, body: dict):
+        """Record the response in the same transaction as the order"""
+        cursor.execute("""
+            UPDATE idempotency_keys
+            SET status_code = %s, response = %s::jsonb
+            WHERE table_number = %s AND idem_key = %s
+        """, (status_code, json.dumps(body, default=str), table_number, key))
+
+    def remember(self, table_number: int, key: str, request_hash: str,
+                 status_code: int, body: dict):
+        """Put the response in the memory layer; call only after COMMIT"""
+        self._remember((table_number, key),
+                       StoredResponse(request_hash, status_code, body, time.time() + self.ttl_seconds))
+
+    def _purge_expired(self, cursor):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+                return
+            self._last_purge = now
+        cursor.execute(
+            "DELETE FROM idempotency_keys WHERE created_at < NOW() - make_interval(secs => %s)",
+            (self.ttl_seconds,)
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries}
+
+store = IdempotencyStore()
@@ -0,0 +1,137 @@
+# ========================================
+# FILE: backend/utils/kitchen_events.py
+# ========================================
+# Push kitchen ticket events to screens instead of letting them poll.
+#
+# Writers call notify_kitchen_event() inside their transaction; PostgreSQL
+# delivers the NOTIFY only when that transaction commits. Each worker keeps
+# ONE listening connection and fans every notification out to all of its
+# connected screens, so database load does not grow with the screen count.
+
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Optional
+from config import async_database as adb
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+CHANNEL = "kitchen_events"
+
+# Event types
+TICKET_CREATED = "ticket_created"
+TICKET_STATUS_CHANGED = "ticket_status_changed"
+TICKET_CANCELLED = "ticket_cancelled"
+
+# Per-screen buffer; a screen that falls this far behind is told to resync
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("KITCHEN_STREAM_QUEUE_SIZE", "256"))
+RECONNECT_DELAY_SECONDS = float(os.getenv("KITCHEN_STREAM_RECONNECT_DELAY", "2"))
+
+# ========================================
+# WRITER SIDE (psycopg2, inside the request transaction)
+# ========================================
+
+def notify_kitchen_event(cursor, event: str, **payload):
+    """
+    Queue a kitchen event on the current transaction
+
+    Args:
+        cursor: cursor of the transaction that makes the change
+        event: one of TICKET_CREATED, TICKET_STATUS_CHANGED, TICKET_CANCELLED
+        payload: JSON-serialisable fields (order_id, kitchen_order_id, status ...)
+    """
+    message = {"type": event, "at": datetime.now().isoformat(), **payload}
+    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, json.dumps(message, default=str)))
+
+# ========================================
+# READER SIDE (asyncpg, one listener per worker)
+# ========================================
+
+class KitchenEventBroker:
+    """Single LISTEN connection per worker that fans events out to subscribers"""
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self._subscribers = set()
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._closed = False
+        self.events_received = 0
+
+    async def _listen(self):
+        """Keep a LISTEN connection open, reconnecting after failures"""
+        reconnecting = False
+        while not self._closed:
+            lost = asyncio.Event()
+            try:
+                self._conn = await adb.connect()
+                self._conn.add_termination_listener(lambda _conn: lost.set())
+                await self._conn.add_listener(self.channel, self._on_notify)
+                logger.info("Kitchen stream listening", extra={"channel": self.channel})
+                if reconnecting:
+                    # Screens may have missed events while we were disconnected
+                    self._broadcast({"type": "resync"})
+                reconnecting = True
+                await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Kitchen stream listener error: %s", e)
+            finally:
+                if self._conn is not None and not self._conn.is_closed():
+                    await self._conn.close()
+                self._conn = None
+            if not self._closed:
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str):
+        self.events_received += 1
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        self._broadcast(event)
+
+    def _broadcast(self, event: dict):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Drop the backlog and ask the screen to reload the board once
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+    async def subscribe(self) -> asyncio.Queue:
+        async with self._lock:
+            if self._task is None or self._task.done():
+                self._closed = False
+                self._task = asyncio.create_task(self._listen())
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def close(self):
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "listening": self._conn is not None and not self._conn.is_closed(),
+            "events_received": self.events_received,
+        }
+
+broker = KitchenEventBroker()
@@ -0,0 +1,147 @@
+# ========================================
+# FILE: backend/utils/menu_cache.py
+# ========================================
+# In-process snapshot of GET /api/menu/public.
+#
+# The menu changes a few times a day but is read on every QR scan. Each worker
+# keeps the response as ready-to-send bytes (plain + gzip) with a strong ETag,
+# and rebuilds it only when cache_versions.menu (migrations/006) moves.
+# The version is read at most once per MENU_VERSION_CHECK_INTERVAL seconds, so
+# a change made through any worker is visible everywhere within that delay.
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+from config.database import get_db_connection
+
+MENU_VERSION_CHECK_INTERVAL = float(os.getenv("MENU_VERSION_CHECK_INTERVAL", "2"))
+CACHE_NAME = "menu"
+
+PUBLIC_MENU_QUERY = """
+    SELECT 
+        m.item_id,
+        m.item_name,
+        m.description,
+        m.price,
+        m.image_url,
+        m.category_id,
+        c.category_name
+    FROM menu_items m
+    LEFT JOIN categories c ON m.category_id = c.category_id
+    WHERE UPPER(m.status) = 'AVAILABLE'
+    ORDER BY m.item_name
+"""
+
+class MenuSnapshot:
+    """Serialized public menu for one menu version"""
+
+    __slots__ = ("version", "body", "gzip_body", "etag", "gzip_etag", "count", "built_at")
+
+    def __init__(self, version: int, items: list):
+        payload = {"success": True, "count": len(items), "data": items}
+        # Same encoding as FastAPI's JSONResponse
+        self.body = json.dumps(
+            jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+            indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Strong ETags: one per representation, since the bytes differ
+        self.etag = f'"menu-{version}-{digest}"'
+        self.gzip_etag = f'"menu-{version}-{digest}-gz"'
+        self.version = version
+        self.count = len(items)
+        self.built_at = time.time()
+
+class MenuCache:
+    def __init__(self, check_interval: float = MENU_VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "version_checks": 0, "rebuilds": 0}
+
+    def get(self) -> MenuSnapshot:
+        """Current snapshot; touches the database only when a version check is due"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            self._stats["hits"] += 1
+            return snapshot
+
+        # One thread refreshes, the others wait and reuse its result
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                self._stats["hits"] += 1
+                return snapshot
+            return self._refresh(snapshot)
+
+    def _refresh(self, snapshot: Optional[MenuSnapshot]) -> MenuSnapshot:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            # Version BEFORE the menu: a change committing in between yields a
+            # newer menu under an older version, which the next check rebuilds.
+            cursor.execute("SELECT version FROM cache_versions WHERE name = %s", (CACHE_NAME,))
+            row = cursor.fetchone()
+            version = row['version'] if row else 0
+            self._stats["version_checks"] += 1
+
+            if snapshot is None or snapshot.version != version:
+                cursor.execute(PUBLIC_MENU_QUERY)
+                snapshot = MenuSnapshot(version, cursor.fetchall())
+                self._snapshot = snapshot
+                self._stats["rebuilds"] += 1
+            cursor.close()
+        finally:
+            conn.rollback()
+            conn.close()
+
+        self._checked_at = time.monotonic()
+        return snapshot
+
+    def invalidate(self):
+        """Force a version check on the next request (this worker)"""
+        self._checked_at = 0.0
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            **self._stats,
+            "version": snapshot.version if snapshot else None,
+            "items": snapshot.count if snapshot else 0,
+            "bytes": len(snapshot.body) if snapshot else 0,
+            "gzip_bytes": len(snapshot.gzip_body) if snapshot else 0,
+        }
+
+def bump_menu_version(cursor):
+    """Call inside the transaction that changes menu_items"""
+    cursor.execute("""
+        UPDATE cache_versions SET version = version + 1, updated_at = NOW()
+        WHERE name = %s
+    """, (CACHE_NAME,))
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    if not accept_encoding:
+        return False
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+menu_cache = MenuCache()
@@ -0,0 +1,171 @@
+# ========================================
+# FILE: backend/utils/menu_search.py
+# ========================================
+# Menu search for GET /api/menu?search=...
+#
+# - PostgreSQL path (migrations/007): unaccent + tsvector prefix match + pg_trgm
+#   word similarity, all index-backed, ranked by ts_rank.
+# - Fallback path (no unaccent/pg_trgm on the server): an in-memory inverted
+#   index of every worker, rebuilt when the menu version (cache_versions,
+#   migrations/006) changes.
+#
+# Both paths are accent-insensitive ("pho" -> "Phở", "dau" -> "Đậu") and treat
+# every query word as a prefix, so results update while the user types.
+
+import bisect
+import json
+import re
+import threading
+import time
+import unicodedata
+from typing import Optional
+from utils.menu_cache import MENU_VERSION_CHECK_INTERVAL, CACHE_NAME
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+MAX_QUERY_TOKENS = 8
+
+# ==================== TEXT NORMALIZATION ====================
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, strip Vietnamese diacritics (đ -> d)"""
+    if not text:
+        return ""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn").lower()
+
+def tokenize(text: Optional[str]) -> list:
+    return re.findall(r"\w+", normalize(text))
+
+# ==================== IN-MEMORY FALLBACK ====================
+
+NAME_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+EXACT_WORD_BONUS = 0.5
+
+class FallbackIndex:
+    """Inverted index: token -> {item_id: weight}, tokens kept sorted for prefix lookup"""
+
+    def __init__(self, rows: list):
+        postings = {}
+        self.names = {}
+        for row in rows:
+            item_id = row['item_id']
+            self.names[item_id] = normalize(row['item_name'])
+            for weight, text in ((NAME_WEIGHT, row['item_name']), (DESCRIPTION_WEIGHT, row['description'])):
+                for token in tokenize(text):
+                    entry = postings.setdefault(token, {})
+                    entry[item_id] = max(entry.get(item_id, 0.0), weight)
+        self.postings = postings
+        self.tokens = sorted(postings)
+
+    def _prefix_scores(self, prefix: str) -> dict:
+        """Best weight per item over all tokens starting with prefix"""
+        scores = {}
+        start = bisect.bisect_left(self.tokens, prefix)
+        for token in self.tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            bonus = EXACT_WORD_BONUS if token == prefix else 0.0
+            for item_id, weight in self.postings[token].items():
+                scores[item_id] = max(scores.get(item_id, 0.0), weight + bonus)
+        return scores
+
+    def search(self, query: str) -> list:
+        """item_ids matching EVERY query word (as a prefix), best first"""
+        tokens = tokenize(query)[:MAX_QUERY_TOKENS]
+        if not tokens:
+            return []
+        total = None
+        for token in tokens:
+            scores = self._prefix_scores(token)
+            if total is None:
+                total = scores
+            else:
+                total = {item_id: total[item_id] + score
+                         for item_id, score in scores.items() if item_id in total}
+            if not total:
+                return []
+        return sorted(total, key=lambda item_id: (-total[item_id], self.names[item_id]))
+
+# ==================== SEARCH FRONT ====================
+
+class MenuSearch:
+    def __init__(self, check_interval: float = MENU_VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._sql_available: Optional[bool] = None
+        self._index: Optional[FallbackIndex] = None
+        self._index_version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def sql_available(self, cursor) -> bool:
+        """Were the migration 007 functions created? (checked once per worker)"""
+        if self._sql_available is None:
+            cursor.execute("SELECT to_regprocedure('menu_search_vector(text,text)') IS NOT NULL AS ok")
+            self._sql_available = bool(cursor.fetchone()['ok'])
+            logger.info("Menu search backend: %s",
+                        "PostgreSQL unaccent/pg_trgm" if self._sql_available else "in-memory fallback")
+        return self._sql_available
+
+    def _fallback_index(self, cursor) -> FallbackIndex:
+        if self._index is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._index
+        with self._lock:
+            if self._index is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._index
+            cursor.execute("SELECT version FROM cache_versions WHERE name = %s", (CACHE_NAME,))
+            row = cursor.fetchone()
+            version = row['version'] if row else None
+            if self._index is None or version is None or version != self._index_version:
+                cursor.execute("SELECT item_id, item_name, description FROM menu_items")
+                self._index = FallbackIndex(cursor.fetchall())
+                self._index_version = version
+            self._checked_at = time.monotonic()
+            return self._index
+
+    def warm(self, cursor):
+        """Probe the SQL backend and, without it, build the in-memory index (startup)"""
+        if not self.sql_available(cursor):
+            self._fallback_index(cursor)
+
+    def clause(self, cursor, search: str) -> tuple:
+        """
+        SQL pieces for a search on menu_items aliased as m
+
+        Returns (where_sql, where_params, order_sql, order_params); where_sql
+        starts with " AND", order_sql is a full " ORDER BY ..." clause.
+        """
+        tokens = re.findall(r"\w+", search.lower())[:MAX_QUERY_TOKENS]
+        if not tokens:
+            return "", [], " ORDER BY m.item_name", []
+
+        if self.sql_available(cursor):
+            # Every word is a prefix: "pho bo" -> 'pho:* & bo:*'
+            tsquery = " & ".join(f"{token}:*" for token in tokens)
+            phrase = " ".join(tokens)
+            where_sql = """
+                AND (
+                    menu_search_vector(m.item_name, m.description)
+                        @@ to_tsquery('simple', menu_search_unaccent(%s))
+                    OR menu_search_unaccent(%s) <%% menu_search_unaccent(m.item_name)
+                )
+            """
+            order_sql = """
+                ORDER BY
+                    ts_rank(menu_search_vector(m.item_name, m.description),
+                            to_tsquery('simple', menu_search_unaccent(%s))) DESC,
+                    word_similarity(menu_search_unaccent(%s), menu_search_unaccent(m.item_name)) DESC,
+                    m.item_name
+            """
+            return where_sql, [tsquery, phrase], order_sql, [tsquery, phrase]
+
+        item_ids = self._fallback_index(cursor).search(search)
+        # Rank lookup in a jsonb object stays cheap for broad queries
+        ranks = json.dumps({str(item_id): rank for rank, item_id in enumerate(item_ids)})
+        return (" AND m.item_id = ANY(%s)", [item_ids],
+                " ORDER BY (%s::jsonb ->> m.item_id::text)::int", [ranks])
+
+menu_search = MenuSearch()
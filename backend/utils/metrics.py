@@ -0,0 +1,205 @@
+# ========================================
+# FILE: backend/utils/metrics.py - METRICS THEO ROUTE (PROMETHEUS)
+# ========================================
+# Filled by middleware/metrics.py (latency, status, in-flight) and by the
+# cursor in config/database.py (query count, DB time). GET /metrics renders
+# everything in the Prometheus text format.
+#
+# Per-request DB counters live in a contextvar: starlette copies the context
+# into the threadpool, so a `def` handler's cursor sees the object the
+# middleware created for that request.
+#
+# Env:
+#   METRICS_QUERY_WARN_THRESHOLD  log a warning (possible N+1) when one request
+#                                 runs more queries than this (default 20)
+
+import bisect
+import os
+import threading
+from contextvars import ContextVar
+from typing import Optional
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+METRICS_QUERY_WARN_THRESHOLD = int(os.getenv("METRICS_QUERY_WARN_THRESHOLD", "20"))
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# Label for requests no route matched (404s, scanners) so they share one series
+UNMATCHED_ROUTE = "unmatched"
+
+# ==================== PER-REQUEST DB COUNTERS ====================
+
+class RequestStats:
+    """Queries run on behalf of one request"""
+
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # statement text -> times run; repeated statements are the N+1 signature
+        self.statements = {}
+
+    def top_statements(self, limit: int = 3) -> list:
+        top = sorted(self.statements.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [{"count": count, "sql": " ".join(sql.split())[:200]} for sql, count in top]
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def begin_request():
+    """Start counting queries for the current request; returns (stats, token)"""
+    stats = RequestStats()
+    return stats, _request_stats.set(stats)
+
+def end_request(token):
+    _request_stats.reset(token)
+
+def record_query(statement, seconds: float):
+    """Called by the DB layer after every statement"""
+    stats = _request_stats.get()
+    if stats is None:
+        # Startup, background tasks, scripts
+        return
+    stats.queries += 1
+    stats.db_seconds += seconds
+    key = statement if isinstance(statement, str) else type(statement).__name__
+    stats.statements[key] = stats.statements.get(key, 0) + 1
+
+# ==================== REGISTRY ====================
+
+class Histogram:
+    """Cumulative-bucket histogram as Prometheus expects it"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+class RouteMetrics:
+    __slots__ = ("latency", "db_seconds", "queries", "statuses", "slow_query_requests")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_seconds = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.statuses = {}
+        self.slow_query_requests = 0
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Pool fields exported as gauges; everything else numeric is a counter
+_POOL_GAUGES = ("size", "idle", "in_use", "min_size", "max_size")
+_POOL_COUNTERS = ("connections_created", "connections_closed", "checkouts", "checkout_waits",
+                  "checkout_timeouts", "health_checks", "health_check_failures", "expired")
+
+class MetricsRegistry:
+    """Per-(method, route template) request metrics"""
+
+    def __init__(self, query_warn_threshold: int = METRICS_QUERY_WARN_THRESHOLD):
+        self.query_warn_threshold = query_warn_threshold
+        self.in_flight = 0
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float,
+                stats: RequestStats):
+        too_many_queries = stats.queries > self.query_warn_threshold
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.latency.observe(seconds)
+            metrics.db_seconds.observe(stats.db_seconds)
+            metrics.queries.observe(stats.queries)
+            metrics.statuses[status_code] = metrics.statuses.get(status_code, 0) + 1
+            if too_many_queries:
+                metrics.slow_query_requests += 1
+
+        if too_many_queries:
+            logger.warning("Possible N+1: too many queries in one request", extra={
+                "method": method,
+                "route": route,
+                "status": status_code,
+                "queries": stats.queries,
+                "db_ms": round(stats.db_seconds * 1000, 1),
+                "total_ms": round(seconds * 1000, 1),
+                "top_statements": stats.top_statements(),
+            })
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self, pools: Optional[dict] = None) -> str:
+        """Prometheus text exposition (format 0.0.4)"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP restaurant_http_requests_in_flight Requests currently being handled",
+                "# TYPE restaurant_http_requests_in_flight gauge",
+                f"restaurant_http_requests_in_flight {self.in_flight}",
+                "# HELP restaurant_http_requests_total Requests by route and status code",
+                "# TYPE restaurant_http_requests_total counter",
+            ]
+            for (method, route), m in routes:
+                for status_code, count in sorted(m.statuses.items()):
+                    lines.append(f'restaurant_http_requests_total{{method="{method}",'
+                                 f'route="{_escape(route)}",status="{status_code}"}} {count}')
+
+            for name, attr, help_text in (
+                ("restaurant_http_request_duration_seconds", "latency", "Request latency"),
+                ("restaurant_db_time_seconds", "db_seconds", "Time spent in SQL per request"),
+                ("restaurant_db_queries_per_request", "queries", "SQL statements per request"),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (method, route), m in routes:
+                    labels = f'method="{method}",route="{_escape(route)}"'
+                    lines.extend(getattr(m, attr).render(name, labels))
+
+            lines.append("# HELP restaurant_db_query_warnings_total Requests over "
+                         "METRICS_QUERY_WARN_THRESHOLD queries")
+            lines.append("# TYPE restaurant_db_query_warnings_total counter")
+            for (method, route), m in routes:
+                if m.slow_query_requests:
+                    lines.append(f'restaurant_db_query_warnings_total{{method="{method}",'
+                                 f'route="{_escape(route)}"}} {m.slow_query_requests}')
+
+        pools = pools or {}
+        for keys, suffix, kind in ((_POOL_GAUGES, "", "gauge"), (_POOL_COUNTERS, "_total", "counter")):
+            for key in keys:
+                samples = [(name, s[key]) for name, s in pools.items() if key in s]
+                if samples:
+                    lines.append(f"# TYPE restaurant_db_pool_{key}{suffix} {kind}")
+                    lines.extend(f'restaurant_db_pool_{key}{suffix}{{pool="{name}"}} {value}'
+                                 for name, value in samples)
+
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
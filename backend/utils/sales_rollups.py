@@ -0,0 +1,104 @@
+# ========================================
+# FILE: backend/utils/sales_rollups.py
+# ========================================
+# Pre-aggregated sales for the dashboard (tables from migrations/003).
+#
+# process_payment embeds rollup_ctes() in its settlement statement, so a
+# payment and its rollup rows commit (or roll back) together. rebuild()
+# recomputes the same rollups from the payments table, using the SAME
+# aggregation, for backfills and repairs (see rebuild_rollups.py).
+
+from datetime import date, timedelta
+from typing import Optional
+
+ROLLUP_TABLES = ("sales_rollup", "item_sales_rollup", "category_sales_rollup")
+
+# {payments} is the payments table, or a CTE with the same columns (RETURNING
+# of an INSERT in the same statement); {payment_filter} selects the PAID
+# payments to add. Data-modifying CTEs always run, so one statement updates
+# all three tables. CTE names used: paid, lines, sales, items, categories.
+ROLLUP_CTES = """
+    paid AS (
+        SELECT p.payment_id, p.order_id, p.amount_paid,
+               COALESCE(p.payment_method, 'unknown') AS payment_method,
+               p.created_at::date AS sale_date,
+               EXTRACT(HOUR FROM p.created_at)::smallint AS sale_hour
+        FROM {payments} p
+        WHERE p.status = 'PAID' AND {payment_filter}
+    ),
+    lines AS (
+        SELECT paid.payment_id, paid.sale_date, paid.sale_hour, paid.payment_method,
+               oi.item_id, COALESCE(m.category_id, 0) AS category_id, oi.quantity,
+               COALESCE(oi.subtotal, oi.quantity * oi.unit_price, 0) AS revenue
+        FROM paid
+        JOIN order_items oi ON oi.order_id = paid.order_id
+        LEFT JOIN menu_items m ON m.item_id = oi.item_id
+    ),
+    sales AS (
+        INSERT INTO sales_rollup AS r (sale_date, sale_hour, payment_method, payment_count, revenue)
+        SELECT sale_date, sale_hour, payment_method, COUNT(*), SUM(amount_paid)
+        FROM paid
+        GROUP BY sale_date, sale_hour, payment_method
+        ON CONFLICT (sale_date, sale_hour, payment_method) DO UPDATE
+            SET payment_count = r.payment_count + EXCLUDED.payment_count,
+                revenue = r.revenue + EXCLUDED.revenue
+    ),
+    items AS (
+        INSERT INTO item_sales_rollup AS r
+            (sale_date, sale_hour, item_id, payment_method, category_id, order_count, quantity, revenue)
+        SELECT sale_date, sale_hour, item_id, payment_method, MIN(category_id),
+               COUNT(DISTINCT payment_id), SUM(quantity), SUM(revenue)
+        FROM lines
+        GROUP BY sale_date, sale_hour, item_id, payment_method
+        ON CONFLICT (sale_date, sale_hour, item_id, payment_method) DO UPDATE
+            SET category_id = EXCLUDED.category_id,
+                order_count = r.order_count + EXCLUDED.order_count,
+                quantity = r.quantity + EXCLUDED.quantity,
+                revenue = r.revenue + EXCLUDED.revenue
+    ),
+    categories AS (
+        INSERT INTO category_sales_rollup AS r
+            (sale_date, sale_hour, category_id, payment_method, order_count, items_sold, revenue)
+        SELECT sale_date, sale_hour, category_id, payment_method,
+               COUNT(DISTINCT payment_id), SUM(quantity), SUM(revenue)
+        FROM lines
+        GROUP BY sale_date, sale_hour, category_id, payment_method
+        ON CONFLICT (sale_date, sale_hour, category_id, payment_method) DO UPDATE
+            SET order_count = r.order_count + EXCLUDED.order_count,
+                items_sold = r.items_sold + EXCLUDED.items_sold,
+                revenue = r.revenue + EXCLUDED.revenue
+    )
+"""
+
+def rollup_ctes(payments: str = "payments", payment_filter: str = "TRUE") -> str:
+    """The rollup CTEs, to be placed after WITH (and after the CTE named by `payments`)"""
+    return ROLLUP_CTES.format(payments=payments, payment_filter=payment_filter)
+
+def rebuild(cursor, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """
+    Recompute the rollups from payments for [date_from, date_to] (whole history by default)
+
+    The rollup tables are locked against concurrent payments until the caller
+    commits, so no payment is counted twice or missed.
+    """
+    cursor.execute(f"LOCK TABLE {', '.join(ROLLUP_TABLES)} IN EXCLUSIVE MODE")
+
+    conditions = []
+    payment_conditions = []
+    params = {}
+    if date_from:
+        conditions.append("sale_date >= %(date_from)s")
+        payment_conditions.append("p.created_at >= %(date_from)s")
+        params["date_from"] = date_from
+    if date_to:
+        conditions.append("sale_date <= %(date_to)s")
+        payment_conditions.append("p.created_at < %(date_end)s")
+        params["date_to"] = date_to
+        params["date_end"] = date_to + timedelta(days=1)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    for table in ROLLUP_TABLES:
+        cursor.execute(f"DELETE FROM {table} {where}", params)
+
+    payment_filter = " AND ".join(payment_conditions) or "TRUE"
+    cursor.execute("WITH" + rollup_ctes(payment_filter=payment_filter) + "SELECT COUNT(*) FROM paid", params)
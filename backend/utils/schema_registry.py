@@ -0,0 +1,95 @@
+# ========================================
+# FILE: backend/utils/schema_registry.py - TÊN BẢNG THỰC TẾ TRONG DATABASE
+# ========================================
+# Databases created from older scripts keep the dining tables in `tables`,
+# `dining_tables` or `restaurant_tables`, and not all of them have every
+# column (schema.sql has no qr_code). Instead of each router guessing, the
+# names are resolved once at startup (the "schema" step in utils/startup.py)
+# and every query reads them from here:
+#
+#     cursor.execute(f"SELECT ... FROM orders o JOIN {schema.tables} t ON ...")
+#     if schema.has_column("tables", "qr_code"): ...
+#
+# Until resolve() has run, the first candidate is used and every column is
+# assumed to exist, which is what the code always did.
+
+import threading
+from typing import Optional
+
+# Logical name -> physical relations to look for, in order of preference
+RELATION_CANDIDATES = {
+    "tables": ("tables", "dining_tables", "restaurant_tables"),
+}
+
+# Columns the routers cannot do without
+REQUIRED_COLUMNS = {
+    "tables": ("table_id", "table_number", "status"),
+}
+
+RESOLVE_QUERY = """
+    SELECT cand.name, array_agg(a.attname::text ORDER BY a.attnum) AS columns
+    FROM unnest(%s::text[]) AS cand(name)
+    JOIN pg_attribute a ON a.attrelid = to_regclass(cand.name)
+                       AND a.attnum > 0 AND NOT a.attisdropped
+    GROUP BY cand.name
+"""
+
+class SchemaError(Exception):
+    """The database is reachable but not migrated for this code"""
+
+class SchemaRegistry:
+    """Physical relation and column names, resolved once per process"""
+
+    def __init__(self, candidates: dict = RELATION_CANDIDATES):
+        self.candidates = candidates
+        self.relations = {logical: names[0] for logical, names in candidates.items()}
+        self.columns = {}
+        self.resolved = False
+        self._lock = threading.Lock()
+
+    def resolve(self, cursor):
+        """One catalog query for all candidates; raises SchemaError if one is missing"""
+        wanted = [name for names in self.candidates.values() for name in names]
+        cursor.execute(RESOLVE_QUERY, (wanted,))
+        found = {row['name']: frozenset(row['columns']) for row in cursor.fetchall()}
+
+        relations, columns = {}, {}
+        for logical, names in self.candidates.items():
+            name = next((n for n in names if n in found), None)
+            if name is None:
+                raise SchemaError(f"Missing table: {logical} (looked for {', '.join(names)})")
+            missing = [c for c in REQUIRED_COLUMNS.get(logical, ()) if c not in found[name]]
+            if missing:
+                raise SchemaError(f"Table {name} has no column {', '.join(missing)}")
+            relations[logical] = name
+            columns[logical] = found[name]
+
+        with self._lock:
+            self.relations = relations
+            self.columns = columns
+            self.resolved = True
+        return relations
+
+    def relation(self, logical: str) -> str:
+        return self.relations[logical]
+
+    def has_column(self, logical: str, column: str) -> bool:
+        columns: Optional[frozenset] = self.columns.get(logical)
+        return columns is None or column in columns
+
+    def column_or_null(self, logical: str, column: str, alias: str = None) -> str:
+        """`alias.column`, or `NULL AS column` when the table does not have it"""
+        if self.has_column(logical, column):
+            return f"{alias}.{column}" if alias else column
+        return f"NULL AS {column}"
+
+    @property
+    def tables(self) -> str:
+        """Dining tables (bàn ăn)"""
+        return self.relations["tables"]
+
+    def as_dict(self) -> dict:
+        return {"resolved": self.resolved, "relations": self.relations,
+                "columns": {k: sorted(v) for k, v in self.columns.items()}}
+
+schema = SchemaRegistry()
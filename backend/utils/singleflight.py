@@ -0,0 +1,189 @@
+# ========================================
+# FILE: backend/utils/singleflight.py - GỘP CÁC REQUEST ĐỌC GIỐNG HỆT NHAU
+# ========================================
+# Ten tablets polling the kitchen board in the same second used to run ten
+# identical builds. A handler decorated with @single_flight runs once per key
+# (route + query parameters + role of the caller):
+#
+#   * identical requests that arrive while it runs wait for it and get the
+#     same serialized JSON bytes ("shared")
+#   * the bytes are then reused for the route's micro-TTL ("cached"), so a
+#     burst of polls costs one build
+#
+# Errors are shared with the requests already waiting, never cached.
+# X-Single-Flight tells which of leader / shared / cached answered.
+#
+# The TTL of a route is set in code and can be overridden with
+# SINGLEFLIGHT_TTL_<NAME> (seconds; 0 = only share in-flight builds).
+# Handlers must take their DB connection inside the body (not Depends(get_db)),
+# so that waiting requests do not hold pool connections.
+
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+from datetime import date
+from typing import Awaitable, Callable
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from utils.auth import Principal
+from utils.log import get_logger, SAMPLED
+
+logger = get_logger(__name__)
+
+# Finished entries kept before expired ones are swept
+MAX_ENTRIES = 256
+HEADER = "X-Single-Flight"
+
+# Parameter types that are part of the key; dependencies (user, connection) are not
+_KEY_TYPES = (str, int, float, bool, date, type(None))
+
+def route_ttl(name: str, default: float) -> float:
+    return float(os.getenv(f"SINGLEFLIGHT_TTL_{name.upper()}", default))
+
+def serialize(payload) -> bytes:
+    # Same encoding as FastAPI's JSONResponse (and utils/menu_cache.py)
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+        indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def request_key(kwargs: dict) -> tuple:
+    """(role, sorted scalar parameters) of one call of a handler"""
+    role = None
+    params = []
+    for name, value in kwargs.items():
+        if isinstance(value, Principal):
+            role = value.role
+        elif isinstance(value, _KEY_TYPES):
+            params.append((name, value))
+    return (role, tuple(sorted(params)))
+
+class _Call:
+    """One build: in flight until `done`, then fresh until `expires`"""
+
+    __slots__ = ("done", "body", "error", "expires")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.body = None
+        self.error = None
+        self.expires = 0.0
+
+class SingleFlight:
+    """Shares one build (and its bytes, for `ttl` seconds) between identical calls"""
+
+    def __init__(self, name: str, ttl: float = 0.0):
+        self.name = name
+        self.ttl = ttl
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._stats = {"leader": 0, "shared": 0, "cached": 0}
+
+    def _sweep(self, now: float):
+        if len(self._calls) > MAX_ENTRIES:
+            for key in [k for k, c in self._calls.items() if c.done.is_set() and c.expires <= now]:
+                del self._calls[key]
+
+    def do(self, key, build: Callable[[], object]) -> tuple[bytes, str]:
+        """(body, outcome) for a sync handler; runs `build` only if no identical call is fresh"""
+        now = time.monotonic()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and (not call.done.is_set() or call.expires > now):
+                outcome = "cached" if call.done.is_set() else "shared"
+            else:
+                self._sweep(now)
+                call = self._calls[key] = _Call()
+                outcome = "leader"
+            self._stats[outcome] += 1
+
+        if outcome != "leader":
+            logger.debug("Single-flight hit", extra={**SAMPLED, "flight": self.name, "outcome": outcome})
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.body, outcome
+
+        try:
+            call.body = serialize(build())
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.expires = time.monotonic() + self.ttl
+            if call.error is not None or self.ttl <= 0:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+            call.done.set()
+        return call.body, outcome
+
+    async def ado(self, key, build: Callable[[], Awaitable]) -> tuple[bytes, str]:
+        """do() for an async handler; the build runs as its own task"""
+        now = time.monotonic()
+        entry = self._tasks.get(key)
+        if entry is not None and (not entry[0].done() or entry[1] > now):
+            outcome = "cached" if entry[0].done() else "shared"
+            task = entry[0]
+            logger.debug("Single-flight hit", extra={**SAMPLED, "flight": self.name, "outcome": outcome})
+        else:
+            if len(self._tasks) > MAX_ENTRIES:
+                for k in [k for k, (t, expires) in self._tasks.items() if t.done() and expires <= now]:
+                    del self._tasks[k]
+            task = asyncio.ensure_future(self._abuild(key, build))
+            self._tasks[key] = (task, float("inf"))
+            outcome = "leader"
+        self._stats[outcome] += 1
+        # shield: a client that disconnects does not cancel the build the others wait for
+        return await asyncio.shield(task), outcome
+
+    async def _abuild(self, key, build: Callable[[], Awaitable]) -> bytes:
+        try:
+            body = serialize(await build())
+        except BaseException:
+            self._tasks.pop(key, None)
+            raise
+        if self.ttl > 0:
+            self._tasks[key] = (self._tasks[key][0], time.monotonic() + self.ttl)
+        else:
+            self._tasks.pop(key, None)
+        return body
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "ttl": self.ttl}
+
+_flights: dict = {}
+
+def single_flight(name: str, ttl: float = 0.0):
+    """
+    Decorator for a GET handler returning a JSON-able dict
+
+    Goes UNDER @router.get. The handler's signature is kept, so FastAPI
+    validates and injects parameters as before.
+    """
+    flight = _flights.setdefault(name, SingleFlight(name, route_ttl(name, ttl)))
+
+    def decorate(endpoint):
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(**kwargs):
+                body, outcome = await flight.ado(
+                    (endpoint.__name__, request_key(kwargs)), lambda: endpoint(**kwargs))
+                return Response(content=body, media_type="application/json", headers={HEADER: outcome})
+        else:
+            @functools.wraps(endpoint)
+            def wrapper(**kwargs):
+                body, outcome = flight.do(
+                    (endpoint.__name__, request_key(kwargs)), lambda: endpoint(**kwargs))
+                return Response(content=body, media_type="application/json", headers={HEADER: outcome})
+        return wrapper
+
+    return decorate
+
+def single_flight_stats() -> dict:
+    return {name: flight.stats() for name, flight in _flights.items()}
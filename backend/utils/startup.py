@@ -0,0 +1,166 @@
+# ========================================
+# FILE: backend/utils/startup.py - KHỞI TẠO TRONG LIFESPAN
+# ========================================
+# Importing the app no longer touches the database. Everything that needs it
+# runs here, from main.py's lifespan, one timed step at a time:
+#
+#   db_pool          open min_size connections (psycopg2 + asyncpg)
+#   schema           resolve table names (utils/schema_registry.py), required
+#                    tables exist, no pending migrations/
+#   password_hasher  spawn the bcrypt workers
+#   caches           public menu snapshot, menu search backend, table token epochs
+#
+# A failed step does not stop the worker: it serves /health, answers /ready
+# with 503, and /ready retries the failed steps (at most every
+# STARTUP_RETRY_INTERVAL seconds) until the database is back.
+
+import asyncio
+import os
+import time
+from starlette.concurrency import run_in_threadpool
+from config.database import get_pool, get_db_connection
+from config import async_database as adb
+from utils.hashing import password_hasher
+from utils.menu_cache import menu_cache
+from utils.menu_search import menu_search
+from utils.table_tokens import table_tokens
+from utils.log import get_logger
+from utils.schema_registry import schema, SchemaError
+from migrate import migration_files
+
+logger = get_logger(__name__)
+
+STARTUP_RETRY_INTERVAL = float(os.getenv("STARTUP_RETRY_INTERVAL", "5"))
+# Readiness check of the database, seconds
+READY_DB_TIMEOUT = float(os.getenv("READY_DB_TIMEOUT", "2"))
+
+# Dining tables are not listed: schema.resolve() looks for them under each known name
+REQUIRED_RELATIONS = (
+    "users", "employees", "categories", "menu_items", "orders", "order_items",
+    "payments", "kitchen_orders", "bank_transactions", "cache_versions", "sales_rollup",
+)
+
+# ==================== STEPS ====================
+
+async def warm_db_pools():
+    await run_in_threadpool(get_pool().warmup)
+    await adb.get_async_pool()
+
+def probe_schema():
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        logger.info("Schema resolved", extra={"relations": schema.resolve(cursor)})
+        cursor.execute(
+            "SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NULL",
+            (list(REQUIRED_RELATIONS),)
+        )
+        missing = [row['name'] for row in cursor.fetchall()]
+        if missing:
+            raise SchemaError(f"Missing tables: {', '.join(missing)}")
+
+        cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL AS ok")
+        applied = set()
+        if cursor.fetchone()['ok']:
+            cursor.execute("SELECT filename FROM schema_migrations")
+            applied = {row['filename'] for row in cursor.fetchall()}
+        pending = [f for f in migration_files() if f not in applied]
+        if pending:
+            raise SchemaError(f"Pending migrations (run migrate.py): {', '.join(pending)}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+def warm_caches():
+    menu_cache.get()
+    table_tokens.epoch(0)
+    conn = get_db_connection()
+    try:
+        menu_search.warm(conn.cursor())
+    finally:
+        conn.rollback()
+        conn.close()
+
+# (name, coroutine function, needs the database)
+STARTUP_STEPS = (
+    ("db_pool", warm_db_pools, True),
+    ("schema", lambda: run_in_threadpool(probe_schema), True),
+    ("password_hasher", lambda: run_in_threadpool(password_hasher.start), False),
+    ("caches", lambda: run_in_threadpool(warm_caches), True),
+)
+
+# ==================== REPORT ====================
+
+class StartupReport:
+    """Timing and outcome of every startup step"""
+
+    def __init__(self):
+        self.steps = {}
+        self.total_ms = 0.0
+        self.attempts = 0
+        self._attempted_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def record(self, name: str, ms: float, error: str = None, skipped: bool = False):
+        self.steps[name] = {
+            "ms": round(ms, 1),
+            "ok": error is None and not skipped,
+            **({"error": error} if error else {}),
+            **({"skipped": True} if skipped else {}),
+        }
+
+    @property
+    def ready(self) -> bool:
+        return self.attempts > 0 and all(
+            self.steps.get(name, {}).get("ok") for name, _, _ in STARTUP_STEPS
+        )
+
+    async def run(self):
+        """Run the steps that have not succeeded yet"""
+        async with self._lock:
+            self.attempts += 1
+            self._attempted_at = time.monotonic()
+            started = time.perf_counter()
+            db_failed = False
+            for name, step, needs_db in STARTUP_STEPS:
+                if self.steps.get(name, {}).get("ok"):
+                    continue
+                if needs_db and db_failed:
+                    self.record(name, 0.0, skipped=True)
+                    continue
+                step_started = time.perf_counter()
+                try:
+                    await step()
+                    self.record(name, (time.perf_counter() - step_started) * 1000)
+                except Exception as e:
+                    self.record(name, (time.perf_counter() - step_started) * 1000, error=str(e))
+                    db_failed = db_failed or needs_db
+                    logger.error("Startup step failed", extra={"step": name, "error": str(e)})
+            self.total_ms += (time.perf_counter() - started) * 1000
+
+        timings = {name: step["ms"] for name, step in self.steps.items()}
+        if self.ready:
+            logger.info("Startup complete", extra={"total_ms": round(self.total_ms, 1), "steps_ms": timings})
+        else:
+            logger.warning("Startup incomplete, not ready", extra={
+                "attempt": self.attempts, "steps_ms": timings,
+                "failed": [name for name, step in self.steps.items() if not step["ok"]],
+            })
+
+    async def retry_if_due(self):
+        if not self.ready and time.monotonic() - self._attempted_at >= STARTUP_RETRY_INTERVAL \
+                and not self._lock.locked():
+            await self.run()
+
+    def as_dict(self) -> dict:
+        return {"ready": self.ready, "attempts": self.attempts,
+                "total_ms": round(self.total_ms, 1), "steps": self.steps}
+
+async def database_reachable() -> bool:
+    try:
+        await asyncio.wait_for(adb.fetchval("SELECT 1"), READY_DB_TIMEOUT)
+        return True
+    except Exception:
+        return False
+
+startup_report = StartupReport()
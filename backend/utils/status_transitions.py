@@ -0,0 +1,110 @@
+# ========================================
+# FILE: backend/utils/status_transitions.py - ĐỔI TRẠNG THÁI CÓ KIỂM TRA XUNG ĐỘT
+# ========================================
+# Orders and kitchen tickets are changed from several screens at once. A
+# read-then-write let a kitchen "READY" overwrite a cashier "PAID". Every
+# status change is now ONE conditional UPDATE:
+#
+#     UPDATE orders SET status = 'READY', version = version + 1
+#     WHERE order_id = 5
+#       AND (current status -> 'READY') is in status_transitions
+#       AND version = <the version the client saw>     -- if it sent one
+#
+# No row back means the move is not allowed from the current status, or
+# someone else changed the row first: nothing is written and the caller gets
+# 409 with the current status and version. The row lock lasts only for the
+# request's own short transaction; nothing is held while a screen is open.
+# Allowed moves: status_transitions (migrations/009). An order becomes PAID
+# only through POST /api/cashier/payment, which also writes the payment and
+# the rollups; the generic paths here refuse it.
+
+from typing import Optional
+from fastapi import HTTPException, status
+
+# entity -> (table, primary key, label in messages)
+ENTITIES = {
+    "order": ("orders", "order_id", "Đơn hàng"),
+    "kitchen_order": ("kitchen_orders", "kitchen_order_id", "Phiếu bếp"),
+}
+
+# Statuses written by one endpoint only -> that endpoint
+RESERVED = {
+    ("order", "PAID"): "POST /api/cashier/payment",
+}
+
+# `prev` locks the rows first, so previous_status is the status this UPDATE
+# replaces, not an older one read before a concurrent change committed. The
+# allowed-move check also uses prev.status: after waiting for a lock,
+# PostgreSQL rechecks the new version of `r` against the status_transitions
+# row it had already joined on the OLD r.status, and would drop the row.
+TRANSITION_QUERY = """
+    WITH prev AS (
+        SELECT {key}, status FROM {table}
+        WHERE {column} = %(value)s
+        FOR NO KEY UPDATE
+    )
+    UPDATE {table} AS r
+    SET status = %(to_status)s, version = r.version + 1, updated_at = CURRENT_TIMESTAMP
+    FROM prev
+    WHERE r.{key} = prev.{key}
+      AND (%(version)s::int IS NULL OR r.version = %(version)s)
+      AND EXISTS (
+          SELECT 1 FROM status_transitions st
+          WHERE st.entity = %(entity)s AND st.from_status = prev.status AND st.to_status = %(to_status)s
+      )
+    RETURNING r.*, prev.status AS previous_status
+"""
+
+def _apply(cursor, entity: str, column: str, value, to_status: str, version: Optional[int]) -> list:
+    table, key, _ = ENTITIES[entity]
+    cursor.execute(TRANSITION_QUERY.format(table=table, key=key, column=column), {
+        "entity": entity, "value": value, "to_status": to_status, "version": version,
+    })
+    return cursor.fetchall()
+
+def transition(cursor, entity: str, row_id: int, to_status: str, version: Optional[int] = None) -> dict:
+    """
+    Move one row to `to_status`; returns the new row (+ previous_status)
+
+    404 if the row does not exist, 409 if the move is not allowed from its
+    current status or its version is not `version`. Asking for the status
+    the row already has (double tap) returns it unchanged.
+    """
+    to_status = to_status.upper()
+    if (entity, to_status) in RESERVED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Trạng thái {to_status} chỉ được đặt qua {RESERVED[(entity, to_status)]}"
+        )
+    rows = _apply(cursor, entity, ENTITIES[entity][1], row_id, to_status, version)
+    if rows:
+        return rows[0]
+
+    table, key, label = ENTITIES[entity]
+    cursor.execute(f"SELECT *, status AS previous_status FROM {table} WHERE {key} = %s", (row_id,))
+    current = cursor.fetchone()
+    if not current:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{label} #{row_id} không tồn tại")
+    if version is not None and current['version'] != version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{label} #{row_id} vừa được cập nhật bởi người khác "
+                   f"(trạng thái {current['status']}, version {current['version']}), vui lòng tải lại"
+        )
+    if current['status'] == to_status:
+        return current
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"{label} #{row_id} đang ở trạng thái {current['status']} "
+               f"(version {current['version']}), không thể chuyển sang {to_status}"
+    )
+
+def try_transition(cursor, entity: str, column: str, value, to_status: str) -> list:
+    """
+    Follow-up move (ticket READY -> order READY): rows where `column = value`
+    that may move to `to_status` do, the others are left as they are
+    """
+    to_status = to_status.upper()
+    if (entity, to_status) in RESERVED:
+        return []
+    return _apply(cursor, entity, column, value, to_status, None)
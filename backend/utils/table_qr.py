@@ -0,0 +1,76 @@
+# ========================================
+# FILE: backend/utils/table_qr.py - ẢNH QR IN CHO TỪNG BÀN
+# ========================================
+# PNG files of the table QR codes (PUBLIC_ORDER_URL?t=<table token>), rendered
+# into QR_CACHE_DIR. The file name carries the token epoch, so a table whose
+# QR code was replaced is rendered again and its old file removed; the others
+# are reused as they are.
+#
+# Rendering needs the optional `qrcode` package with Pillow:
+#     pip install "qrcode[pil]"
+# Without it, tokens still work; only the PNG endpoints answer 501.
+
+import io
+import os
+from utils.table_tokens import table_tokens
+from utils.log import get_logger
+
+try:
+    import qrcode
+except ImportError:
+    qrcode = None
+
+logger = get_logger(__name__)
+
+PUBLIC_ORDER_URL = os.getenv("PUBLIC_ORDER_URL", "http://localhost:3000/order")
+QR_CACHE_DIR = os.getenv("QR_CACHE_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "qr_cache"))
+QR_BOX_SIZE = int(os.getenv("QR_BOX_SIZE", "10"))
+
+class QRUnavailable(Exception):
+    """The optional qrcode package is not installed"""
+
+def order_url(token: str) -> str:
+    separator = "&" if "?" in PUBLIC_ORDER_URL else "?"
+    return f"{PUBLIC_ORDER_URL}{separator}t={token}"
+
+def render_png(data: str) -> bytes:
+    if qrcode is None:
+        raise QRUnavailable('QR rendering needs the qrcode package: pip install "qrcode[pil]"')
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=QR_BOX_SIZE, border=2)
+    qr.add_data(data)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image().save(buffer)
+    return buffer.getvalue()
+
+def _file_prefix(table_number: int) -> str:
+    return f"table-{table_number}-"
+
+def qr_file(table_id: int, table_number: int) -> dict:
+    """Cached PNG of one table, rendered if missing; returns path and URL"""
+    epoch = table_tokens.epoch(table_id)
+    url = order_url(table_tokens.issue(table_id, table_number, epoch))
+    prefix = _file_prefix(table_number)
+    path = os.path.join(QR_CACHE_DIR, f"{prefix}{table_id}-e{epoch}.png")
+    rendered = False
+    if not os.path.exists(path):
+        png = render_png(url)
+        os.makedirs(QR_CACHE_DIR, exist_ok=True)
+        # Write then rename: a concurrent reader never sees half a file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, path)
+        rendered = True
+        for name in os.listdir(QR_CACHE_DIR):
+            if name.startswith(prefix) and name.endswith(".png") and name != os.path.basename(path):
+                os.remove(os.path.join(QR_CACHE_DIR, name))
+    return {"table_number": table_number, "path": path, "url": url, "rendered": rendered}
+
+def render_all(tables: list) -> list:
+    """qr_file() for every (table_id, table_number); only new or rotated ones are drawn"""
+    results = [qr_file(t['table_id'], t['table_number']) for t in tables]
+    logger.info("Table QR codes rendered", extra={
+        "tables": len(results), "rendered": sum(r["rendered"] for r in results), "dir": QR_CACHE_DIR})
+    return results
@@ -0,0 +1,168 @@
+# ========================================
+# FILE: backend/utils/table_tokens.py - MÃ QR KÝ HMAC CHO TỪNG BÀN
+# ========================================
+# The QR code on a table used to carry "QR-{n}", so anyone could order for any
+# table by changing the number. A table token is
+#
+#     v1.<table_id>.<table_number>.<branch>.<epoch>.<signature>
+#
+# signed with HMAC-SHA256. Checking one needs no query: the signature proves
+# the fields, and the only state is each table's current epoch, kept in memory.
+#
+# PUT /api/tables/{n} with changeToken bumps the table's epoch
+# (table_token_epochs, migrations/008) and cache_versions 'table_tokens' in one
+# transaction. Every worker reloads its epochs when that version moves (checked
+# at most every TABLE_TOKEN_CHECK_INTERVAL seconds, like the menu cache), so a
+# replaced QR code stops working everywhere within that delay.
+
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import HTTPException, status
+from config.database import get_db_connection
+from utils.auth import SECRET_KEY
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Defaults to a key derived from SECRET_KEY; set it to rotate QR codes independently of logins
+TABLE_TOKEN_SECRET = os.getenv("TABLE_TOKEN_SECRET") or hmac.new(
+    SECRET_KEY.encode(), b"table-tokens", hashlib.sha256).hexdigest()
+# Branch (chi nhánh) this server belongs to; a token from another branch is rejected
+RESTAURANT_BRANCH = os.getenv("RESTAURANT_BRANCH", "main")
+# Refuse public orders that only send table_number (QR codes printed before tokens)
+TABLE_TOKEN_REQUIRED = os.getenv("TABLE_TOKEN_REQUIRED", "false").lower() == "true"
+TABLE_TOKEN_CHECK_INTERVAL = float(os.getenv("TABLE_TOKEN_CHECK_INTERVAL", "2"))
+CACHE_NAME = "table_tokens"
+
+TOKEN_VERSION = "v1"
+# 16 bytes of the HMAC, base64url without padding (22 characters)
+SIGNATURE_BYTES = 16
+BRANCH_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,32}")
+
+if not BRANCH_PATTERN.fullmatch(RESTAURANT_BRANCH):
+    raise ValueError(f"RESTAURANT_BRANCH must match {BRANCH_PATTERN.pattern}: {RESTAURANT_BRANCH!r}")
+
+class InvalidTableToken(Exception):
+    """Malformed, forged, from another branch, or replaced by a newer QR code"""
+
+@dataclass(frozen=True)
+class TableClaim:
+    """What a valid table token says"""
+    table_id: int
+    table_number: int
+    branch: str
+    epoch: int
+
+def _sign(message: str) -> str:
+    digest = hmac.new(TABLE_TOKEN_SECRET.encode(), message.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:SIGNATURE_BYTES]).rstrip(b"=").decode()
+
+class TableTokens:
+    """Issues and verifies table tokens; holds the current epoch of every table"""
+
+    def __init__(self, branch: str = RESTAURANT_BRANCH, check_interval: float = TABLE_TOKEN_CHECK_INTERVAL):
+        self.branch = branch
+        self.check_interval = check_interval
+        self._epochs: Optional[dict] = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # ---------- tokens ----------
+
+    def issue(self, table_id: int, table_number: int, epoch: Optional[int] = None) -> str:
+        if epoch is None:
+            epoch = self.epoch(table_id)
+        message = f"{TOKEN_VERSION}.{table_id}.{table_number}.{self.branch}.{epoch}"
+        return f"{message}.{_sign(message)}"
+
+    def verify(self, token: str) -> TableClaim:
+        """Signature, branch and epoch; raises InvalidTableToken"""
+        message, _, signature = (token or "").rpartition(".")
+        parts = message.split(".")
+        if len(parts) != 5 or parts[0] != TOKEN_VERSION:
+            raise InvalidTableToken("Mã QR không hợp lệ")
+        if not hmac.compare_digest(signature, _sign(message)):
+            raise InvalidTableToken("Mã QR không hợp lệ")
+        _, table_id, table_number, branch, epoch = parts
+        claim = TableClaim(int(table_id), int(table_number), branch, int(epoch))
+        if claim.branch != self.branch:
+            raise InvalidTableToken("Mã QR thuộc chi nhánh khác")
+        if claim.epoch != self.epoch(claim.table_id):
+            raise InvalidTableToken("Mã QR đã được thay mới, vui lòng quét lại mã trên bàn")
+        return claim
+
+    # ---------- epochs ----------
+
+    def epoch(self, table_id: int) -> int:
+        """Current epoch of a table (0 until its QR code is first replaced)"""
+        epochs = self._epochs
+        if epochs is None or time.monotonic() - self._checked_at >= self.check_interval:
+            with self._lock:
+                if self._epochs is None or time.monotonic() - self._checked_at >= self.check_interval:
+                    self._refresh()
+                epochs = self._epochs
+        return epochs.get(table_id, 0)
+
+    def _refresh(self):
+        try:
+            conn = get_db_connection()
+            try:
+                cursor = conn.cursor()
+                # Version BEFORE the epochs, as in utils/menu_cache.py
+                cursor.execute("SELECT version FROM cache_versions WHERE name = %s", (CACHE_NAME,))
+                row = cursor.fetchone()
+                version = row['version'] if row else 0
+                if self._epochs is None or version != self._version:
+                    cursor.execute("SELECT table_id, epoch FROM table_token_epochs")
+                    self._epochs = {r['table_id']: r['epoch'] for r in cursor.fetchall()}
+                    self._version = version
+                cursor.close()
+            finally:
+                conn.rollback()
+                conn.close()
+        except Exception as e:
+            if self._epochs is None:
+                raise
+            # Keep verifying with the epochs we have; try again next interval
+            logger.warning("Table token epochs not refreshed", extra={"error": str(e)})
+        self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Force a version check on the next verify (this worker)"""
+        self._checked_at = 0.0
+
+    async def rotate(self, conn, table_id: int) -> int:
+        """New epoch for a table, inside the caller's asyncpg transaction"""
+        epoch = await conn.fetchval("""
+            INSERT INTO table_token_epochs (table_id, epoch) VALUES ($1, 1)
+            ON CONFLICT (table_id) DO UPDATE
+            SET epoch = table_token_epochs.epoch + 1, rotated_at = NOW()
+            RETURNING epoch
+        """, table_id)
+        await conn.execute("""
+            UPDATE cache_versions SET version = version + 1, updated_at = NOW()
+            WHERE name = $1
+        """, CACHE_NAME)
+        return epoch
+
+    def stats(self) -> dict:
+        return {"version": self._version, "rotated_tables": len(self._epochs or {})}
+
+table_tokens = TableTokens()
+
+def table_claim(token: Optional[str]) -> Optional[TableClaim]:
+    """Claim of a token sent by a public endpoint (None if absent); 403 if it is not valid"""
+    if not token:
+        return None
+    try:
+        return table_tokens.verify(token)
+    except InvalidTableToken as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))